@@ -0,0 +1,94 @@
+"""
+Grafik & drill-down mismatch per Brand / Kategori untuk hasil analisis.
+
+Semua interaksi (ganti pasangan, dimensi, metrik, drill-down) hanya meng-agregat
+ulang result.cubes (engine.build_cube, dihitung sekali per analisis) — baris
+hasil tidak di-scan ulang dan tidak dikirim ke browser.
+"""
+import plotly.express as px
+import streamlit as st
+
+from engine import cube_rollup, CUBE_DIMS
+from instrument import stage
+
+METRICS     = ["% Tidak Sama", "Selisih (Rp)", "Tidak Sama", "Tidak Ada di Omni"]
+TOP_N       = [10, 20, 50]
+ALL_PAIRS   = "(semua pasangan)"
+COLORS      = {"Sama": "#a8ff78", "Portal Lebih Mahal": "#ff7878", "Omni Lebih Mahal": "#c8a8ff",
+               "Data Kosong": "#ffd878", "Tidak Ada di Omni": "#888888"}
+STATUS_COLS = list(COLORS)
+
+
+def _layout(fig, height):
+    fig.update_layout(height=height, margin=dict(l=0, r=0, t=10, b=0), paper_bgcolor="rgba(0,0,0,0)",
+                      plot_bgcolor="rgba(0,0,0,0)", font=dict(color="#e8e8f0", family="DM Mono, monospace"),
+                      legend=dict(orientation="h", y=-0.15, title=None))
+    return fig
+
+
+def status_bar(agg, dim, height=380):
+    """Bar horizontal bertumpuk: komposisi status per nilai dimensi (urutan mengikuti agg)."""
+    long = agg.iloc[::-1].melt(id_vars=[dim], value_vars=STATUS_COLS, var_name="Status", value_name="Jumlah")
+    fig  = px.bar(long, x="Jumlah", y=dim, color="Status", orientation="h", color_discrete_map=COLORS)
+    return _layout(fig, height)
+
+
+def metric_bar(agg, dim, metric, height=380):
+    """Bar horizontal satu metrik per nilai dimensi, warna = % Tidak Sama."""
+    fig = px.bar(agg.iloc[::-1], x=metric, y=dim, orientation="h", color="% Tidak Sama",
+                 color_continuous_scale=["#a8ff78", "#ffd878", "#ff7878"],
+                 hover_data={"Total": ":,", "Tidak Sama": ":,", "Selisih (Rp)": ":,", "% Tidak Sama": ":.1f"})
+    fig.update_coloraxes(colorbar_title_text="% beda")
+    return _layout(fig, height)
+
+
+def render_analytics(result, key=""):
+    """Panel analitik Brand/Kategori satu ComparisonResult. key: prefix key widget (multi file)."""
+    cube = result.cubes
+    dims = [d for d in CUBE_DIMS if d in cube.columns]
+    pair_opts = [ALL_PAIRS] + list(cube["Pasangan"].cat.categories)
+
+    c1, c2, c3, c4 = st.columns([2, 2, 2, 1])
+    with c1:
+        pair = st.selectbox("Pasangan", pair_opts, key=f"an_pair_{key}")
+    with c2:
+        dim = st.radio("Kelompokkan per", dims, horizontal=True, key=f"an_dim_{key}")
+    with c3:
+        metric = st.selectbox("Urutkan menurut", METRICS, key=f"an_metric_{key}")
+    with c4:
+        top_n = st.selectbox("Top", TOP_N, key=f"an_top_{key}")
+    pair = None if pair == ALL_PAIRS else pair
+
+    with stage(f"analytics[{dim}]", rows=len(cube)):
+        agg = cube_rollup(cube, [dim], pair)
+        top = agg.sort_values(metric, ascending=False, kind="stable").head(top_n)
+    if top.empty:
+        st.caption("Tidak ada data untuk pilihan ini.")
+        return
+
+    height = max(260, 26 * len(top))
+    g1, g2 = st.columns(2, gap="large")
+    with g1:
+        st.caption(f"{metric} per {dim} — top {len(top)} dari {len(agg):,}")
+        st.plotly_chart(metric_bar(top, dim, metric, height), use_container_width=True, key=f"an_metric_chart_{key}")
+    with g2:
+        st.caption(f"Komposisi status per {dim}")
+        st.plotly_chart(status_bar(top, dim, height), use_container_width=True, key=f"an_status_chart_{key}")
+
+    # ── Drill-down: satu nilai dimensi → dimensi lain & per pasangan ──
+    pick = st.selectbox(f"🔍 Drill-down {dim}", top[dim].tolist(), key=f"an_pick_{key}_{dim}")
+    sub  = cube[cube[dim] == pick]
+    d1, d2 = st.columns(2, gap="large")
+    other = [d for d in dims if d != dim]
+    if other:
+        with d1:
+            # Satu dimensi per grafik; pilihan muncul jika ada lebih dari satu dimensi lain
+            by = st.radio("Rinci per", other, horizontal=True, key=f"an_by_{key}_{dim}") if len(other) > 1 else other[0]
+            by_other = cube_rollup(sub, [by], pair).sort_values(metric, ascending=False, kind="stable")
+            st.caption(f"{pick}: {metric} per {by}")
+            st.plotly_chart(metric_bar(by_other.head(top_n), by, metric, max(220, 26 * min(len(by_other), top_n))),
+                            use_container_width=True, key=f"an_drill_chart_{key}")
+    with (d2 if other else d1):
+        st.caption(f"{pick}: per pasangan")
+        st.dataframe(cube_rollup(sub, ["Pasangan"]), use_container_width=True, hide_index=True,
+                     column_config={"% Tidak Sama": st.column_config.NumberColumn(format="%.1f%%")})
@@ -0,0 +1,216 @@
+"""
+Benchmark per tahap pipeline dengan data sintetis (synth_data.py).
+
+Tahap: load (ingest.read_upload, cache dingin) → detect (auto-detect kolom) →
+columns (ingest.read_columns: mode streaming, cache dingin) → merge →
+status → stats (engine.merge_pairs / evaluate_pairs / assemble_result, tahap
+yang sama dengan compare_frames, + compact_result) → filter (filter + search +
+sort tabel) → export (xlsx & CSV zip).
+Tiap tahap diukur waktunya (min dari --repeat kali) dan puncak memorinya
+(tracemalloc, di run terpisah supaya overhead-nya tidak masuk waktu).
+
+    python bench.py                              # 10k, 100k, 1M baris
+    python bench.py --sizes 10000 --out base.json
+    python bench.py --sizes 10000 --compare base.json   # bandingkan dengan run sebelumnya
+
+Output JSON: {"meta": {...}, "results": [{"rows", "stage", "seconds", "peak_mb"}, ...]}
+"""
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import detect
+import export
+import instrument
+from engine import (auto_detect, detect_info_cols, info_columns, required_columns, compact_result,
+                    merge_pairs, evaluate_pairs, assemble_result, FILTER_OPTS)
+from ingest import FrameCache, read_upload, read_columns
+from synth_data import generate, to_bytes, SIZES, MARKETPLACES
+from table_view import view_positions
+
+STAGES = ["load", "detect", "columns", "merge", "status", "stats", "filter", "export"]
+XLSX_MAX_ROWS = 100_000   # di atas ini file input dibuat sebagai CSV (xlsx 1 juta baris terlalu lama dibuat)
+REGRESSION    = 1.20      # --compare: tandai tahap yang >20% lebih lambat
+
+
+class Pipeline:
+    """State antar tahap; tiap method = satu tahap yang diukur."""
+
+    def __init__(self, files, tmp):
+        self.files = files  # {"portal": (nama, bytes), "omni": (nama, bytes)}
+        self.tmp   = tmp    # folder sementara untuk cache ingest
+
+    def _cold_cache(self):
+        # Cache baru (memori & folder kosong) → yang diukur parse + simpan cache, bukan hit cache
+        return FrameCache(cache_dir=tempfile.mkdtemp(dir=self.tmp))
+
+    def load(self):
+        cache = self._cold_cache()
+        self.df_a = read_upload(*self.files["portal"], cache=cache)
+        self.df_b = read_upload(*self.files["omni"], cache=cache)
+
+    def detect(self):
+        # Deteksi "dingin": buang cache profil kolom & skor header dari run sebelumnya
+        detect._PROFILES.clear()
+        detect._header_scores.cache_clear()
+        detect._token_score.cache_clear()
+        self.id_a = auto_detect(self.df_a, "id")[0]
+        self.id_b = auto_detect(self.df_b, "id")[0]
+        self.info = detect_info_cols(self.df_a)
+        self.pairs = [(f"Harga {mk}", mk, mk) for mk in MARKETPLACES
+                      if f"Harga {mk}" in self.df_a.columns and mk in self.df_b.columns]
+
+    def columns(self):
+        # Mode streaming UI/CLI: hanya kolom terpilih, dibaca per chunk
+        _, info_vals = info_columns(self.df_a, self.info)
+        self.cols_a, self.cols_b = required_columns(self.id_a, self.id_b, self.pairs, info_vals)
+        cache = self._cold_cache()
+        read_columns(*self.files["portal"], self.cols_a, cache=cache)
+        read_columns(*self.files["omni"], self.cols_b, cache=cache)
+
+    def merge(self):
+        self.merged, self.exists, self.report, self.keys_a, self.resolved, self.skipped = merge_pairs(
+            self.df_a[self.cols_a], self.df_b[self.cols_b], self.id_a, self.id_b, self.pairs)
+
+    def status(self):
+        self.evaluated = evaluate_pairs(self.merged, self.exists, self.resolved, self.keys_a)
+
+    def stats(self):
+        self.result = compact_result(assemble_result(self.merged, self.evaluated, self.id_a, self.info,
+                                                     self.report, self.skipped))
+
+    def filter(self):
+        self.result.views.clear()  # ukur perhitungan, bukan hit cache view
+        for info in self.result.pairs_info:
+            for sel in FILTER_OPTS:
+                view_positions(self.result, info, sel)
+            view_positions(self.result, info, "Tidak Sama", "SKU00", info["selisih_col"], False)
+
+    def export(self):
+        for fmt in ("xlsx", "csv.zip"):
+            export._WRITERS[fmt](self.result, io.BytesIO())
+
+
+def _measure(fn, repeat, memory):
+    """Jalankan fn; return (detik terbaik, puncak MB atau None)."""
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1] / 1e6
+        finally:
+            tracemalloc.stop()
+    return best, peak
+
+
+def make_files(rows, seed, fmt):
+    """Bytes file Portal/Omni sintetis (tidak ikut diukur)."""
+    fmt = fmt if fmt != "auto" else ("xlsx" if rows <= XLSX_MAX_ROWS else "csv")
+    portal, omni = generate(rows, seed)
+    return {"portal": (f"portal_{rows}.{fmt}", to_bytes(portal, fmt)),
+            "omni":   (f"omni_{rows}.{fmt}", to_bytes(omni, fmt))}, fmt
+
+
+def run(sizes, stages=STAGES, repeat=1, memory=True, seed=42, fmt="auto", log=print):
+    """Jalankan benchmark; return list baris hasil."""
+    out = []
+    for rows in sizes:
+        files, used_fmt = make_files(rows, seed, fmt)
+        with tempfile.TemporaryDirectory(prefix="cekharga_bench_") as tmp:
+            pipe = Pipeline(files, tmp)
+            for stage in STAGES:
+                # Tahap yang tidak diminta tetap dijalankan sekali (state untuk tahap berikutnya) tapi tidak dicatat
+                if stage not in stages:
+                    getattr(pipe, stage)()
+                    continue
+                seconds, peak = _measure(getattr(pipe, stage), repeat, memory)
+                row = {"rows": rows, "format": used_fmt, "stage": stage, "seconds": round(seconds, 4),
+                       "peak_mb": None if peak is None else round(peak, 1)}
+                out.append(row)
+                log(json.dumps(row))
+    return out
+
+
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def meta():
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git":       _git_rev(),
+        "python":    platform.python_version(),
+        "pandas":    pd.__version__,
+        "numpy":     np.__version__,
+        "platform":  platform.platform(),
+        "cpus":      os.cpu_count(),
+    }
+
+
+def compare(results, baseline_path, threshold=REGRESSION):
+    """Rasio waktu vs baseline per (rows, stage); return jumlah tahap yang melambat > threshold."""
+    with open(baseline_path, encoding="utf-8") as fh:
+        base = {(r["rows"], r["stage"]): r for r in json.load(fh)["results"]}
+    slower = 0
+    for r in results:
+        b = base.get((r["rows"], r["stage"]))
+        if not b or not b["seconds"]:
+            continue
+        ratio = r["seconds"] / b["seconds"]
+        flag  = "  ⚠ REGRESI" if ratio > threshold else ""
+        slower += bool(flag)
+        print(f"{r['rows']:>9,}  {r['stage']:<7} {b['seconds']:>9.3f}s → {r['seconds']:>9.3f}s  x{ratio:.2f}{flag}")
+    return slower
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark per tahap dengan data Portal/Omni sintetis.")
+    ap.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="Jumlah baris Portal (default: %(default)s)")
+    ap.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    ap.add_argument("--repeat", type=int, default=1, help="Ulangi tiap tahap N kali, ambil waktu terbaik")
+    ap.add_argument("--no-memory", action="store_true", help="Lewati pengukuran memori (tracemalloc)")
+    ap.add_argument("--format", choices=["auto", "xlsx", "csv"], default="auto",
+                    help=f"Format file input (auto: xlsx s/d {XLSX_MAX_ROWS:,} baris, selebihnya csv)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", default="bench_results.json", help="File hasil JSON")
+    ap.add_argument("--compare", metavar="BASELINE", help="JSON hasil run sebelumnya untuk dibandingkan")
+    args = ap.parse_args(argv)
+
+    instrument.PERF_LOG = False  # log JSON per tahap dari pipeline tidak perlu di output benchmark
+    results = run(args.sizes, args.stages, args.repeat, not args.no_memory, args.seed, args.format,
+                  log=lambda line: print(line, file=sys.stderr, flush=True))
+    with open(args.out, "w", encoding="utf-8") as fh:
+        json.dump({"meta": meta(), "results": results}, fh, indent=1)
+    print(f"Hasil ditulis ke {args.out}", file=sys.stderr)
+
+    if args.compare:
+        return 1 if compare(results, args.compare) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
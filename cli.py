@@ -0,0 +1,245 @@
+"""
+CLI / batch perbandingan harga Portal vs Omni tanpa Streamlit.
+
+Satu set file:
+    python cli.py --portal portal.xlsx --omni omni.xlsx \
+        --pair "Harga Web" "Web" Web --pair "Harga Shopee" "Shopee" Shopee \
+        --out hasil.xlsx
+
+Satu Portal vs banyak file (Omni + export per marketplace), satu workbook gabungan:
+    python cli.py --portal portal.xlsx --omni omni.xlsx shopee.xlsx tokopedia.csv \
+        --pair "Harga Web" "Harga" Web --out hasil.xlsx
+
+Banyak set file sekaligus (paralel di process pool):
+    python cli.py --batch jobs.json --workers 8
+
+jobs.json berisi list job, contoh:
+    [{"portal": "toko01/portal.xlsx", "omni": "toko01/omni.xlsx",
+      "out": "out/toko01.xlsx", "pairs": [["Harga Web", "Web", "Web"]],
+      "id_portal": "SKU", "id_omni": "Kode"}]
+"omni" boleh berupa list file (satu Portal vs banyak file).
+"pairs", "id_portal", "id_omni", "dup_policy" dan "key_opts" boleh dihilangkan
+→ pakai nilai dari command line; ID yang tidak diisi di-auto-detect.
+Dengan --store, tiap job membandingkan dengan snapshot run sebelumnya
+(nama snapshot = "snapshot" di job, default nama file output).
+Dengan --fuzzy, baris "Tidak Ada di Omni" diberi saran pasangan berdasarkan
+kemiripan nama produk (sheet/file "Saran Nama").
+Output berakhiran .xlsx ditulis sebagai workbook, .zip sebagai CSV ter-zip,
+selain itu sebagai folder Parquet.
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from detect import detect_info_cols
+from engine import auto_detect, info_columns, required_columns, compare_frames, compare_many
+from fuzzy_match import suggest_matches, with_suggestions
+from export import write_result
+from ingest import parse_header, load_columns
+from join import DUP_POLICIES
+from result_store import ResultStore, STORE_DIR
+
+
+def _read_bytes(path):
+    with open(path, "rb") as fh:
+        return fh.read()
+
+
+def _job_pairs(job):
+    return [tuple(p) if len(p) == 3 else (p[0], p[1], f"Pair {i+1}") for i, p in enumerate(job["pairs"])]
+
+
+def _target_names(paths):
+    """Nama file target untuk sheet/ringkasan; nama yang sama diberi nomor."""
+    names, seen = [], {}
+    for path in paths:
+        name = os.path.basename(path)
+        seen[name] = seen.get(name, 0) + 1
+        names.append(name if seen[name] == 1 else f"{name} ({seen[name]})")
+    return names
+
+
+def run_job(job):
+    """Jalankan satu job (satu pasang file Portal/Omni) dan tulis outputnya."""
+    portal, omni = job["portal"], job["omni"]
+    if isinstance(omni, list):
+        if len(omni) > 1:
+            return run_multi_job(job)
+        omni = omni[0]
+    pairs = _job_pairs(job)
+    data_a, data_b = _read_bytes(portal), _read_bytes(omni)
+
+    # Header dulu untuk auto-detect, lalu baca hanya kolom yang dipakai
+    head_a = parse_header(portal, data_a)
+    head_b = parse_header(omni, data_b)
+    id_col_a = job.get("id_portal") or auto_detect(head_a, "id")[0]
+    id_col_b = job.get("id_omni") or auto_detect(head_b, "id")[0]
+
+    info_cols_raw, info_col_vals = info_columns(head_a)
+    cols_a, cols_b = required_columns(id_col_a, id_col_b, pairs, info_col_vals)
+    df_a = load_columns(portal, data_a, cols_a)
+    df_b = load_columns(omni, data_b, cols_b)
+    omni_info = detect_info_cols(head_b) if job.get("fuzzy") else None
+    if omni_info is not None:
+        fz_cols = [c for c in dict.fromkeys([id_col_b, omni_info.get("Nama Produk"), omni_info.get("Brand")]) if c]
+        df_omni = load_columns(omni, data_b, fz_cols)
+    del data_a, data_b
+
+    result = compare_frames(df_a, df_b, id_col_a, id_col_b, pairs, info_cols_raw,
+                            key_opts=job.get("key_opts"), dup_policy=job.get("dup_policy") or "first",
+                            store=ResultStore(job["snapshot"], job["store_dir"]) if job.get("store_dir") else None)
+    if omni_info is not None:
+        # Sudah di dalam process pool batch → scoring serial per job
+        result = with_suggestions(result, suggest_matches(result, df_omni, id_col_b, omni_info, workers=1))
+    write_result(result, job["out"])
+    return {
+        "out":      job["out"],
+        "rows":     len(result.merged),
+        "id_cols":  [id_col_a, id_col_b],
+        "skipped":  result.skipped,
+        "join":     result.join_report,
+        "results":  result.results,
+        "suggested": None if result.suggestions is None else len(result.suggestions),
+    }
+
+
+def run_multi_job(job):
+    """
+    Satu Portal vs banyak file (job["omni"] berupa list) → satu workbook gabungan.
+    Semua file dibaca paralel (thread pool); key Portal dinormalisasi sekali untuk semua target.
+    Dengan fuzzy, saran nama dihitung per target (sheet "Saran Nama - <file>").
+    """
+    portal, paths = job["portal"], job["omni"]
+    pairs = _job_pairs(job)
+    data_a = _read_bytes(portal)
+    head_a = parse_header(portal, data_a)
+    id_col_a = job.get("id_portal") or auto_detect(head_a, "id")[0]
+    info_cols_raw, info_col_vals = info_columns(head_a)
+    cols_a, _ = required_columns(id_col_a, id_col_a, pairs, info_col_vals)
+
+    def load_target(path, name):
+        data = _read_bytes(path)
+        head = parse_header(path, data)
+        id_col = job.get("id_omni") or auto_detect(head, "id")[0]
+        # Pasangan yang kolomnya tidak ada di file ini dilewati (tercatat di "skipped"), bukan error
+        present = [p for p in pairs if p[1] in head.columns]
+        _, cols_b = required_columns(id_col_a, id_col, present, info_col_vals)
+        # Namespace dari nama target unik (_target_names), bukan stem: file senama di folder lain tidak berbagi snapshot
+        store = ResultStore(f"{job['snapshot']}-{name}", job["store_dir"]) if job.get("store_dir") else None
+        target = {"name": name, "df": load_columns(path, data, cols_b), "id_col": id_col, "pairs": pairs, "store": store}
+        if job.get("fuzzy"):
+            omni_info = detect_info_cols(head)
+            fz_cols   = [c for c in dict.fromkeys([id_col, omni_info.get("Nama Produk"), omni_info.get("Brand")]) if c]
+            target.update(omni_info=omni_info, df_omni=load_columns(path, data, fz_cols))
+        return target
+
+    with ThreadPoolExecutor(max_workers=len(paths) + 1) as pool:
+        fut_a   = pool.submit(load_columns, portal, data_a, cols_a)
+        futures = [(name, pool.submit(load_target, path, name)) for path, name in zip(paths, _target_names(paths))]
+        df_a    = fut_a.result()
+        targets, failed = [], {}
+        for name, fut in futures:
+            try:
+                targets.append(fut.result())
+            except Exception as e:
+                failed[name] = f"Gagal membaca file: {e}"
+    del data_a
+
+    result = compare_many(df_a, targets, id_col_a, info_cols_raw,
+                          key_opts=job.get("key_opts"), dup_policy=job.get("dup_policy") or "first")
+    result.failed.update(failed)
+    if not result.targets:
+        raise RuntimeError("; ".join(f"{name}: {err}" for name, err in result.failed.items()))
+    for t in targets:
+        r = result.targets.get(t["name"])
+        if "omni_info" in t and r is not None and r.pairs_info:
+            result.targets[t["name"]] = with_suggestions(r, suggest_matches(r, t["df_omni"], t["id_col"], t["omni_info"], workers=1))
+    write_result(result, job["out"])
+    return {
+        "out":     job["out"],
+        "rows":    len(df_a),
+        "targets": {name: {"id_col": t["id_col"], "skipped": result.targets[name].skipped,
+                           "join": result.targets[name].join_report, "results": result.targets[name].results,
+                           "suggested": None if result.targets[name].suggestions is None else len(result.targets[name].suggestions)}
+                    for name, t in ((t["name"], t) for t in targets) if name in result.targets},
+        "failed":  result.failed,
+    }
+
+
+def run_batch(jobs, workers=None):
+    """Jalankan banyak job paralel; yield (job, ringkasan, error) begitu job selesai."""
+    if len(jobs) == 1 or workers == 1:
+        for job in jobs:
+            try:
+                yield job, run_job(job), None
+            except Exception as e:
+                yield job, None, e
+        return
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = {pool.submit(run_job, job): job for job in jobs}
+        for fut in as_completed(futures):
+            job = futures[fut]
+            try:
+                yield job, fut.result(), None
+            except Exception as e:
+                yield job, None, e
+
+
+def build_jobs(args):
+    """Susun list job dari argumen CLI (single atau --batch)."""
+    key_opts = {"ignore_case": not args.case_sensitive, "strip_zeros": not args.keep_leading_zeros}
+    defaults = {"pairs": args.pair or [], "id_portal": args.id_portal, "id_omni": args.id_omni,
+                "key_opts": key_opts, "dup_policy": args.dup_policy, "store_dir": args.store, "fuzzy": args.fuzzy}
+    if args.batch:
+        with open(args.batch, encoding="utf-8") as fh:
+            raw = json.load(fh)
+        jobs = [{**defaults, **{k: v for k, v in job.items() if v}} for job in raw]
+    else:
+        if not (args.portal and args.omni and args.out):
+            raise SystemExit("--portal, --omni dan --out wajib diisi (atau pakai --batch).")
+        omni = args.omni if len(args.omni) > 1 else args.omni[0]
+        jobs = [{**defaults, "portal": args.portal, "omni": omni, "out": args.out}]
+    for job in jobs:
+        # Nama snapshot default = nama file output tanpa ekstensi (mis. per toko)
+        job.setdefault("snapshot", os.path.splitext(os.path.basename(job["out"].rstrip("/\\")))[0])
+        if not job["pairs"]:
+            raise SystemExit(f"Job {job.get('portal')}: minimal 1 --pair (kolom Portal, kolom Omni, label).")
+        if any(len(p) not in (2, 3) for p in job["pairs"]):
+            raise SystemExit(f"Job {job.get('portal')}: pair harus berisi 2 atau 3 nilai.")
+    return jobs
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Bandingkan harga Portal vs Omni tanpa UI.")
+    ap.add_argument("--portal", help="File Portal (xlsx/xls/csv)")
+    ap.add_argument("--omni", nargs="+", help="File Omni (xlsx/xls/csv); lebih dari satu = satu Portal vs banyak file")
+    ap.add_argument("--out", help="Output .xlsx, .zip (CSV) atau folder Parquet")
+    ap.add_argument("--pair", action="append", nargs="+", metavar="KOLOM",
+                    help="Pasangan kolom harga: KOLOM_PORTAL KOLOM_OMNI [LABEL] (bisa diulang)")
+    ap.add_argument("--id-portal", help="Kolom ID/SKU Portal (default: auto-detect)")
+    ap.add_argument("--id-omni", help="Kolom ID/SKU Omni (default: auto-detect)")
+    ap.add_argument("--dup-policy", choices=DUP_POLICIES, default="first",
+                    help="Penanganan SKU duplikat di Omni (default: first)")
+    ap.add_argument("--case-sensitive", action="store_true", help="Bedakan huruf besar/kecil pada ID")
+    ap.add_argument("--keep-leading-zeros", action="store_true", help="Jangan buang nol di depan ID")
+    ap.add_argument("--store", nargs="?", const=STORE_DIR, default=None, metavar="DIR",
+                    help="Simpan snapshot & laporkan perubahan sejak run sebelumnya (default DIR: %(const)s)")
+    ap.add_argument("--fuzzy", action="store_true", help="Sarankan pasangan nama produk untuk SKU yang tidak ada di Omni")
+    ap.add_argument("--batch", help="File JSON berisi list job")
+    ap.add_argument("--workers", type=int, default=None, help="Jumlah proses paralel (default: semua core)")
+    args = ap.parse_args(argv)
+
+    failed = 0
+    for job, summary, err in run_batch(build_jobs(args), args.workers):
+        if err is not None:
+            failed += 1
+            print(json.dumps({"portal": job["portal"], "omni": job["omni"], "error": str(err)}), flush=True)
+        else:
+            print(json.dumps({"portal": job["portal"], "omni": job["omni"], **summary}), flush=True)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
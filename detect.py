@@ -0,0 +1,192 @@
+"""
+Deteksi kolom otomatis (ID/SKU, harga, nama, brand, kategori).
+
+Skor header dihitung dari index keyword yang sudah dinormalisasi dan di-cache
+per signature header, jadi rerun Streamlit tidak menghitung ulang. Jika frame
+berisi data, sampel kecil nilai kolom dipakai untuk membedakan kolom harga
+(numerik/"Rp"), ID (unik, high-cardinality) dan kategori (sedikit nilai unik).
+"""
+import re
+import weakref
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from instrument import stage
+
+PRICE_KW    = ["harga","price","amount","cost","nilai","rate","web","shopee","tokped","tiktok","tokopedia"]
+ID_KW       = ["id","sku","kode","code","barcode","artikel","no","nomor","number","ref","item"]
+BRAND_KW    = ["brand","merk","merek","vendor","manufaktur","manufacturer"]
+KATEGORI_KW = ["kategori","category","cat","tipe","type","jenis","group","grup","divisi","kelas"]
+NAMA_KW     = ["nama","name","produk","product","item","title","judul","description","deskripsi"]
+
+KIND_KW = {
+    "price":    PRICE_KW,
+    "id":       ID_KW,
+    "brand":    BRAND_KW,
+    "kategori": KATEGORI_KW,
+    "nama":     NAMA_KW,
+}
+
+# Keyword generik: tetap dipakai tapi bobotnya lebih kecil dari keyword spesifik
+WEAK_KW = {"no", "number", "ref", "item", "rate", "nilai", "cat", "type", "group"}
+
+MIN_SCORE   = 0.5   # di bawah ini kolom dianggap tidak cocok
+SAMPLE_ROWS = 200   # jumlah nilai yang di-sampling per kolom
+
+_SPLIT_RE = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text):
+    """'Harga_Web (Rp)' → ('harga', 'web', 'rp')."""
+    return tuple(t for t in _SPLIT_RE.split(str(text).lower()) if t)
+
+
+# Index keyword per kind: set untuk exact match + list untuk prefix/fuzzy
+_KW_INDEX = {kind: (frozenset(kws), tuple(kws)) for kind, kws in KIND_KW.items()}
+
+
+@lru_cache(maxsize=4096)
+def _token_score(token, kind):
+    """
+    Skor satu token header terhadap keyword satu kind:
+    - 1.0 token sama persis dengan keyword (0.8 untuk keyword generik di WEAK_KW)
+    - 0.8 token diawali keyword (min 3 huruf), mis. 'kategori2', 'category' ← 'cat'
+    - ≤0.6 kemiripan fuzzy, hanya untuk token & keyword ≥4 huruf
+    Keyword pendek ('no', 'id') hanya cocok persis, jadi tidak menyangkut ke semua kolom.
+    """
+    exact, kws = _KW_INDEX[kind]
+    if token in exact:
+        return 0.8 if token in WEAK_KW else 1.0
+    best = 0.0
+    for kw in kws:
+        if len(kw) >= 3 and token.startswith(kw):
+            best = max(best, 0.6 if kw in WEAK_KW else 0.8)
+        elif len(kw) >= 4 and len(token) >= 4:
+            best = max(best, 0.6 * SequenceMatcher(None, token, kw).ratio())
+    return best
+
+
+@lru_cache(maxsize=512)
+def _header_scores(header_sig, kind):
+    """Skor semua header untuk satu kind; di-cache per signature header."""
+    return tuple(max((_token_score(t, kind) for t in normalize(c)), default=0.0) for c in header_sig)
+
+
+# ─── Profil nilai kolom ────────────────────────────────────────────────────────
+_PROFILES = {}  # id(df) → (weakref df, {kolom: profil})
+
+
+def _profile_series(s):
+    """Profil murah dari sampel nilai: rasio numerik, 'Rp', unik, jumlah kata, nomor urut."""
+    step   = max(1, len(s) // SAMPLE_ROWS)
+    sample = s.iloc[::step].dropna()
+    if sample.empty:
+        return None
+    txt = sample.astype(str).str.strip()
+    txt = txt[txt != ""]
+    if txt.empty:
+        return None
+    num = pd.to_numeric(txt.str.replace(",", "", regex=False).str.replace("Rp", "", regex=False).str.strip(),
+                        errors="coerce")
+    # Kolom nomor urut (1, 2, 3, ...): sampel ber-jarak sama → selisih konstan
+    vals = num.to_numpy(dtype="float64", na_value=np.nan)
+    diffs = np.diff(vals)
+    sequential = bool(len(vals) > 2 and not np.isnan(vals).any() and diffs[0] > 0 and (diffs == diffs[0]).all())
+    return {
+        "numeric":    float(num.notna().mean()),
+        "sequential": sequential,
+        "rp":         float(txt.str.contains("Rp", regex=False).mean()),
+        "unique":     txt.nunique() / len(txt),
+        "words":      float(txt.str.count(" ").mean()) + 1,
+    }
+
+
+def column_profiles(df):
+    """Profil nilai per kolom (None jika kolom kosong / frame hanya header)."""
+    key   = id(df)
+    entry = _PROFILES.get(key)
+    if entry is None or entry[0]() is not df:
+        entry = (weakref.ref(df, lambda _ref, k=key: _PROFILES.pop(k, None)), {})
+        _PROFILES[key] = entry
+    cache = entry[1]
+    missing = [c for c in df.columns if c not in cache] if len(df) else []
+    if missing:
+        with stage("detect", rows=len(df), cols=len(missing)):
+            for c in missing:
+                cache[c] = _profile_series(df[c])
+    return {c: cache.get(c) for c in df.columns}
+
+
+def classify(profile):
+    """Kelas kolom dari profil nilai: 'rownum', 'price', 'id', 'categorical', 'text' atau None."""
+    if profile is None:
+        return None
+    if profile["sequential"]:
+        return "rownum"
+    if profile["rp"] >= 0.5 or (profile["numeric"] >= 0.9 and profile["unique"] < 0.95):
+        return "price"
+    if profile["unique"] >= 0.95 and profile["words"] <= 2:
+        return "id"
+    if profile["unique"] <= 0.3 and profile["numeric"] < 0.5:
+        return "categorical"
+    if profile["numeric"] < 0.5:
+        return "text"
+    return None
+
+
+# Penyesuaian skor berdasarkan kelas nilai (kind → {kelas: bonus/penalti})
+_VALUE_ADJ = {
+    "price":    {"price": 0.3, "id": -0.1, "rownum": -0.5, "categorical": -0.5, "text": -0.5},
+    "id":       {"id": 0.3, "rownum": -0.3, "price": -0.3, "categorical": -0.4, "text": -0.2},
+    "brand":    {"categorical": 0.2, "price": -0.5, "id": -0.3},
+    "kategori": {"categorical": 0.2, "price": -0.5, "id": -0.3},
+    "nama":     {"text": 0.3, "price": -0.5, "categorical": -0.1},
+}
+
+
+def score_columns(df, kind):
+    """Skor akhir tiap kolom untuk satu kind: header + penyesuaian dari sampel nilai."""
+    cols   = list(df.columns)
+    scores = np.array(_header_scores(tuple(map(str, cols)), kind if kind in KIND_KW else "price"))
+    adj    = _VALUE_ADJ.get(kind, {})
+    if len(df) and adj:
+        profiles = column_profiles(df)
+        scores = scores + np.array([adj.get(classify(profiles[c]), 0.0) for c in cols])
+    return dict(zip(cols, scores))
+
+
+def auto_detect(df, kind="price"):
+    """5 kolom kandidat teratas untuk satu kind, urut skor tertinggi."""
+    scores = score_columns(df, kind)
+    return sorted(scores, key=lambda c: scores[c], reverse=True)[:5]
+
+
+def best_col(df, kind):
+    """Return nama kolom yang paling cocok untuk kind, atau None jika tidak ada yang cukup mirip."""
+    scores = score_columns(df, kind)
+    if not scores: return None
+    col = max(scores, key=scores.get)
+    return col if scores[col] >= MIN_SCORE else None
+
+
+def detect_info_cols(df):
+    """
+    Auto-detect kolom SKU, Nama, Brand, Kategori dari Portal.
+    Satu kolom hanya dipakai untuk satu info (kind dengan skor tertinggi menang).
+    """
+    kinds = {"SKU/ID": "id", "Nama Produk": "nama", "Brand": "brand", "Kategori": "kategori"}
+    cands = []
+    for info, kind in kinds.items():
+        for col, sc in score_columns(df, kind).items():
+            if sc >= MIN_SCORE:
+                cands.append((sc, info, col))
+
+    out, taken = {info: None for info in kinds}, set()
+    for sc, info, col in sorted(cands, key=lambda x: x[0], reverse=True):
+        if out[info] is None and col not in taken:
+            out[info] = col
+            taken.add(col)
+    return out
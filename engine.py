@@ -0,0 +1,581 @@
+"""
+Engine perbandingan harga Portal vs Omni (tanpa Streamlit).
+
+Dipakai oleh UI Streamlit (marketplace_comparison.py) dan oleh CLI/batch (cli.py):
+deteksi kolom, join (join.py), resolusi kolom pasangan (_Portal/_Omni), status dan
+statistik. Export hasil ada di export.py.
+"""
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from detect import auto_detect, best_col, detect_info_cols  # noqa: F401  (re-export untuk UI/CLI)
+from instrument import stage
+from jobs import JobCancelled
+from join import join_frames, gather, normalize_keys, DEFAULT_KEY_OPTS
+from result_cache import shared_cache
+from result_store import occurrence
+
+# ─── Status ────────────────────────────────────────────────────────────────────
+# Status disimpan sebagai kode int8, label hanya untuk tampilan
+ST_SAMA, ST_PORTAL_MAHAL, ST_OMNI_MAHAL, ST_KOSONG_P, ST_KOSONG_O, ST_KOSONG_BOTH, ST_TIDAK_ADA = range(7)
+STATUS_LABELS = np.array([
+    "Sama",
+    "Tidak Sama - Portal Lebih Mahal",
+    "Tidak Sama - Omni Lebih Mahal",
+    "Data Kosong (Portal kosong)",
+    "Data Kosong (Omni kosong)",
+    "Data Kosong (Portal & Omni)",
+    "Tidak Ada di Omni",
+], dtype=object)
+
+def parse_price(series):
+    """
+    Parse satu kolom harga sekaligus (vectorized) ke float64.
+    - "Rp", pemisah ribuan (,) dan spasi dibuang
+    - blank/NaN/0/teks tidak valid = kosong → NaN
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        vals = series.to_numpy(dtype="float64", na_value=np.nan, copy=True)
+    else:
+        s = (series.astype("string")
+                   .str.replace(",", "", regex=False)
+                   .str.replace("Rp", "", regex=False)
+                   .str.strip())
+        vals = pd.to_numeric(s, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    vals[vals == 0] = np.nan
+    return vals
+
+def compute_status(portal_vals, omni_vals, b_exists):
+    """
+    Hitung status untuk semua baris sekaligus dari harga hasil parse_price.
+    - NaN = kosong, dicek DULU sebelum bandingkan
+    - b_exists False = produk tidak ada di Omni sama sekali (LEFT JOIN)
+    - Return (kode status int8, selisih float64); selisih selalu positif, NaN jika tidak dibandingkan
+    Harga boleh 1-D (satu pasangan) atau matriks 2-D baris × pasangan (semua pasangan sekaligus).
+    """
+    portal_vals = np.asarray(portal_vals, dtype="float64")
+    omni_vals   = np.asarray(omni_vals, dtype="float64")
+    exists      = np.asarray(b_exists, dtype=bool)
+    if portal_vals.ndim == 2 and exists.ndim == 1:
+        exists = exists[:, None]
+    portal_kos  = np.isnan(portal_vals)
+    omni_kos    = np.isnan(omni_vals)
+
+    codes = np.select(
+        [~exists, portal_kos & omni_kos, portal_kos, omni_kos, portal_vals > omni_vals, portal_vals < omni_vals],
+        [ST_TIDAK_ADA, ST_KOSONG_BOTH, ST_KOSONG_P, ST_KOSONG_O, ST_PORTAL_MAHAL, ST_OMNI_MAHAL],
+        default=ST_SAMA,
+    ).astype(np.int8)
+
+    selisih = np.where(exists, np.abs(portal_vals - omni_vals), np.nan)
+    return codes, selisih
+
+# Perubahan status dibanding snapshot run sebelumnya (lihat result_store.py)
+DELTA_TETAP, DELTA_BARU_BEDA, DELTA_DIPERBAIKI, DELTA_BARU_HILANG, DELTA_SKU_BARU, DELTA_LAIN = range(6)
+DELTA_LABELS = np.array([
+    "Tetap",
+    "Baru Tidak Sama",
+    "Diperbaiki (Baru Sama)",
+    "Baru Tidak Ada di Omni",
+    "SKU Baru",
+    "Status Lain Berubah",
+], dtype=object)
+
+def _same_price(a, b):
+    """a == b dengan NaN == NaN (harga kosong di kedua run dianggap sama)."""
+    return (a == b) | (np.isnan(a) & np.isnan(b))
+
+def compute_status_incremental(keys, portal_vals, omni_vals, b_exists, snap):
+    """
+    Status + delta dibanding snapshot run sebelumnya. Harga tetap di-parse untuk
+    semua baris (perlu untuk mendeteksi perubahan) dan selisih dihitung untuk
+    semua baris (satu operasi vektor); yang dipakai ulang hanya kode status
+    baris yang harga Portal/Omni dan keberadaannya di Omni tidak berubah.
+    Baris dicocokkan per (key, nomor kemunculan): SKU duplikat di Portal
+    dibandingkan dengan baris duplikat yang sama urutannya di snapshot.
+    Return (kode status, selisih, kode delta, jumlah baris yang status-nya dihitung ulang).
+    """
+    portal_vals = np.asarray(portal_vals, dtype="float64")
+    omni_vals   = np.asarray(omni_vals, dtype="float64")
+    exists      = np.asarray(b_exists, dtype=bool)
+
+    keys    = pd.array(keys, dtype="string")
+    pos     = (pd.MultiIndex.from_arrays([snap["key"], snap["occ"]])
+               .get_indexer(pd.MultiIndex.from_arrays([keys, occurrence(keys)])))
+    known   = pos >= 0
+    prev_st = gather(snap["status"].to_numpy(dtype=np.int8), pos, -1)
+    same    = (known
+               & _same_price(portal_vals, gather(snap["portal"].to_numpy(), pos, np.nan))
+               & _same_price(omni_vals, gather(snap["omni"].to_numpy(), pos, np.nan))
+               & (exists == (prev_st != ST_TIDAK_ADA)))
+
+    codes = prev_st.astype(np.int8)
+    redo  = ~same
+    codes[redo], _ = compute_status(portal_vals[redo], omni_vals[redo], exists[redo])
+    selisih = np.abs(portal_vals - omni_vals)
+    selisih[~exists] = np.nan
+
+    beda      = (ST_PORTAL_MAHAL, ST_OMNI_MAHAL)
+    was_beda  = np.isin(prev_st, beda)
+    now_beda  = np.isin(codes, beda)
+    hilang    = (codes == ST_TIDAK_ADA) & (prev_st != ST_TIDAK_ADA)
+    delta     = np.full(len(codes), DELTA_TETAP, dtype=np.int8)
+    delta[known & (codes != prev_st)]             = DELTA_LAIN
+    delta[known & now_beda & ~was_beda]           = DELTA_BARU_BEDA
+    delta[known & (codes == ST_SAMA) & was_beda]  = DELTA_DIPERBAIKI
+    delta[known & hilang]                         = DELTA_BARU_HILANG
+    delta[~known]                                 = DELTA_SKU_BARU
+    return codes, selisih, delta, int(redo.sum())
+
+def delta_stats(delta, n_redo):
+    """Ringkasan perubahan sejak run terakhir."""
+    counts = np.bincount(delta, minlength=len(DELTA_LABELS))
+    return {
+        "baru_beda":    int(counts[DELTA_BARU_BEDA]),
+        "diperbaiki":   int(counts[DELTA_DIPERBAIKI]),
+        "baru_hilang":  int(counts[DELTA_BARU_HILANG]),
+        "sku_baru":     int(counts[DELTA_SKU_BARU]),
+        "lain":         int(counts[DELTA_LAIN]),
+        "dihitung":     n_redo,
+    }
+
+# Pilihan filter → kode status yang termasuk (None = semua baris)
+FILTER_CODES = {
+    "Semua":                       None,
+    "Sama":                        (ST_SAMA,),
+    "Tidak Sama":                  (ST_PORTAL_MAHAL, ST_OMNI_MAHAL),
+    "Portal Lebih Mahal":          (ST_PORTAL_MAHAL,),
+    "Omni Lebih Mahal":            (ST_OMNI_MAHAL,),
+    "Data Kosong":                 (ST_KOSONG_P, ST_KOSONG_O, ST_KOSONG_BOTH),
+    "Data Kosong (Portal kosong)": (ST_KOSONG_P,),
+    "Data Kosong (Omni kosong)":   (ST_KOSONG_O,),
+    "Data Kosong (Keduanya)":      (ST_KOSONG_BOTH,),
+    "Tidak Ada di Omni":           (ST_TIDAK_ADA,),
+}
+FILTER_OPTS = list(FILTER_CODES)
+
+def status_categorical(codes):
+    """Kode int8 → pd.Categorical berlabel (tanpa membuat string per baris)."""
+    return pd.Categorical.from_codes(codes, categories=STATUS_LABELS)
+
+def build_status_index(codes):
+    """
+    Posisi baris per pilihan FILTER_OPTS, dihitung sekali per analisis.
+    Satu stable argsort (radix untuk int8) lalu dipotong per kode; urutan baris asli tetap.
+    """
+    codes  = np.asarray(codes)
+    dtype  = np.int32 if len(codes) < 2**31 else np.int64
+    order  = np.argsort(codes, kind="stable").astype(dtype)
+    counts = np.bincount(codes, minlength=len(STATUS_LABELS))
+    per_code = np.split(order, np.cumsum(counts)[:-1])
+
+    index = {}
+    for opt, opt_codes in FILTER_CODES.items():
+        if opt_codes is None:
+            continue
+        parts = [per_code[c] for c in opt_codes]
+        index[opt] = parts[0] if len(parts) == 1 else np.sort(np.concatenate(parts))
+    return index
+
+def filter_positions(n_rows, status_idx, sel):
+    """Posisi baris untuk pilihan FILTER_OPTS ("Semua" → semua baris)."""
+    if sel not in status_idx:
+        return np.arange(n_rows)
+    return status_idx[sel]
+
+# ─── Merge & evaluasi pasangan ─────────────────────────────────────────────────
+@dataclass
+class ComparisonResult:
+    """Hasil satu analisis: frame gabungan + statistik & info kolom per pasangan."""
+    merged:      pd.DataFrame
+    results:     dict
+    pairs_info:  list
+    id_col_a:    str
+    info_cols:   dict
+    skipped:     list = field(default_factory=list)
+    join_report: dict = field(default_factory=dict)  # hasil normalisasi key & duplikat (lihat join.py)
+    exports:     dict = field(default_factory=dict)  # format → bytes file download (lihat export.py)
+    views:       dict = field(default_factory=dict)  # (label, filter, search, sort) → posisi baris (lihat table_view.py)
+    suggestions: pd.DataFrame = None                 # saran pencocokan nama untuk "Tidak Ada di Omni" (lihat fuzzy_match.py)
+    cubes:       pd.DataFrame = None                 # agregat status & selisih per Pasangan × Brand × Kategori (lihat build_cube)
+
+
+def unique(seq):
+    """Deduplikasi list tapi jaga urutan."""
+    return list(dict.fromkeys(seq))
+
+
+def info_columns(df_a, info_cols_raw=None):
+    """Kolom info produk (SKU/Nama/Brand/Kategori) yang terdeteksi dan ada di Portal."""
+    info_cols_raw = info_cols_raw if info_cols_raw is not None else detect_info_cols(df_a)
+    return info_cols_raw, unique(v for v in info_cols_raw.values() if v and v in df_a.columns)
+
+
+def required_columns(id_col_a, id_col_b, pairs, info_col_vals=()):
+    """Kolom yang perlu dibaca dari Portal & Omni untuk analisis ini."""
+    cols_a = unique([id_col_a] + list(info_col_vals) + [p[0] for p in pairs])
+    cols_b = unique([id_col_b] + [p[1] for p in pairs])
+    return cols_a, cols_b
+
+
+def resolve_pair_cols(col_a, col_b, merged, cols_a, cols_b, id_col_a, id_col_b):
+    """
+    Nama kolom pasangan setelah merge: kolom yang namanya sama di kedua file
+    dapat suffix _Portal/_Omni. Return (col_a_m, col_b_m) atau None jika tidak ada.
+    """
+    col_a_m = col_a + "_Portal" if (col_a in cols_b and col_a != id_col_b) else col_a
+    col_b_m = col_b + "_Omni"   if (col_b in cols_a and col_b != id_col_a) else col_b
+    if col_a_m not in merged.columns: col_a_m = col_a
+    if col_b_m not in merged.columns: col_b_m = col_b
+    if col_a_m not in merged.columns or col_b_m not in merged.columns:
+        return None
+    return col_a_m, col_b_m
+
+
+def status_stats(codes):
+    """Statistik satu pasangan dari kode status (satu pass bincount)."""
+    counts       = np.bincount(np.asarray(codes), minlength=len(STATUS_LABELS))
+    sama_n       = int(counts[ST_SAMA])
+    portal_mahal = int(counts[ST_PORTAL_MAHAL])
+    omni_mahal   = int(counts[ST_OMNI_MAHAL])
+    tidak_sama_n = portal_mahal + omni_mahal
+    kosong_p     = int(counts[ST_KOSONG_P])
+    kosong_o     = int(counts[ST_KOSONG_O])
+    kosong_both  = int(counts[ST_KOSONG_BOTH])
+    kosong_n     = kosong_p + kosong_o + kosong_both
+    tidak_ada_n  = int(counts[ST_TIDAK_ADA])
+    valid_n      = sama_n + tidak_sama_n
+    pct_sama     = (sama_n / valid_n * 100) if valid_n > 0 else 0.0
+    pct_beda     = (tidak_sama_n / valid_n * 100) if valid_n > 0 else 0.0
+
+    return {
+        "total": int(counts.sum()), "valid": valid_n,
+        "sama": sama_n, "pct_sama": pct_sama,
+        "tidak_sama": tidak_sama_n, "pct_beda": pct_beda,
+        "portal_mahal": portal_mahal, "omni_mahal": omni_mahal,
+        "kosong": kosong_n, "kosong_p": kosong_p,
+        "kosong_o": kosong_o, "kosong_both": kosong_both,
+        "tidak_ada": tidak_ada_n,
+    }
+
+
+# ─── Analitik per Brand / Kategori ────────────────────────────────────────────
+CUBE_DIMS     = ["Brand", "Kategori"]   # kunci info_cols yang dipakai sebagai dimensi cube
+CUBE_BLANK    = "(kosong)"
+CUBE_MEASURES = ["Total", "Sama", "Portal Lebih Mahal", "Omni Lebih Mahal", "Data Kosong", "Tidak Ada di Omni",
+                 "Selisih (Rp)"]
+
+
+def build_cube(dims, pair_codes):
+    """
+    Agregat satu kali per analisis: jumlah baris per status + total selisih (Rp)
+    per (Pasangan, nilai dimensi). dims = {nama: Series sejajar baris hasil};
+    pair_codes = [(label, kode status, selisih), ...]. Satu bincount per pasangan
+    di atas id grup gabungan — hanya kombinasi yang muncul yang disimpan.
+    """
+    n = len(next(iter(dims.values())))
+    g = np.zeros(n, dtype=np.int64)
+    levels = []
+    for s in dims.values():
+        codes, uniq = pd.factorize(s)
+        codes = np.where(codes < 0, len(uniq), codes)  # NaN → "(kosong)"
+        g = g * (len(uniq) + 1) + codes
+        levels.append(np.append(np.asarray(uniq, dtype=object).astype(str), CUBE_BLANK))
+    g, groups = pd.factorize(g)
+    n_groups, n_status = len(groups), len(STATUS_LABELS)
+
+    # Nilai dimensi per grup: urai kembali id gabungan (mixed radix)
+    dim_vals, rem = [], groups
+    for lv in reversed(levels):
+        dim_vals.append(lv[rem % len(lv)])
+        rem = rem // len(lv)
+    dim_vals.reverse()
+
+    frames = []
+    for label, codes, selisih in pair_codes:
+        counts = np.bincount(g * n_status + codes, minlength=n_groups * n_status).reshape(n_groups, n_status)
+        # Dibulatkan per baris (Rupiah utuh, seperti kolom selisih di hasil ringkas) sebelum dijumlah
+        gap    = np.bincount(g, weights=np.round(np.nan_to_num(np.asarray(selisih, dtype="float64"))), minlength=n_groups)
+        frames.append(pd.DataFrame({
+            "Pasangan": label,
+            **{name: vals for name, vals in zip(dims, dim_vals)},
+            "Total":              counts.sum(axis=1),
+            "Sama":               counts[:, ST_SAMA],
+            "Portal Lebih Mahal": counts[:, ST_PORTAL_MAHAL],
+            "Omni Lebih Mahal":   counts[:, ST_OMNI_MAHAL],
+            "Data Kosong":        counts[:, [ST_KOSONG_P, ST_KOSONG_O, ST_KOSONG_BOTH]].sum(axis=1),
+            "Tidak Ada di Omni":  counts[:, ST_TIDAK_ADA],
+            "Selisih (Rp)":       gap.astype(np.int64),
+        }))
+    cube = pd.concat(frames, ignore_index=True)
+    for c in ["Pasangan", *dims]:
+        cube[c] = cube[c].astype("category")
+    return cube
+
+
+def cube_rollup(cube, by, pair=None):
+    """
+    Agregat ulang cube ke dimensi `by` (list kolom cube), opsional satu pasangan saja.
+    Hanya membaca cube (ratusan–ribuan baris), bukan baris hasil. + kolom Tidak Sama & % Tidak Sama.
+    """
+    df  = cube if pair is None else cube[cube["Pasangan"] == pair]
+    out = df.groupby(by, observed=True, sort=False)[CUBE_MEASURES].sum().reset_index()
+    tidak_sama = out["Portal Lebih Mahal"] + out["Omni Lebih Mahal"]
+    valid      = out["Sama"] + tidak_sama
+    out.insert(len(by) + 2, "Tidak Sama", tidak_sama)
+    out["% Tidak Sama"] = np.where(valid > 0, tidak_sama / valid.where(valid > 0, 1) * 100, 0.0).round(1)
+    return out
+
+
+def compare_frames(df_a_sel, df_b_sel, id_col_a, id_col_b, pairs, info_cols_raw=None,
+                   key_opts=None, dup_policy="first", store=None, portal_keys=None, catalog=None):
+    """
+    Jalankan analisis lengkap dari kolom Portal/Omni yang sudah dipilih.
+    pairs = [(kolom_portal, kolom_omni, label), ...]; pasangan yang kolomnya
+    tidak ditemukan dilewati dan dicatat di result.skipped.
+    key_opts / dup_policy diteruskan ke join.join_frames.
+    store (result_store.ResultStore, opsional): laporan delta dibanding snapshot
+    run sebelumnya (status baris yang tidak berubah dipakai ulang). Snapshot hanya
+    diganti jika data run ini berbeda; Run ulang dengan data yang sama tetap
+    dibandingkan dengan run sebelum itu.
+    portal_keys: hasil index_portal (dipakai ulang oleh compare_many).
+    catalog (reference_catalog.ReferenceCatalog, opsional): sisi Omni diambil dari
+    katalog referensi alih-alih df_b_sel (boleh None); key_opts/dup_policy katalog
+    yang berlaku (ditetapkan saat katalog dibangun).
+
+    Tiga tahap publik (juga dipakai bench.py): merge_pairs → evaluate_pairs → assemble_result.
+    """
+    merged, b_exists, join_report, keys_a, resolved, skipped = merge_pairs(
+        df_a_sel, df_b_sel, id_col_a, id_col_b, pairs, key_opts=key_opts, dup_policy=dup_policy,
+        portal_keys=portal_keys, catalog=catalog)
+    evaluated = evaluate_pairs(merged, b_exists, resolved, keys_a, store=store)
+    info_cols_raw = info_cols_raw if info_cols_raw is not None else detect_info_cols(df_a_sel)
+    return assemble_result(merged, evaluated, id_col_a, info_cols_raw, join_report, skipped)
+
+
+def merge_pairs(df_a_sel, df_b_sel, id_col_a, id_col_b, pairs, key_opts=None, dup_policy="first",
+                portal_keys=None, catalog=None):
+    """
+    Tahap join: gabungkan Portal dengan Omni (file atau katalog) lalu cari nama
+    kolom tiap pasangan di frame gabungan.
+    Return (merged, b_exists, join_report, keys_a, resolved, skipped);
+    resolved = [(kolom_portal_m, kolom_omni_m, label), ...], skipped = label yang kolomnya tidak ada.
+    """
+    if catalog is not None:
+        cols_b = set([id_col_b] + [p[1] for p in pairs]) & set(catalog.columns)
+        merged, b_exists, join_report, keys_a = catalog.join(df_a_sel, id_col_a, sorted(cols_b), keys_a=portal_keys)
+    else:
+        merged, b_exists, join_report, keys_a = join_frames(
+            df_a_sel, df_b_sel, id_col_a, id_col_b, key_opts=key_opts, dup_policy=dup_policy,
+            agg_cols=unique(p[1] for p in pairs), parse=parse_price, keys_a=portal_keys)
+        cols_b = set(df_b_sel.columns)
+    cols_a = set(df_a_sel.columns)
+
+    resolved, skipped = [], []
+    for col_a, col_b, label in pairs:
+        cols = resolve_pair_cols(col_a, col_b, merged, cols_a, cols_b, id_col_a, id_col_b)
+        if cols is None:
+            skipped.append(label)
+            continue
+        resolved.append((*cols, label))
+    return merged, b_exists, join_report, keys_a, resolved, skipped
+
+
+def evaluate_pairs(merged, b_exists, resolved, keys_a=None, store=None):
+    """
+    Tahap status: parse harga + kode status & selisih per pasangan (dan delta jika ada store).
+    Return list dict per pasangan: label, kolom, portal, omni, codes, selisih, delta, n_redo.
+    """
+    # Parse tiap kolom harga sekali saja, walau dipakai beberapa pasangan
+    with stage("status", rows=len(merged), pairs=len(resolved)):
+        parsed = {c: parse_price(merged[c]) for c in unique(c for p in resolved for c in p[:2])}
+        snaps  = {label: store.load(label) for _, _, label in resolved} if store is not None else {}
+
+        # Semua pasangan tanpa snapshot dievaluasi sekaligus sebagai matriks baris × pasangan
+        full = [j for j, (_, _, label) in enumerate(resolved) if snaps.get(label) is None or not len(snaps[label])]
+        if full:
+            codes_m, selisih_m = compute_status(np.column_stack([parsed[resolved[j][0]] for j in full]),
+                                                np.column_stack([parsed[resolved[j][1]] for j in full]),
+                                                b_exists)
+        matrix_col = {j: k for k, j in enumerate(full)}
+
+    out = []
+    for j, (col_a_m, col_b_m, label) in enumerate(resolved):
+        portal_v, omni_v = parsed[col_a_m], parsed[col_b_m]
+        n_redo = None
+        with stage(f"status[{label}]", rows=len(merged)) as rec:
+            if j in matrix_col:
+                k = matrix_col[j]
+                codes, selisih, delta = np.ascontiguousarray(codes_m[:, k]), selisih_m[:, k], None
+            else:
+                codes, selisih, delta, n_redo = compute_status_incremental(keys_a, portal_v, omni_v, b_exists, snaps[label])
+            if store is not None and not store.save(label, keys_a, portal_v, omni_v, codes) and delta is not None:
+                # Data sama persis dengan snapshot terakhir (Run diulang): delta dibanding run sebelum itu
+                prev = store.load(label, previous=True)
+                if prev is not None and len(prev):
+                    codes, selisih, delta, n_redo = compute_status_incremental(keys_a, portal_v, omni_v, b_exists, prev)
+            if delta is not None:
+                rec["recomputed"] = n_redo
+        out.append({"label": label, "portal": portal_v, "omni": omni_v, "codes": codes,
+                    "selisih": selisih, "delta": delta, "n_redo": n_redo})
+    return out
+
+
+def assemble_result(merged, evaluated, id_col_a, info_cols_raw, join_report=None, skipped=None):
+    """
+    Tahap stats: statistik & index filter per pasangan, kolom hasil ditempel ke
+    merged (satu concat), lalu cube Brand/Kategori → ComparisonResult.
+    """
+    results    = {}
+    pairs_info = []  # simpan info kolom per pair untuk tabel
+    pair_codes = []  # (label, kode status, selisih) untuk cube Brand/Kategori
+
+    block = {}  # semua kolom hasil, ditempel ke merged dengan satu concat
+    for ev in evaluated:
+        label, codes, delta = ev["label"], ev["codes"], ev["delta"]
+        harga_portal_col = f"[{label}] Harga Portal"
+        harga_omni_col   = f"[{label}] Harga Omni"
+        status_col       = f"[{label}] Status"
+        selisih_col      = f"[{label}] Selisih (Rp)"
+
+        block[harga_portal_col] = ev["portal"]
+        block[harga_omni_col]   = ev["omni"]
+        block[status_col]       = status_categorical(codes)
+        block[selisih_col]      = ev["selisih"]
+
+        delta_col = None
+        if delta is not None:
+            delta_col = f"[{label}] Perubahan"
+            block[delta_col] = pd.Categorical.from_codes(delta, categories=DELTA_LABELS)
+
+        with stage(f"stats[{label}]", rows=len(merged)):
+            results[label] = status_stats(codes)
+            if delta is not None:
+                results[label]["delta"] = delta_stats(delta, ev["n_redo"])
+            status_idx = build_status_index(codes)
+        pair_codes.append((label, codes, ev["selisih"]))
+        pairs_info.append({
+            "label":       label,
+            "id_col":      id_col_a,
+            "portal_col":  harga_portal_col,
+            "omni_col":    harga_omni_col,
+            "status_col":  status_col,
+            "selisih_col": selisih_col,
+            "delta_col":   delta_col,
+            "status_idx":  status_idx,
+        })
+
+    if block:
+        merged = pd.concat([merged.drop(columns=[c for c in block if c in merged.columns]),
+                            pd.DataFrame(block, index=merged.index)], axis=1)
+
+    # Pastikan kolom info yang terdeteksi ada di merged
+    info_cols_valid = {k: v for k, v in info_cols_raw.items() if v and v in merged.columns}
+
+    cubes = None
+    dims  = {d: merged[info_cols_valid[d]] for d in CUBE_DIMS if d in info_cols_valid}
+    if dims and pair_codes:
+        with stage("cubes", rows=len(merged), pairs=len(pair_codes)) as rec:
+            cubes = build_cube(dims, pair_codes)
+            rec["groups"] = len(cubes)
+    return ComparisonResult(merged, results, pairs_info, id_col_a, info_cols_valid, list(skipped or []),
+                            join_report=join_report or {}, cubes=cubes)
+
+
+# ─── Satu Portal vs banyak file ───────────────────────────────────────────────
+@dataclass
+class MultiComparison:
+    """Hasil satu Portal vs banyak file target: nama file → ComparisonResult (urutan input)."""
+    targets: dict
+    failed:  dict = field(default_factory=dict)  # nama file → pesan error
+    exports: dict = field(default_factory=dict)  # format → bytes workbook gabungan (lihat export.py)
+
+
+def index_portal(df_a_sel, id_col_a, key_opts=None):
+    """Key Portal ter-normalisasi, dihitung sekali lalu dipakai untuk setiap file target."""
+    with stage("normalize[Portal]", rows=len(df_a_sel)):
+        return normalize_keys(df_a_sel[id_col_a].reset_index(drop=True), **{**DEFAULT_KEY_OPTS, **(key_opts or {})})
+
+
+def compare_many(df_a_sel, targets, id_col_a, info_cols_raw=None, key_opts=None, dup_policy="first", workers=None):
+    """
+    Bandingkan satu Portal dengan banyak file target.
+    targets = [{"name", "df", "id_col", "pairs", "store" (opsional)}, ...]; df_a_sel harus
+    berisi kolom Portal untuk semua target. Target dikerjakan paralel di thread pool;
+    target yang error dicatat di result.failed, target lain tetap jalan.
+    """
+    portal_keys = index_portal(df_a_sel, id_col_a, key_opts)
+
+    def one(t):
+        return compare_frames(df_a_sel, t["df"], id_col_a, t["id_col"], t["pairs"], info_cols_raw,
+                              key_opts=key_opts, dup_policy=dup_policy, store=t.get("store"),
+                              portal_keys=portal_keys)
+
+    out = MultiComparison({})
+    with ThreadPoolExecutor(max_workers=workers or min(len(targets), os.cpu_count() or 1) or 1) as pool:
+        # Konteks (trace/job aktif) ikut ke thread target: satu salinan per thread
+        futures = [(t["name"], pool.submit(contextvars.copy_context().run, one, t)) for t in targets]
+        for name, fut in futures:
+            try:
+                out.targets[name] = fut.result()
+            except JobCancelled:
+                raise  # pembatalan job berlaku untuk semua target, bukan kegagalan satu file
+            except Exception as e:
+                out.failed[name] = str(e)
+    return out
+
+
+# ─── Hasil ringkas (untuk disimpan lama / dibagi antar session) ──────────────
+def _rupiah_array(vals):
+    """Harga float → Int64 (Rupiah utuh, NA = kosong); tetap float jika ada pecahan."""
+    vals   = np.asarray(vals, dtype="float64")
+    finite = np.isfinite(vals)
+    if not np.array_equal(vals[finite], np.round(vals[finite])) or (finite.any() and np.abs(vals[finite]).max() >= 2**53):
+        return vals
+    out = np.zeros(len(vals), dtype=np.int64)
+    out[finite] = vals[finite]
+    return pd.arrays.IntegerArray(out, ~finite)
+
+
+def compact_result(result):
+    """
+    Ringkas frame hasil di tempat: hanya kolom yang ditampilkan/di-export
+    (ID, info produk, kolom hasil per pasangan); ID & info jadi categorical,
+    harga & selisih jadi Int64 Rupiah. Kolom harga mentah dibuang.
+    """
+    with stage("compact", rows=len(result.merged)):
+        return _compact(result)
+
+
+def _compact(result):
+    merged = result.merged
+    text_cols = unique([result.id_col_a] + [v for v in result.info_cols.values() if v in merged.columns])
+    out_cols  = [c for info in result.pairs_info
+                 for c in (info["portal_col"], info["omni_col"], info["status_col"], info["selisih_col"], info.get("delta_col"))
+                 if c in merged.columns]
+
+    data = {}
+    for c in unique(text_cols + out_cols):
+        col = merged[c]
+        if c in text_cols and not isinstance(col.dtype, pd.CategoricalDtype):
+            data[c] = col.astype("category")
+        elif pd.api.types.is_float_dtype(col.dtype):
+            data[c] = _rupiah_array(col.to_numpy())
+        else:
+            data[c] = col
+    result.merged = pd.DataFrame(data, index=pd.RangeIndex(len(merged)))
+    with shared_cache().derived:
+        result.views.clear()
+    return result
+
+
+def run_comparison(df_a, df_b, id_col_a, id_col_b, pairs, **join_opts):
+    """Analisis dari frame Portal/Omni utuh (deteksi kolom info + pilih kolom + compare)."""
+    info_cols_raw, info_col_vals = info_columns(df_a)
+    cols_a, cols_b = required_columns(id_col_a, id_col_b, pairs, info_col_vals)
+    return compare_frames(df_a[cols_a], df_b[cols_b], id_col_a, id_col_b, pairs, info_cols_raw, **join_opts)
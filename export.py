@@ -0,0 +1,311 @@
+"""
+Export hasil analisis: xlsx (streaming, constant memory), CSV ter-zip, Parquet.
+
+Sheet detail ditulis per chunk baris langsung dari frame hasil (tanpa copy
+seluruh frame). File untuk download dibuat hanya saat diminta dan di-cache di
+ComparisonResult.exports, jadi rerun Streamlit tidak membangunnya ulang.
+"""
+import io
+import os
+import re
+import zipfile
+
+import pandas as pd
+
+from engine import unique, cube_rollup, MultiComparison, CUBE_DIMS
+from instrument import stage
+from result_cache import shared_cache
+
+EXPORT_CHUNK_ROWS = 20000
+
+# format → (nama file download, mime)
+EXPORT_FORMATS = {
+    "xlsx":        ("hasil_perbandingan_harga.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv.zip":     ("hasil_perbandingan_harga_csv.zip", "application/zip"),
+    "parquet.zip": ("hasil_perbandingan_harga_parquet.zip", "application/zip"),
+}
+
+SUMMARY_SHEET = "Ringkasan"
+SUGGEST_SHEET = "Saran Nama"   # saran fuzzy_match untuk "Tidak Ada di Omni", hanya jika sudah dihitung
+CUBE_SHEET    = "Analitik"     # mismatch & selisih per Pasangan × Brand × Kategori (engine.build_cube)
+
+_BAD_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+
+def _delta_summary(r):
+    """Kolom ringkasan perubahan sejak run terakhir (hanya jika ada snapshot sebelumnya)."""
+    d = r.get("delta")
+    if not d:
+        return {}
+    return {
+        "Baru Tidak Sama":        d["baru_beda"],
+        "Diperbaiki (Baru Sama)": d["diperbaiki"],
+        "Baru Tidak Ada di Omni": d["baru_hilang"],
+        "SKU Baru":               d["sku_baru"],
+    }
+
+
+def _parts(result):
+    """[(nama file target atau None, ComparisonResult)] — satu hasil biasa atau MultiComparison."""
+    if isinstance(result, MultiComparison):
+        return list(result.targets.items())
+    return [(None, result)]
+
+
+def _stem(name):
+    return os.path.splitext(os.path.basename(str(name)))[0]
+
+
+def _n_rows(result):
+    return sum(len(r.merged) for _, r in _parts(result))
+
+
+def summary(result):
+    """Ringkasan semua pasangan; untuk banyak file target ada kolom "File" di depan."""
+    frames = []
+    for name, r in _parts(result):
+        df = summary_frame(r.results)
+        if name is not None:
+            df.insert(0, "File", name)
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def summary_frame(results):
+    """Sheet ringkasan: satu baris per pasangan."""
+    return pd.DataFrame([{
+        "Marketplace":         lbl,
+        "Total Produk Portal": r["total"],
+        "Data Valid":          r["valid"],
+        "Sama":                r["sama"],
+        "% Sama":              f"{r['pct_sama']:.2f}%",
+        "Tidak Sama":          r["tidak_sama"],
+        "% Tidak Sama":        f"{r['pct_beda']:.2f}%",
+        "Portal Lebih Mahal":  r["portal_mahal"],
+        "Omni Lebih Mahal":    r["omni_mahal"],
+        "Data Kosong":         r["kosong"],
+        "Kosong (Portal)":     r["kosong_p"],
+        "Kosong (Omni)":       r["kosong_o"],
+        "Kosong (Keduanya)":   r["kosong_both"],
+        "Tidak Ada di Omni":   r["tidak_ada"],
+        **_delta_summary(r),
+    } for lbl, r in results.items()])
+
+
+def _sheet_name(label, taken):
+    """Nama sheet Excel valid (maks 31 karakter, tanpa []:*?/\\) dan unik."""
+    base = _BAD_SHEET_CHARS.sub("_", str(label)).strip("'")[:31] or "Sheet"
+    name, n = base, 1
+    while name.lower() in taken:
+        n += 1
+        suffix = f" ({n})"
+        name = base[:31 - len(suffix)] + suffix
+    taken.add(name.lower())
+    return name
+
+
+def _reserved_sheets():
+    """Set nama sheet terpakai awal: sheet tetap yang tidak boleh dipakai pasangan."""
+    return {SUMMARY_SHEET.lower(), SUGGEST_SHEET.lower(), CUBE_SHEET.lower()}
+
+
+def pair_sheets(result, taken=None):
+    """
+    Yield (nama sheet, frame hasil, kolom sumber, header output) per pasangan
+    (per file target lalu per pasangan untuk MultiComparison).
+    Kolom info di-rename supaya rapi; data diambil belakangan per chunk.
+    `taken` dipakai bersama extra_frames supaya semua nama sheet unik.
+    """
+    taken = _reserved_sheets() if taken is None else taken
+    for name, r in _parts(result):
+        merged, info_cols = r.merged, r.info_cols
+        info_col_list = unique(v for v in info_cols.values() if v and v in merged.columns)
+        rename_map    = {v: k for k, v in info_cols.items()}
+
+        for info in r.pairs_info:
+            base_cols = [r.id_col_a] + info_col_list + [info["portal_col"], info["omni_col"], info["status_col"], info["selisih_col"],
+                                                        info.get("delta_col")]
+            tbl_cols  = [c for c in dict.fromkeys(base_cols) if c in merged.columns]
+            header    = [rename_map.get(c, c) for c in tbl_cols]
+            label     = info["label"] if name is None else f"{_stem(name)} - {info['label']}"
+            yield _sheet_name(label, taken), merged, tbl_cols, header
+
+
+def extra_frames(result, taken=None):
+    """
+    Yield (nama sheet, DataFrame) tambahan di luar sheet pasangan: cube Brand/Kategori, saran nama.
+    Untuk banyak file target nama sheet per file lewat _sheet_name dengan `taken` yang sama
+    seperti pair_sheets (nama file bisa sama stem-nya, panjang, atau berisi karakter terlarang).
+    """
+    taken = _reserved_sheets() if taken is None else taken
+
+    def sheet(base, name):
+        return base if name is None else _sheet_name(f"{base} - {_stem(name)}", taken)
+
+    for name, r in _parts(result):
+        if r.cubes is not None:
+            dims = [c for c in CUBE_DIMS if c in r.cubes.columns]
+            yield sheet(CUBE_SHEET, name), cube_rollup(r.cubes, ["Pasangan", *dims])
+        if r.suggestions is not None:
+            yield sheet(SUGGEST_SHEET, name), r.suggestions
+
+
+def iter_chunks(df, cols, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Potongan baris df[cols] — hanya satu chunk yang dimaterialisasi sekaligus."""
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows][cols]
+
+
+def _rows(chunk):
+    """Baris chunk sebagai list Python; NaN/NA → None (sel kosong di Excel)."""
+    obj = chunk.astype(object)
+    return obj.where(chunk.notna(), None).to_numpy().tolist()
+
+
+# ─── xlsx ──────────────────────────────────────────────────────────────────────
+def write_excel(result, target):
+    """
+    Tulis workbook hasil (sheet per pasangan + Ringkasan) ke path atau buffer.
+    Pakai XlsxWriter constant_memory; fallback ke openpyxl write-only.
+    """
+    try:
+        import xlsxwriter
+    except ImportError:
+        return _write_excel_openpyxl(result, target)
+
+    wb = xlsxwriter.Workbook(target, {"constant_memory": True})
+    taken = _reserved_sheets()
+    try:
+        for sheet_name, merged, cols, header in pair_sheets(result, taken):
+            ws = wb.add_worksheet(sheet_name)
+            ws.write_row(0, 0, header)
+            r = 1
+            for chunk in iter_chunks(merged, cols):
+                for row in _rows(chunk):
+                    ws.write_row(r, 0, row)
+                    r += 1
+        for sheet_name, df in extra_frames(result, taken):
+            ws = wb.add_worksheet(sheet_name)
+            ws.write_row(0, 0, list(df.columns))
+            for r, row in enumerate(_rows(df), start=1):
+                ws.write_row(r, 0, row)
+        summ = summary(result)
+        ws = wb.add_worksheet(SUMMARY_SHEET)
+        ws.write_row(0, 0, list(summ.columns))
+        for r, row in enumerate(_rows(summ), start=1):
+            ws.write_row(r, 0, row)
+    finally:
+        wb.close()
+
+
+def _write_excel_openpyxl(result, target):
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    taken = _reserved_sheets()
+    for sheet_name, merged, cols, header in pair_sheets(result, taken):
+        ws = wb.create_sheet(sheet_name)
+        ws.append(header)
+        for chunk in iter_chunks(merged, cols):
+            for row in _rows(chunk):
+                ws.append(row)
+    for sheet_name, df in extra_frames(result, taken):
+        ws = wb.create_sheet(sheet_name)
+        ws.append(list(df.columns))
+        for row in _rows(df):
+            ws.append(row)
+    summ = summary(result)
+    ws = wb.create_sheet(SUMMARY_SHEET)
+    ws.append(list(summ.columns))
+    for row in _rows(summ):
+        ws.append(row)
+    wb.save(target)
+
+
+# ─── CSV / Parquet ─────────────────────────────────────────────────────────────
+def _file_stem(sheet_name):
+    return "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in sheet_name)
+
+
+def write_csv_zip(result, target):
+    """Zip berisi satu CSV per pasangan + ringkasan.csv, ditulis per chunk."""
+    taken = _reserved_sheets()
+    with zipfile.ZipFile(target, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for sheet_name, merged, cols, header in pair_sheets(result, taken):
+            with zf.open(f"{_file_stem(sheet_name)}.csv", "w") as raw, \
+                 io.TextIOWrapper(raw, encoding="utf-8", newline="") as fh:
+                first = True
+                for chunk in iter_chunks(merged, cols):
+                    chunk.to_csv(fh, header=header if first else False, index=False)
+                    first = False
+                if first:
+                    pd.DataFrame(columns=header).to_csv(fh, index=False)
+        for sheet_name, df in extra_frames(result, taken):
+            zf.writestr(f"{_file_stem(sheet_name)}.csv", df.to_csv(index=False))
+        zf.writestr("ringkasan.csv", summary(result).to_csv(index=False))
+
+
+def _sheet_frame(merged, cols, header):
+    df = merged[cols]
+    df.columns = header
+    return df
+
+
+def write_parquet(result, out_dir):
+    """Tulis hasil sebagai folder Parquet: satu file per pasangan + ringkasan.parquet."""
+    os.makedirs(out_dir, exist_ok=True)
+    taken = _reserved_sheets()
+    for sheet_name, merged, cols, header in pair_sheets(result, taken):
+        _sheet_frame(merged, cols, header).to_parquet(os.path.join(out_dir, f"{_file_stem(sheet_name)}.parquet"), index=False)
+    for sheet_name, df in extra_frames(result, taken):
+        df.to_parquet(os.path.join(out_dir, f"{_file_stem(sheet_name)}.parquet"), index=False)
+    summary(result).to_parquet(os.path.join(out_dir, "ringkasan.parquet"), index=False)
+
+
+def write_parquet_zip(result, target):
+    """Seperti write_parquet tapi dibungkus satu zip (untuk download)."""
+    taken = _reserved_sheets()
+    with zipfile.ZipFile(target, "w", compression=zipfile.ZIP_STORED) as zf:
+        for sheet_name, merged, cols, header in pair_sheets(result, taken):
+            with zf.open(f"{_file_stem(sheet_name)}.parquet", "w") as fh:
+                _sheet_frame(merged, cols, header).to_parquet(fh, index=False)
+        for sheet_name, df in extra_frames(result, taken):
+            with zf.open(f"{_file_stem(sheet_name)}.parquet", "w") as fh:
+                df.to_parquet(fh, index=False)
+        with zf.open("ringkasan.parquet", "w") as fh:
+            summary(result).to_parquet(fh, index=False)
+
+
+_WRITERS = {
+    "xlsx":        write_excel,
+    "csv.zip":     write_csv_zip,
+    "parquet.zip": write_parquet_zip,
+}
+
+
+def write_result(result, out):
+    """Tulis hasil ke path sesuai ekstensi: .xlsx, .zip (CSV) atau folder Parquet."""
+    parent = os.path.dirname(os.path.abspath(out))
+    os.makedirs(parent, exist_ok=True)
+    lower = out.lower()
+    with stage(f"export[{os.path.basename(out.rstrip('/'))}]", rows=_n_rows(result)):
+        if lower.endswith(".xlsx"):
+            write_excel(result, out)
+        elif lower.endswith(".zip"):
+            write_csv_zip(result, out)
+        else:
+            write_parquet(result, out)
+
+
+def export_bytes(result, fmt="xlsx"):
+    """Bytes file download untuk satu format; dibuat sekali per hasil lalu di-cache."""
+    lock = shared_cache().derived  # result bisa dipakai bersama beberapa session
+    with lock:
+        data = result.exports.get(fmt)
+    if data is None:
+        buf = io.BytesIO()
+        with stage(f"export[{fmt}]", rows=_n_rows(result)) as rec:
+            _WRITERS[fmt](result, buf)
+            rec["bytes"] = buf.tell()
+        with lock:
+            data = result.exports.setdefault(fmt, buf.getvalue())
+    return data
@@ -0,0 +1,209 @@
+"""
+Saran pencocokan nama produk untuk baris "Tidak Ada di Omni" (tahap kedua, opsional).
+
+Banyak SKU tidak ketemu hanya karena kode di Omni beda format / di-recode,
+padahal produknya ada dengan nama mirip. Membandingkan semua nama Portal ×
+Omni (SequenceMatcher) terlalu mahal, jadi:
+1. Blocking per brand: nama hanya dibandingkan dengan produk Omni ber-brand
+   sama (plus produk Omni tanpa brand). Portal tanpa brand → semua Omni.
+2. Inverted index trigram per blok → shortlist kandidat yang paling banyak
+   berbagi trigram (Dice), trigram yang terlalu umum diabaikan.
+3. Hanya shortlist yang dinilai dengan SequenceMatcher; blok dikerjakan
+   paralel di process pool.
+Hasil berupa saran + skor keyakinan, terpisah dari hasil cocok ID (exact).
+"""
+import dataclasses
+import os
+import re
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from difflib import SequenceMatcher
+
+import numpy as np
+import pandas as pd
+
+from detect import detect_info_cols
+from instrument import stage
+from join import normalize_keys, encode_keys
+
+MIN_SCORE      = 0.75   # skor minimum agar disarankan
+MAX_CANDIDATES = 10     # kandidat per baris yang dinilai SequenceMatcher
+MIN_DICE       = 0.3    # kandidat dengan kemiripan trigram di bawah ini langsung dibuang
+COMMON_GRAM    = 0.2    # trigram yang muncul di >20% nama satu blok dianggap tidak informatif
+CHUNK_ROWS     = 2000   # baris Portal per task paralel
+PARALLEL_MIN   = 5000   # di bawah ini jumlah baris Portal, kerjakan serial
+
+_NORM_RE = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_name(text):
+    """'Indomie Goreng  85g (Pack)' → 'indomie goreng 85g pack'; kosong → ''."""
+    if text is None or (isinstance(text, float) and np.isnan(text)):
+        return ""
+    return " ".join(t for t in _NORM_RE.split(str(text).lower()) if t)
+
+
+def trigrams(name):
+    """Set trigram karakter dari nama ter-normalisasi (diberi spasi di kedua ujung)."""
+    padded = f" {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def build_index(names):
+    """
+    Inverted index trigram → array posisi; trigram terlalu umum dibuang.
+    Return (index, jumlah trigram informatif per nama) — Dice dihitung dari trigram yang ter-index saja.
+    """
+    index = defaultdict(list)
+    grams = [trigrams(n) if n else set() for n in names]
+    for j, gs in enumerate(grams):
+        for g in gs:
+            index[g].append(j)
+    limit = max(50, int(COMMON_GRAM * len(names)))
+    index = {g: np.asarray(js, dtype=np.int32) for g, js in index.items() if len(js) <= limit}
+    return index, [sum(g in index for g in gs) for gs in grams]
+
+
+def score_block(portal_names, omni_names, min_score=MIN_SCORE, max_candidates=MAX_CANDIDATES):
+    """
+    Nilai satu blok: untuk tiap nama Portal, kandidat Omni terbaik.
+    Return list (i, j, skor) dengan i/j posisi lokal di blok; hanya skor ≥ min_score.
+    """
+    index, omni_len = build_index(omni_names)
+    out = []
+    for i, name in enumerate(portal_names):
+        if not name:
+            continue
+        postings = [js for js in map(index.get, trigrams(name)) if js is not None]
+        if not postings:
+            continue
+        counts = Counter(np.concatenate(postings).tolist())
+        sm = SequenceMatcher(None, autojunk=False)
+        sm.set_seq2(name)  # seq2 di-cache SequenceMatcher → nama Portal, kandidat bergantian di seq1
+        best, best_j = 0.0, -1
+        for j, shared in counts.most_common(max_candidates):
+            dice = 2 * shared / (len(postings) + omni_len[j])
+            if dice < MIN_DICE:
+                break
+            if omni_names[j] == name:
+                best, best_j = 1.0, j
+                break
+            sm.set_seq1(omni_names[j])
+            if (dice + sm.quick_ratio()) / 2 <= best:  # batas atas, tidak mungkin menang
+                continue
+            score = (dice + sm.ratio()) / 2
+            if score > best:
+                best, best_j = score, j
+        if best_j >= 0 and best >= min_score:
+            out.append((i, best_j, round(best, 3)))
+    return out
+
+
+def _score_task(task):
+    p_pos, p_names, o_pos, o_names, min_score = task
+    return [(p_pos[i], o_pos[j], s) for i, j, s in score_block(p_names, o_names, min_score)]
+
+
+def _tasks(p_brand, p_names, o_brand, o_names, min_score):
+    """Bagi baris Portal per blok brand (dan per CHUNK_ROWS) beserta kandidat Omni-nya."""
+    o_by_brand = defaultdict(list)
+    for j, b in enumerate(o_brand):
+        o_by_brand[b].append(j)
+    no_brand = o_by_brand.get("", [])
+    all_omni = list(range(len(o_names)))
+
+    p_by_brand = defaultdict(list)
+    for i, b in enumerate(p_brand):
+        if p_names[i]:
+            p_by_brand[b].append(i)
+
+    for brand, p_rows in p_by_brand.items():
+        o_rows = all_omni if not brand else o_by_brand.get(brand, []) + no_brand
+        if not o_rows:
+            continue
+        o_block = [o_names[j] for j in o_rows]
+        for start in range(0, len(p_rows), CHUNK_ROWS):
+            chunk = p_rows[start:start + CHUNK_ROWS]
+            yield chunk, [p_names[i] for i in chunk], o_rows, o_block, min_score
+
+
+def match_names(portal_names, portal_brands, omni_names, omni_brands, min_score=MIN_SCORE, workers=None):
+    """
+    Saran pasangan nama Portal → Omni. Brand None = tanpa blocking untuk sisi itu.
+    Return list (posisi Portal, posisi Omni, skor), urut posisi Portal.
+    """
+    p_names = [normalize_name(v) for v in portal_names]
+    o_names = [normalize_name(v) for v in omni_names]
+    p_brand = [normalize_name(v) for v in portal_brands] if portal_brands is not None else [""] * len(p_names)
+    o_brand = [normalize_name(v) for v in omni_brands] if omni_brands is not None else [""] * len(o_names)
+
+    tasks = list(_tasks(p_brand, p_names, o_brand, o_names, min_score))
+    if workers == 1 or len(tasks) == 1 or len(p_names) < PARALLEL_MIN:
+        parts = map(_score_task, tasks)
+        return sorted(m for part in parts for m in part)
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        parts = pool.map(_score_task, tasks, chunksize=1)
+        return sorted(m for part in parts for m in part)
+
+
+def _text_values(series):
+    return series.astype("string").to_numpy(dtype=object, na_value=None) if series is not None else None
+
+
+def suggest_matches(result, df_b, id_col_b, omni_info=None, min_score=MIN_SCORE, workers=None):
+    """
+    Saran untuk baris Portal berstatus "Tidak Ada di Omni" dari hasil analisis.
+    df_b: frame Omni yang berisi id_col_b + kolom nama (dan brand jika ada).
+    Produk Omni yang ID-nya sudah cocok exact dengan Portal tidak ikut disarankan.
+    Return DataFrame saran (bisa kosong); result tidak diubah (bisa dipakai
+    bersama antar session) — lihat with_suggestions.
+    Raise ValueError jika kolom nama tidak terdeteksi di salah satu file.
+    """
+    merged    = result.merged
+    info      = result.info_cols
+    omni_info = omni_info if omni_info is not None else detect_info_cols(df_b)
+    nama_a, brand_a = info.get("Nama Produk"), info.get("Brand")
+    nama_b, brand_b = omni_info.get("Nama Produk"), omni_info.get("Brand")
+    if not nama_a or not nama_b or nama_b not in df_b.columns:
+        raise ValueError("Kolom Nama Produk tidak terdeteksi di Portal atau Omni.")
+    if brand_a is None or brand_b is None or brand_b not in df_b.columns:
+        brand_a = brand_b = None  # tanpa brand di salah satu sisi → tanpa blocking
+
+    with stage("fuzzy", rows=len(merged)) as rec:
+        # Baris Portal yang tidak ketemu: sama untuk semua pasangan (hasil join)
+        rows_a = result.pairs_info[0]["status_idx"]["Tidak Ada di Omni"] if result.pairs_info else np.arange(0)
+
+        # Omni yang ID-nya sudah dipakai Portal tidak perlu disarankan lagi
+        key_opts = result.join_report.get("key_opts", {})
+        ca, cb, _ = encode_keys(normalize_keys(merged[result.id_col_a], **key_opts),
+                                normalize_keys(df_b[id_col_b], **key_opts))
+        rows_b = np.flatnonzero(~np.isin(cb, ca[ca >= 0]))
+
+        sub_a = merged.iloc[rows_a]
+        sub_b = df_b.iloc[rows_b]
+        matches = match_names(_text_values(sub_a[nama_a]), _text_values(sub_a[brand_a]) if brand_a else None,
+                              _text_values(sub_b[nama_b]), _text_values(sub_b[brand_b]) if brand_b else None,
+                              min_score=min_score, workers=workers)
+        rec.update(unmatched=len(rows_a), candidates=len(rows_b), suggested=len(matches))
+
+    i = np.array([m[0] for m in matches], dtype=np.int64)
+    j = np.array([m[1] for m in matches], dtype=np.int64)
+    cols = {
+        "ID Portal":       sub_a[result.id_col_a].iloc[i].astype("string").to_numpy(),
+        "Nama Portal":     sub_a[nama_a].iloc[i].astype("string").to_numpy(),
+        "ID Omni (Saran)": sub_b[id_col_b].iloc[j].astype("string").to_numpy(),
+        "Nama Omni":       sub_b[nama_b].iloc[j].astype("string").to_numpy(),
+        "Skor":            np.array([m[2] for m in matches], dtype="float64"),
+    }
+    if brand_a:
+        cols["Brand"] = sub_a[brand_a].iloc[i].astype("string").to_numpy()
+    out = pd.DataFrame(cols)
+    return out.sort_values("Skor", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def with_suggestions(result, suggestions):
+    """
+    Salinan dangkal result dengan saran terpasang (frame & view tetap dipakai
+    bersama) dan cache export sendiri, karena file download-nya berisi sheet saran.
+    """
+    return dataclasses.replace(result, suggestions=suggestions, exports={})
@@ -0,0 +1,335 @@
+"""
+Ingestion file upload Portal/Omni.
+
+Setiap file di-parse sekali per isi file (content hash). Hasil parse disimpan
+di LRU memori dan di-spill ke Parquet di disk, jadi rerun Streamlit atau
+upload ulang file yang sama tidak perlu lewat openpyxl lagi.
+
+Untuk export yang sangat besar ada mode streaming: baca header saja untuk
+auto-detect, lalu baca hanya kolom terpilih per chunk (openpyxl read-only /
+read_csv chunksize) dengan dtype yang dipersempit.
+"""
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from instrument import stage
+
+CACHE_DIR       = os.environ.get("CEKHARGA_CACHE_DIR", os.path.join(tempfile.gettempdir(), "cekharga_cache"))
+MEM_MAX_ENTRIES = int(os.environ.get("CEKHARGA_CACHE_MEM_ENTRIES", "6"))
+DISK_MAX_FILES  = int(os.environ.get("CEKHARGA_CACHE_DISK_FILES", "50"))
+
+
+def content_hash(data):
+    """Hash isi file (blake2b, 128-bit) sebagai key cache."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _parquet_safe(df):
+    """
+    Parquet butuh nama kolom string dan satu tipe per kolom.
+    Kolom object campuran (mis. 12500 dan "Rp12,500") dijadikan string, NaN tetap NaN.
+    Return None jika frame tidak bisa disimpan ke Parquet.
+    """
+    if not all(isinstance(c, str) for c in df.columns):
+        return None
+    out = df
+    for c in df.columns:
+        if df[c].dtype == object and pd.api.types.infer_dtype(df[c], skipna=True) not in ("string", "empty"):
+            if out is df:
+                out = df.copy()
+            out[c] = df[c].astype("string")
+    return out
+
+
+class FrameCache:
+    """LRU cache DataFrame hasil parse, key = content hash. Entry yang keluar dari memori tetap ada di disk."""
+
+    def __init__(self, max_entries=MEM_MAX_ENTRIES, cache_dir=CACHE_DIR, disk_max_files=DISK_MAX_FILES):
+        self.max_entries    = max_entries
+        self.cache_dir      = cache_dir
+        self.disk_max_files = disk_max_files
+        self._mem  = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.parquet")
+
+    def get(self, key):
+        with self._lock:
+            if key in self._mem:
+                self._mem.move_to_end(key)
+                return self._mem[key]
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            df = pd.read_parquet(path)
+            os.utime(path)
+        except Exception:
+            return None
+        self._put_mem(key, df)
+        return df
+
+    def put(self, key, df):
+        # Simpan versi yang sama dengan isi Parquet supaya hit memori & hit disk identik
+        safe = _parquet_safe(df)
+        self._put_mem(key, df if safe is None else safe)
+        if safe is None:
+            return df
+        self._spill(key, safe)
+        return safe
+
+    def _put_mem(self, key, df):
+        with self._lock:
+            self._mem[key] = df
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_entries:
+                self._mem.popitem(last=False)
+
+    def _spill(self, key, df):
+        """Tulis ke Parquet (best effort); gagal = cukup di memori saja."""
+        tmp = self._path(key) + f".{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            df.to_parquet(tmp, index=False)
+            os.replace(tmp, self._path(key))
+        except Exception:
+            try:
+                os.remove(tmp)
+            except Exception:
+                pass
+            return
+        self._prune_disk()
+
+    def _prune_disk(self):
+        """Hapus file Parquet paling lama dipakai jika melebihi disk_max_files."""
+        try:
+            files = [os.path.join(self.cache_dir, f) for f in os.listdir(self.cache_dir) if f.endswith(".parquet")]
+        except OSError:
+            return
+        if len(files) <= self.disk_max_files:
+            return
+        files.sort(key=os.path.getmtime)
+        for f in files[:len(files) - self.disk_max_files]:
+            try:
+                os.remove(f)
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+
+
+# Satu cache per proses, dipakai bersama oleh semua rerun & session Streamlit
+_CACHE = FrameCache()
+
+
+# ─── Streaming ingestion (file besar) ─────────────────────────────────────────
+STREAM_CHUNK_ROWS = int(os.environ.get("CEKHARGA_STREAM_CHUNK_ROWS", "50000"))
+
+
+def _dedupe_header(raw):
+    """Samakan nama kolom dengan pd.read_excel: sel kosong → 'Unnamed: i', duplikat → 'nama.1'."""
+    names, seen = [], {}
+    for i, c in enumerate(raw):
+        name = f"Unnamed: {i}" if c is None or (isinstance(c, str) and not c.strip()) else c
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _open_xlsx_rows(data):
+    """Iterator baris (values_only) sheet pertama via openpyxl read-only mode."""
+    from openpyxl import load_workbook
+    wb = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    ws = wb.worksheets[0]
+    return wb, ws.iter_rows(values_only=True)
+
+
+def _is_xlsx(name):
+    return name.lower().endswith((".xlsx", ".xlsm"))
+
+
+def narrow_dtypes(df):
+    """
+    Perkecil dtype per chunk:
+    - integer → int terkecil yang muat
+    - object numerik murni → float64 (harga tetap presisi penuh, jangan float32)
+    - object teks → string dtype
+    """
+    for c in df.columns:
+        s = df[c]
+        if pd.api.types.is_integer_dtype(s):
+            df[c] = pd.to_numeric(s, downcast="integer")
+        elif s.dtype == object:
+            inferred = pd.api.types.infer_dtype(s, skipna=True)
+            if inferred in ("integer", "floating", "mixed-integer-float"):
+                df[c] = pd.to_numeric(s, errors="coerce")
+            elif inferred != "empty":
+                df[c] = s.astype("string")
+    return df
+
+
+def _finalize(chunks, columns):
+    """
+    Gabung chunk per kolom; kolom yang tipenya beda antar chunk (angka vs teks) jadi string.
+    Kolom chunk dilepas begitu kolom gabungannya jadi (list chunks dikosongkan), jadi
+    puncak memori ≈ frame hasil + satu kolom, bukan semua chunk + frame hasil.
+    """
+    if not chunks:
+        return pd.DataFrame(columns=columns)
+    out = {}
+    for c in columns:
+        parts = [chunk.pop(c) for chunk in chunks]
+        if any(p.dtype != object for p in parts):
+            # Chunk yang kolomnya kosong semua (object) tidak boleh membuat kolom angka jadi teks
+            parts = [p.astype("float64") if p.dtype == object and p.isna().all() else p for p in parts]
+        col = pd.concat(parts, ignore_index=True)
+        out[c] = col.astype("string") if col.dtype == object else col
+    chunks.clear()
+    return pd.DataFrame(out)
+
+
+def read_header(name, data, cache=None):
+    """
+    Baca header saja (tanpa isi) → DataFrame kosong berisi nama kolom.
+    Cukup untuk auto_detect / detect_info_cols sebelum kolom dipilih.
+    """
+    cache = cache or _CACHE
+    key   = f"{content_hash(data)}_header"
+    df    = cache.get(key)
+    if df is None:
+        df = cache.put(key, parse_header(name, data))
+    return df
+
+
+def parse_header(name, data):
+    """Baca header saja tanpa cache."""
+    if name.lower().endswith(".csv"):
+        cols = pd.read_csv(io.BytesIO(data), nrows=0).columns.tolist()
+    elif _is_xlsx(name):
+        wb, rows = _open_xlsx_rows(data)
+        try:
+            cols = _dedupe_header(next(rows, ()))
+        finally:
+            wb.close()
+    else:
+        cols = pd.read_excel(io.BytesIO(data), nrows=0).columns.tolist()
+    return pd.DataFrame(columns=cols)
+
+
+def iter_column_chunks(name, data, usecols, chunksize=STREAM_CHUNK_ROWS):
+    """Yield chunk DataFrame yang hanya berisi usecols, dtype sudah dipersempit."""
+    usecols = list(dict.fromkeys(usecols))
+    if name.lower().endswith(".csv"):
+        for chunk in pd.read_csv(io.BytesIO(data), usecols=usecols, chunksize=chunksize):
+            yield narrow_dtypes(chunk[usecols])
+        return
+    if not _is_xlsx(name):
+        # .xls tidak punya mode read-only; baca kolom terpilih saja
+        yield narrow_dtypes(pd.read_excel(io.BytesIO(data), usecols=usecols)[usecols])
+        return
+
+    wb, rows = _open_xlsx_rows(data)
+    try:
+        header = _dedupe_header(next(rows, ()))
+        missing = [c for c in usecols if c not in header]
+        if missing:
+            raise KeyError(f"Kolom tidak ditemukan: {missing}")
+        idx   = [header.index(c) for c in usecols]
+        width = max(idx) + 1
+        buf   = []
+        blank = 0  # baris kosong tertunda: dipertahankan di tengah data, dibuang di akhir sheet (seperti pd.read_excel)
+        for row in rows:
+            if not any(v is not None for v in row):
+                blank += 1
+                continue
+            if blank:
+                buf.extend([[None] * len(idx)] * blank)
+                blank = 0
+            if len(row) < width:
+                row = tuple(row) + (None,) * (width - len(row))
+            buf.append([row[i] for i in idx])
+            if len(buf) >= chunksize:
+                yield narrow_dtypes(pd.DataFrame(buf, columns=usecols))
+                buf = []
+        if buf:
+            yield narrow_dtypes(pd.DataFrame(buf, columns=usecols))
+    finally:
+        wb.close()
+
+
+def read_columns(name, data, usecols, chunksize=STREAM_CHUNK_ROWS, cache=None):
+    """Baca hanya kolom terpilih secara streaming (memori ~ kolom terpilih, bukan seluruh file)."""
+    cache   = cache or _CACHE
+    usecols = list(dict.fromkeys(usecols))
+    sig     = hashlib.blake2b("\x1f".join(map(str, usecols)).encode(), digest_size=8).hexdigest()
+    key     = f"{content_hash(data)}_cols_{sig}"
+    df      = cache.get(key)
+    if df is None:
+        df = cache.put(key, load_columns(name, data, usecols, chunksize))
+    return df
+
+
+def load_columns(name, data, usecols, chunksize=STREAM_CHUNK_ROWS):
+    """Versi read_columns tanpa cache (dipakai batch/CLI)."""
+    usecols = list(dict.fromkeys(usecols))
+    with stage(f"parse[{name}]", cols=len(usecols)) as rec:
+        df = _finalize(list(iter_column_chunks(name, data, usecols, chunksize)), usecols)
+        rec["rows"] = len(df)
+    return df
+
+
+def parse_bytes(name, data):
+    """Parse isi file mentah (csv/xlsx/xls) ke DataFrame."""
+    buf = io.BytesIO(data)
+    with stage(f"parse[{name}]") as rec:
+        df = pd.read_csv(buf) if name.lower().endswith(".csv") else pd.read_excel(buf)
+        rec["rows"] = len(df)
+    return df
+
+
+def _upload_key(name, data):
+    ext = os.path.splitext(name.lower())[1]
+    return f"{content_hash(data)}{ext.replace('.', '_')}"
+
+
+def read_upload(name, data, cache=None):
+    """Parse file upload dengan cache berdasarkan hash isi file."""
+    cache = cache or _CACHE
+    key   = _upload_key(name, data)
+    df    = cache.get(key)
+    if df is None:
+        df = cache.put(key, parse_bytes(name, data))
+    return df
+
+
+def read_many(files, workers=None, cache=None):
+    """
+    Seperti read_upload untuk banyak file sekaligus: files = [(nama, bytes), ...].
+    File yang belum ada di cache di-parse paralel di process pool. Return list DataFrame (urutan sama).
+    """
+    cache = cache or _CACHE
+    keys  = [_upload_key(name, data) for name, data in files]
+    out   = [cache.get(k) for k in keys]
+    miss  = [i for i, df in enumerate(out) if df is None]
+    if len(miss) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=min(len(miss), workers or os.cpu_count() or 1)) as pool:
+            parsed = list(pool.map(parse_bytes, [files[i][0] for i in miss], [files[i][1] for i in miss]))
+    else:
+        parsed = [parse_bytes(*files[i]) for i in miss]
+    for i, df in zip(miss, parsed):
+        out[i] = cache.put(keys[i], df)
+    return out
@@ -0,0 +1,166 @@
+"""
+Instrumentasi ringan per tahap pipeline: waktu, jumlah baris, memori proses.
+
+    with stage("merge", rows=len(df_a)) as rec:
+        ...
+        rec["rows"] = len(merged)   # boleh diisi/diubah di dalam blok
+
+Setiap tahap selesai:
+- ditulis sebagai satu baris JSON ke logger "cekharga.perf" (stderr, bisa di-scrape ops)
+- dicatat ke Trace aktif (jika ada) → ditampilkan di panel diagnostik UI
+
+Memori diambil dari RSS proses (/proc/self/statm), bukan tracemalloc, jadi
+cukup murah untuk selalu aktif di production:
+- rss_mb / rss_delta_mb: RSS di akhir tahap dan selisihnya dengan awal tahap
+- peak_rss_mb: puncak RSS proses SELAMA tahap itu, disampel satu thread ringan
+  tiap CEKHARGA_PERF_SAMPLE_MS ms (hanya saat ada tahap berjalan). Ini RSS
+  proses, jadi tahap lain yang berjalan bersamaan (session/job lain) ikut terhitung.
+Matikan log dengan CEKHARGA_PERF_LOG=0.
+"""
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+PERF_LOG       = os.environ.get("CEKHARGA_PERF_LOG", "1") != "0"
+PERF_SAMPLE_MS = float(os.environ.get("CEKHARGA_PERF_SAMPLE_MS", "10"))
+
+logger = logging.getLogger("cekharga.perf")
+if PERF_LOG and not logger.handlers:
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_mb():
+    """RSS proses saat ini (MB), None jika tidak tersedia."""
+    try:
+        with open("/proc/self/statm", "rb") as fh:
+            return int(fh.read().split()[1]) * _PAGE / 1e6
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _PeakSampler:
+    """Satu thread daemon yang membaca RSS berkala selama ada tahap terbuka; simpan puncak per tahap."""
+
+    def __init__(self, interval_ms=PERF_SAMPLE_MS):
+        self.interval = interval_ms / 1000
+        self._windows = {}  # id → [puncak MB] per tahap yang sedang berjalan
+        self._lock    = threading.Lock()
+        self._wake    = threading.Event()
+        self._thread  = None
+
+    def open(self, rss):
+        win = [rss]
+        with self._lock:
+            self._windows[id(win)] = win
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="cekharga-rss", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return win
+
+    def close(self, win, rss):
+        """Tutup tahap → puncak RSS selama tahap (termasuk RSS di akhir tahap)."""
+        with self._lock:
+            self._windows.pop(id(win), None)
+        return max(win[0], rss)
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            rss = rss_mb() or 0.0
+            with self._lock:
+                if not self._windows:
+                    self._wake.clear()  # tidur sampai ada tahap baru
+                    continue
+                for win in self._windows.values():
+                    win[0] = max(win[0], rss)
+            time.sleep(self.interval)
+
+
+_sampler = _PeakSampler()
+
+
+class Trace:
+    """Catatan tahap terakhir per nama (rerun menimpa tahap yang sama)."""
+
+    def __init__(self, **context):
+        self.context = context  # mis. {"session": ...}, ikut di setiap baris log
+        self.records = OrderedDict()
+        self._lock   = threading.Lock()
+
+    def start(self, name):
+        """Dipanggil saat tahap mulai (hook untuk subclass, mis. progress job)."""
+
+    def add(self, rec):
+        with self._lock:
+            self.records.pop(rec["stage"], None)
+            self.records[rec["stage"]] = rec
+
+    def rows(self):
+        """List record urut waktu selesai (untuk tabel diagnostik)."""
+        with self._lock:
+            return list(self.records.values())
+
+    def clear(self):
+        with self._lock:
+            self.records.clear()
+
+
+_current = contextvars.ContextVar("cekharga_trace", default=None)
+
+
+def activate(trace):
+    """Jadikan trace aktif untuk thread/context ini (mis. di awal tiap rerun Streamlit)."""
+    _current.set(trace)
+    return trace
+
+
+def current():
+    return _current.get()
+
+
+def _mb(v):
+    return None if v is None else round(v, 1)
+
+
+@contextmanager
+def stage(name, rows=None, **extra):
+    """Ukur satu tahap. Record tetap dicatat walau blok raise (dengan field "error")."""
+    rec   = {"stage": name, "rows": rows, **extra}
+    trace = _current.get()
+    if trace is not None:
+        trace.start(name)
+    rss0 = rss_mb()
+    win  = _sampler.open(rss0) if rss0 is not None else None
+    t0   = time.perf_counter()
+    try:
+        yield rec
+    except BaseException as e:
+        rec["error"] = type(e).__name__
+        raise
+    finally:
+        rss1 = rss_mb()
+        peak = _sampler.close(win, rss1) if win is not None and rss1 is not None else None
+        rec.update({
+            "seconds":     round(time.perf_counter() - t0, 4),
+            "rss_mb":      _mb(rss1),
+            "rss_delta_mb": _mb(rss1 - rss0) if rss0 is not None and rss1 is not None else None,
+            "peak_rss_mb": _mb(peak),
+        })
+        if trace is not None:
+            trace.add(rec)
+        if PERF_LOG:
+            ctx = trace.context if trace is not None else {}
+            logger.info(json.dumps({"event": "stage", **ctx, **rec}, default=str))
@@ -0,0 +1,188 @@
+"""
+Analisis sebagai job latar belakang di worker pool (satu pool per proses server).
+
+Script Streamlit hanya men-submit job lalu mem-poll statusnya, jadi UI tetap
+responsif, rerun (klik widget) tidak membatalkan analisis, dan beberapa
+session bisa menjalankan analisis berat bersamaan.
+
+Progress & pembatalan memakai instrumentasi yang sudah ada (instrument.stage):
+- job mengaktifkan JobTrace di thread worker; setiap tahap (normalize, merge,
+  status[label], stats[label], ...) yang mulai/selesai memperbarui progress
+- pembatalan diperiksa di awal setiap tahap → job berhenti di batas tahap
+  berikutnya (per pasangan harga), bukan di tengah operasi pandas
+
+    job = shared_jobs().submit(analyze, label="Portal vs Omni", steps=8, parent=diag)
+    job.progress, job.message, job.state     # di-poll dari UI
+    job.cancel()
+
+Jumlah worker: CEKHARGA_JOB_WORKERS (default 2).
+"""
+import contextvars
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from instrument import Trace, activate
+
+JOB_WORKERS = int(os.environ.get("CEKHARGA_JOB_WORKERS", "2"))
+JOB_KEEP    = 100   # job selesai yang tetap bisa diambil lewat id
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Dilempar di awal tahap berikutnya setelah job.cancel()."""
+
+
+class JobTrace(Trace):
+    """Trace di thread worker: tahap mulai/selesai → progress job; diteruskan ke trace session (parent)."""
+
+    def __init__(self, job, parent=None):
+        super().__init__(**(parent.context if parent is not None else {}), job=job.id)
+        self.job    = job
+        self.parent = parent
+
+    def start(self, name):
+        self.job._begin(name)
+
+    def add(self, rec):
+        super().add(rec)
+        self.job._end(rec)
+        if self.parent is not None:
+            self.parent.add(rec)
+
+
+class Job:
+    """Satu analisis: state, progress (0–1), tahap yang sedang jalan, hasil/error."""
+
+    def __init__(self, label="", steps=None):
+        self.id        = uuid.uuid4().hex[:12]
+        self.label     = label
+        self.steps     = steps  # perkiraan jumlah tahap; None = progress tidak diketahui
+        self.state     = QUEUED
+        self.stage     = None
+        self.done      = 0
+        self.result    = None
+        self.error     = None
+        self.submitted = time.time()
+        self.started   = None
+        self.finished  = None
+        self.future    = None
+        self._cancel   = threading.Event()
+        self._lock     = threading.Lock()
+        self._running  = []  # tahap bersarang yang sedang jalan
+
+    # ── dipanggil dari thread worker (lewat JobTrace) ──
+    def _begin(self, name):
+        if self._cancel.is_set():
+            raise JobCancelled(name)
+        with self._lock:
+            self._running.append(name)
+            self.stage = name
+
+    def _end(self, rec):
+        with self._lock:
+            if rec["stage"] in self._running:
+                self._running.remove(rec["stage"])
+            self.done += 1
+            self.stage = self._running[-1] if self._running else None
+
+    # ── dipanggil dari UI ──
+    @property
+    def progress(self):
+        """0–1; tahap selesai / perkiraan tahap (maks 0.99 sebelum job selesai)."""
+        if self.state == DONE:
+            return 1.0
+        if not self.steps:
+            return 0.0
+        return min(self.done / self.steps, 0.99)
+
+    @property
+    def message(self):
+        if self.state == QUEUED:
+            return "Menunggu antrian..."
+        if self.state == RUNNING:
+            return f"Memproses: {self.stage}" if self.stage else "Memproses..."
+        return {DONE: "Selesai", FAILED: f"Gagal: {self.error}", CANCELLED: "Dibatalkan"}[self.state]
+
+    @property
+    def active(self):
+        return self.state not in FINISHED
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def cancel(self):
+        """Minta job berhenti; job yang belum mulai langsung dibatalkan."""
+        self._cancel.set()
+        if self.future is not None and self.future.cancel():
+            self.state, self.finished = CANCELLED, time.time()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+
+class JobManager:
+    """Worker pool + daftar job (yang aktif dan JOB_KEEP terakhir yang selesai)."""
+
+    def __init__(self, workers=JOB_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="cekharga-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, fn, label="", steps=None, parent=None):
+        """Jalankan fn() di worker pool; return Job. parent: Trace session untuk panel diagnostik."""
+        job = Job(label, steps)
+        ctx = contextvars.copy_context()
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        job.future = self._pool.submit(ctx.run, self._run, job, fn, parent)
+        return job
+
+    def _run(self, job, fn, parent):
+        if job.cancelled:
+            job.state, job.finished = CANCELLED, time.time()
+            return
+        activate(JobTrace(job, parent))
+        job.state, job.started = RUNNING, time.time()
+        try:
+            job.result = fn()
+            job.state  = DONE
+        except JobCancelled:
+            job.state = CANCELLED
+        except Exception as e:
+            job.error, job.state = str(e), FAILED
+        finally:
+            job.finished = time.time()
+            job.stage    = None
+
+    def _prune(self):
+        finished = [k for k, j in self._jobs.items() if not j.active]
+        for k in finished[:max(0, len(finished) - JOB_KEEP)]:
+            del self._jobs[k]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def active(self):
+        """Job yang masih antri/jalan (semua session)."""
+        with self._lock:
+            return [j for j in self._jobs.values() if j.active]
+
+
+# Satu pool per proses, dipakai bersama oleh semua session Streamlit
+_MANAGER = JobManager()
+
+
+def shared_jobs():
+    return _MANAGER
@@ -0,0 +1,179 @@
+"""
+Join Portal ← Omni pada kolom ID dengan normalisasi key & deteksi duplikat.
+
+- Key dinormalisasi per nilai unik (bukan per baris): spasi, huruf besar/kecil,
+  suffix float Excel ("123.0" → "123"), nol di depan ("00123" → "123").
+- Kedua sisi di-factorize ke kode int bersama; join = lookup array int.
+- Duplikat key di Omni diselesaikan dengan kebijakan first/last/min/max/mean,
+  jadi jumlah baris hasil SELALU sama dengan jumlah baris Portal.
+"""
+import numpy as np
+import pandas as pd
+
+from instrument import stage
+
+DEFAULT_KEY_OPTS = {
+    "ignore_case": True,   # "sku-01" == "SKU-01"
+    "strip_float": True,   # "123.0" == "123" (ID yang dibaca Excel sebagai angka)
+    "strip_zeros": True,   # "00123" == "123"
+}
+
+DUP_POLICIES = ["first", "last", "min", "max", "mean"]
+DUP_POLICY_LABELS = {
+    "first": "Pakai baris pertama",
+    "last":  "Pakai baris terakhir",
+    "min":   "Harga terendah",
+    "max":   "Harga tertinggi",
+    "mean":  "Rata-rata harga",
+}
+
+
+def _normalize_values(values, ignore_case=True, strip_float=True, strip_zeros=True):
+    """Normalisasi array nilai unik → pd.Series string (NA untuk key kosong)."""
+    s = pd.Series(values)
+    if pd.api.types.is_float_dtype(s) and strip_float:
+        # ID numerik yang terbaca float: 123.0 → "123" tanpa lewat string "123.0"
+        integral = s.notna() & (s == np.floor(s))
+        out = s.astype("string")
+        out[integral] = s[integral].astype("int64").astype("string")
+        s = out
+    s = s.astype("string").str.strip()
+    if strip_float:
+        s = s.str.replace(r"^(-?\d+)\.0+$", r"\1", regex=True)
+    if strip_zeros:
+        s = s.str.replace(r"^0+(?=.)", "", regex=True)
+    if ignore_case:
+        s = s.str.upper()
+    # Hanya nilai NA asli & string kosong yang dianggap key kosong; SKU literal "NONE"/"NAN" tetap key
+    return s.mask(s.isna() | (s == ""))
+
+
+def normalize_keys(series, **key_opts):
+    """
+    Normalisasi kolom ID. Hanya nilai unik yang diproses (factorize dulu),
+    jadi 300k baris dengan 50k SKU unik cukup 50k operasi string.
+    """
+    opts = {**DEFAULT_KEY_OPTS, **key_opts}
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    norm = _normalize_values(np.asarray(uniques), **opts).to_numpy(dtype=object, na_value=None)
+    out  = np.empty(len(codes), dtype=object)
+    out[:] = None
+    valid = codes >= 0
+    out[valid] = norm[codes[valid]]
+    return out
+
+
+def encode_keys(keys_a, keys_b):
+    """Kode int bersama untuk key Portal & Omni (-1 = key kosong). Return (ca, cb, jumlah key)."""
+    codes, uniques = pd.factorize(np.concatenate([keys_a, keys_b]), use_na_sentinel=True)
+    return codes[:len(keys_a)], codes[len(keys_a):], len(uniques)
+
+
+def gather(per_key, codes, fill):
+    """per_key[codes] dengan kode -1 → fill."""
+    out   = np.full(len(codes), fill, dtype=np.result_type(per_key.dtype, np.min_scalar_type(fill)))
+    valid = codes >= 0
+    out[valid] = per_key[codes[valid]]
+    return out
+
+
+def _take(series, rows):
+    """series[rows] dengan -1 → NA (baris Portal yang tidak ada di Omni)."""
+    arr = series.array if isinstance(series.dtype, pd.api.extensions.ExtensionDtype) else series.to_numpy()
+    return pd.api.extensions.take(arr, rows, allow_fill=True)
+
+
+def dup_summary(codes, raw_ids, n_keys, examples=5):
+    """Jumlah key duplikat, baris yang terlibat, dan contoh ID-nya."""
+    valid    = codes >= 0
+    counts   = np.bincount(codes[valid], minlength=n_keys)
+    dup      = counts > 1
+    dup_rows = np.flatnonzero(gather(dup, codes, False))
+    sample = pd.unique(pd.Series(raw_ids).iloc[dup_rows[:examples * 10]].astype(str))[:examples]
+    return {
+        "dup_keys":  int(dup.sum()),
+        "dup_rows":  int(len(dup_rows)),
+        "blank":     int((~valid).sum()),
+        "examples":  list(sample),
+    }
+
+
+def build_lookup(cb, n_keys, policy="first"):
+    """Untuk tiap kode key: posisi baris Omni yang dipakai (-1 jika tidak ada)."""
+    lookup = np.full(n_keys, -1, dtype=np.int64)
+    pos    = np.flatnonzero(cb >= 0)
+    if policy == "last":
+        lookup[cb[pos]] = pos               # assignment terakhir menang
+    else:
+        lookup[cb[pos[::-1]]] = pos[::-1]   # dibalik → kemunculan pertama menang
+    return lookup
+
+
+def join_frames(df_a, df_b, id_col_a, id_col_b, key_opts=None, dup_policy="first", agg_cols=(), parse=None,
+                keys_a=None, keys_b=None):
+    """
+    LEFT JOIN Portal ← Omni. Return (merged, exists, report, keys_a).
+    - merged: satu baris per baris Portal (urutan sama), kolom bentrok diberi suffix _Portal/_Omni
+    - exists: bool array, True jika ID Portal ditemukan di Omni
+    - report: ringkasan normalisasi & duplikat kedua sisi
+    - keys_a: key Portal ter-normalisasi (object array, None = kosong)
+    Untuk kebijakan min/max/mean, agg_cols (kolom harga Omni) diagregasi per key
+    setelah di-parse dengan fungsi parse.
+    keys_a: key Portal yang sudah dinormalisasi (normalize_keys dengan key_opts yang
+    sama) — dipakai ulang saat satu Portal dibandingkan dengan banyak file.
+    keys_b: idem untuk Omni (mis. key yang sudah tersimpan di katalog referensi).
+    """
+    key_opts = {**DEFAULT_KEY_OPTS, **(key_opts or {})}
+    df_a = df_a.reset_index(drop=True)
+    df_b = df_b.reset_index(drop=True)
+
+    with stage("normalize", rows=len(df_a) + len(df_b)) as rec:
+        if keys_a is None:
+            keys_a = normalize_keys(df_a[id_col_a], **key_opts)
+        if keys_b is None:
+            keys_b = normalize_keys(df_b[id_col_b], **key_opts)
+        ca, cb, n_keys = encode_keys(keys_a, keys_b)
+        rec["keys"] = n_keys
+
+    with stage("merge", rows=len(df_a)):
+        lookup = build_lookup(cb, n_keys, "last" if dup_policy == "last" else "first")
+        rows_b = gather(lookup, ca, -1)
+        exists = rows_b >= 0
+
+        # Kolom hasil: Portal dulu, lalu Omni; nama bentrok → suffix seperti pd.merge
+        same_key = id_col_a == id_col_b
+        overlap  = (set(df_a.columns) & set(df_b.columns)) - ({id_col_a} if same_key else set())
+        left = df_a.copy()
+        left[id_col_a] = left[id_col_a].astype(str).str.strip()
+        left = left.rename(columns={c: f"{c}_Portal" for c in overlap})
+
+        out = {}
+        agg_cols = set(agg_cols) if dup_policy in ("min", "max", "mean") else set()
+        valid_b  = cb >= 0
+        for c in df_b.columns:
+            if same_key and c == id_col_b:
+                continue
+            name = f"{c}_Omni" if c in overlap else c
+            if c in agg_cols and parse is not None:
+                vals = pd.Series(parse(df_b[c])[valid_b])
+                agg  = vals.groupby(cb[valid_b]).agg(dup_policy).reindex(range(n_keys)).to_numpy()
+                out[name] = gather(agg, ca, np.nan)
+            elif c == id_col_b:
+                out[name] = _take(df_b[c].astype(str).str.strip(), rows_b)
+            else:
+                out[name] = _take(df_b[c], rows_b)
+
+        merged = pd.concat([left, pd.DataFrame(out, index=left.index)], axis=1)
+    if len(merged) != len(df_a):
+        raise RuntimeError(f"Hasil join {len(merged):,} baris, seharusnya {len(df_a):,} (sama dengan Portal).")
+
+    report = {
+        "portal_rows": len(df_a),
+        "omni_rows":   len(df_b),
+        "matched":     int(exists.sum()),
+        "dup_policy":  dup_policy,
+        "key_opts":    key_opts,
+        "portal":      dup_summary(ca, df_a[id_col_a], n_keys),
+        "omni":        dup_summary(cb, df_b[id_col_b], n_keys),
+    }
+    return merged, exists, report, keys_a
@@ -1,7 +1,21 @@
-import streamlit as st
+import uuid
+
 import pandas as pd
-from difflib import SequenceMatcher
-import io
+import streamlit as st
+from ingest import read_upload, read_header, read_columns, read_many, content_hash
+from engine import (auto_detect, info_columns, required_columns, compare_frames, compare_many, compact_result,
+                    MultiComparison)
+from export import export_bytes, EXPORT_FORMATS
+from table_view import render_table
+from analytics_view import render_analytics
+from join import DEFAULT_KEY_OPTS, DUP_POLICIES, DUP_POLICY_LABELS
+from result_store import ResultStore
+from result_cache import shared_cache, result_key
+from instrument import Trace, activate, stage
+from jobs import shared_jobs, DONE, FAILED
+from fuzzy_match import suggest_matches, with_suggestions, MIN_SCORE
+from detect import detect_info_cols
+from reference_catalog import ReferenceCatalog, build_from_file, list_catalogs
 
 st.set_page_config(page_title="Price Comparator", page_icon="💹", layout="wide")
 
@@ -60,128 +74,33 @@ button[kind="primary"] {
 """, unsafe_allow_html=True)
 
 # ─── Helpers ───────────────────────────────────────────────────────────────────
-PRICE_KW    = ["harga","price","amount","cost","nilai","rate","web","shopee","tokped","tiktok","tokopedia"]
-ID_KW       = ["id","sku","kode","code","barcode","artikel","no","nomor","number","ref","item"]
-BRAND_KW    = ["brand","merk","merek","vendor","manufaktur","manufacturer"]
-KATEGORI_KW = ["kategori","category","cat","tipe","type","jenis","group","grup","divisi","kelas"]
-NAMA_KW     = ["nama","name","produk","product","item","title","judul","description","deskripsi"]
-
-def sim(a, b):
-    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
-
-def best_col(df, keywords):
-    """Return nama kolom yang paling cocok dengan keywords, atau None."""
-    cols = df.columns.tolist()
-    if not cols: return None
-    return sorted(cols, key=lambda c: max(sim(c.lower(), k) for k in keywords), reverse=True)[0]
-
-def auto_detect(df, kind="price"):
-    kw_map = {
-        "price":    PRICE_KW,
-        "id":       ID_KW,
-        "brand":    BRAND_KW,
-        "kategori": KATEGORI_KW,
-        "nama":     NAMA_KW,
-    }
-    kw = kw_map.get(kind, PRICE_KW)
-    return sorted(df.columns, key=lambda c: max(sim(c.lower(), k) for k in kw), reverse=True)[:5]
-
-def detect_info_cols(df):
-    """Auto-detect kolom SKU, Nama, Brand, Kategori dari Portal."""
-    return {
-        "SKU/ID":     best_col(df, ID_KW),
-        "Nama Produk":best_col(df, NAMA_KW),
-        "Brand":      best_col(df, BRAND_KW),
-        "Kategori":   best_col(df, KATEGORI_KW),
-    }
-
-def load_file(f):
+STREAM_AUTO_MB = 25  # file lebih besar dari ini otomatis pakai mode streaming
+
+def load_file(f, stream=False):
+    """Mode normal: parse seluruh file. Mode streaming: header saja (isi dibaca saat analisis)."""
     if f is None: return None
     try:
-        return pd.read_csv(f) if f.name.lower().endswith(".csv") else pd.read_excel(f)
+        return read_header(f.name, f.getvalue()) if stream else read_upload(f.name, f.getvalue())
     except Exception as e:
         st.error(f"Gagal membaca file: {e}")
         return None
 
-def is_kosong(val):
-    """True jika nilai dianggap kosong: NaN, blank, atau 0."""
-    if pd.isna(val):
-        return True
-    s = str(val).strip().replace(",","").replace("Rp","").strip()
-    if s == "" or s == "0" or s == "0.0":
-        return True
-    try:
-        return float(s) == 0
-    except:
-        return True
-
-def to_num(val):
-    """Konversi ke float, return None jika kosong."""
-    if is_kosong(val):
-        return None
-    try:
-        return float(str(val).replace(",","").replace("Rp","").strip())
-    except:
-        return None
-
-def compute_status(portal_series, omni_series, b_exists):
-    """
-    - 0/blank/NaN = kosong, dicek DULU sebelum bandingkan
-    - b_exists False = produk tidak ada di Omni sama sekali (LEFT JOIN)
-    - Selisih selalu positif
-    """
-    out = []
-    for portal_raw, omni_raw, exists in zip(portal_series, omni_series, b_exists):
-        # Produk tidak ada di Omni sama sekali (hasil LEFT JOIN)
-        if not exists:
-            out.append("Tidak Ada di Omni")
-            continue
-
-        portal_kos = is_kosong(portal_raw)
-        omni_kos   = is_kosong(omni_raw)
-
-        if portal_kos and omni_kos:
-            out.append("Data Kosong (Portal & Omni)")
-        elif portal_kos:
-            out.append("Data Kosong (Portal kosong)")
-        elif omni_kos:
-            out.append("Data Kosong (Omni kosong)")
-        else:
-            portal = float(str(portal_raw).replace(",","").replace("Rp","").strip())
-            omni   = float(str(omni_raw).replace(",","").replace("Rp","").strip())
-            if portal == omni:
-                out.append("Sama")
-            elif portal > omni:
-                out.append(f"Tidak Sama - Portal Lebih Mahal (selisih Rp{portal-omni:,.0f})")
-            else:
-                out.append(f"Tidak Sama - Omni Lebih Mahal (selisih Rp{omni-portal:,.0f})")
-
-    return pd.Series(out, index=portal_series.index)
-
-def filter_df(df, status_col, sel):
-    col = df[status_col].astype(str)
-    if sel == "Semua":                          return df
-    elif sel == "Sama":                         return df[col == "Sama"]
-    elif sel == "Tidak Sama":                   return df[col.str.startswith("Tidak Sama")]
-    elif sel == "Portal Lebih Mahal":           return df[col.str.contains("Portal Lebih Mahal")]
-    elif sel == "Omni Lebih Mahal":             return df[col.str.contains("Omni Lebih Mahal")]
-    elif sel == "Data Kosong":                  return df[col.str.startswith("Data Kosong")]
-    elif sel == "Data Kosong (Portal kosong)":  return df[col == "Data Kosong (Portal kosong)"]
-    elif sel == "Data Kosong (Omni kosong)":    return df[col == "Data Kosong (Omni kosong)"]
-    elif sel == "Data Kosong (Keduanya)":       return df[col == "Data Kosong (Portal & Omni)"]
-    elif sel == "Tidak Ada di Omni":            return df[col == "Tidak Ada di Omni"]
-    return df
-
-FILTER_OPTS = [
-    "Semua", "Sama", "Tidak Sama", "Portal Lebih Mahal", "Omni Lebih Mahal",
-    "Data Kosong", "Data Kosong (Portal kosong)", "Data Kosong (Omni kosong)",
-    "Data Kosong (Keduanya)", "Tidak Ada di Omni"
-]
+def select_cols(f, df, cols, stream=False):
+    """Ambil kolom terpilih; mode streaming membacanya langsung dari file per chunk."""
+    return read_columns(f.name, f.getvalue(), cols) if stream else df[cols].copy()
 
 # ─── Session state ─────────────────────────────────────────────────────────────
-for key in ["merged","results","pairs_info","id_col_a","info_cols"]:
-    if key not in st.session_state:
-        st.session_state[key] = None
+if "result" not in st.session_state:
+    st.session_state.result = None
+if "job" not in st.session_state:
+    st.session_state.job = None  # analisis yang sedang berjalan di worker pool (lihat jobs.py)
+if "fuzzy" not in st.session_state:
+    # (id hasil, skor minimum) → salinan hasil + saran nama milik session ini; hasil bersama tidak diubah
+    st.session_state.fuzzy = {}
+if "diag" not in st.session_state:
+    # Catatan waktu/memori per tahap untuk session ini (lihat instrument.py)
+    st.session_state.diag = Trace(session=uuid.uuid4().hex[:8])
+activate(st.session_state.diag)
 
 # ─── Hero ──────────────────────────────────────────────────────────────────────
 st.markdown("""
@@ -197,19 +116,75 @@ with c1:
     st.markdown('<div class="label-tag">File A — Portal</div>', unsafe_allow_html=True)
     file_a = st.file_uploader("Upload File Portal", type=["xlsx","xls","csv"], key="fa", label_visibility="collapsed")
 with c2:
-    st.markdown('<div class="label-tag">File B — Omni</div>', unsafe_allow_html=True)
-    file_b = st.file_uploader("Upload File Omni", type=["xlsx","xls","csv"], key="fb", label_visibility="collapsed")
-
-if not file_a or not file_b:
+    st.markdown('<div class="label-tag">File B — Omni (+ file marketplace lain)</div>', unsafe_allow_html=True)
+    omni_src = st.radio("Sumber Omni", ["Upload file", "Katalog referensi"], horizontal=True, key="omni_src",
+                        label_visibility="collapsed")
+    catalog, files_b = None, []
+    if omni_src == "Upload file":
+        files_b = st.file_uploader("Upload File Omni", type=["xlsx","xls","csv"], key="fb", label_visibility="collapsed",
+                                   accept_multiple_files=True)
+    else:
+        # Omni master di-load sekali ke katalog di disk; analisis berikutnya hanya mem-probe index-nya
+        with st.expander("📚 Bangun / Perbarui Katalog dari File Omni", expanded=not list_catalogs()):
+            cat_file = st.file_uploader("File Omni", type=["xlsx","xls","csv"], key="cat_file")
+            cat_name = st.text_input("Nama katalog", value="omni-master", key="cat_name").strip() or "omni-master"
+            if cat_file and st.button("📚 Bangun Katalog", use_container_width=True, key="cat_build"):
+                with st.spinner("Membangun katalog referensi..."):
+                    try:
+                        meta = build_from_file(cat_file.name, cat_file.getvalue(), cat_name).meta
+                        st.success(f"✅ Katalog '{cat_name}': {meta['keys']:,} SKU, kolom harga: {', '.join(meta['price_cols'])}")
+                    except Exception as e:
+                        st.error(f"Gagal membangun katalog: {e}")
+        catalogs = {m["name"]: m for m in list_catalogs()}
+        if catalogs:
+            cat_sel = st.selectbox("Katalog", list(catalogs), key="catalog_name",
+                                   format_func=lambda n: f"{n} — {catalogs[n]['keys']:,} SKU ({catalogs[n]['built_at']})")
+            catalog = ReferenceCatalog(cat_sel)
+
+if not file_a or not (files_b or catalog):
     st.markdown('<div class="warn-box">⬆️ Upload kedua file (Portal & Omni) untuk mulai analisis.</div>', unsafe_allow_html=True)
     st.stop()
 
-df_a = load_file(file_a)
-df_b = load_file(file_b)
+# File B pertama = Omni utama; file berikutnya = target tambahan (satu Portal vs banyak file)
+file_b, extra_b = (files_b[0], files_b[1:]) if files_b else (None, [])
+
+big_upload  = max([file_a.size] + [f.size for f in files_b]) > STREAM_AUTO_MB * 1024 * 1024
+stream_mode = st.toggle("Mode streaming — hemat memori untuk file sangat besar (hanya kolom terpilih yang dibaca)",
+                        value=big_upload and not extra_b, key="stream_mode", disabled=bool(extra_b),
+                        help="Tidak tersedia jika membandingkan lebih dari satu file B.")
+stream_mode = stream_mode and not extra_b
+if big_upload and extra_b:
+    st.markdown('<div class="warn-box">⚠️ Mode streaming tidak tersedia untuk lebih dari satu file B — '
+                'semua file dibaca utuh ke memori.</div>', unsafe_allow_html=True)
+
+if catalog is not None:
+    df_a = load_file(file_a, stream_mode)
+    df_b = catalog.header()
+    dfs_extra = []
+elif extra_b:
+    # Semua file di-parse paralel (process pool); hasil parse tetap di-cache per isi file
+    try:
+        df_a, df_b, *dfs_extra = read_many([(f.name, f.getvalue()) for f in [file_a] + files_b])
+    except Exception as e:
+        st.error(f"Gagal membaca file: {e}")
+        st.stop()
+else:
+    df_a = load_file(file_a, stream_mode)
+    df_b = load_file(file_b, stream_mode)
+    dfs_extra = []
 if df_a is None or df_b is None:
     st.stop()
 
-st.success(f"✅ Portal: **{len(df_a):,} baris**, {len(df_a.columns)} kolom  |  Omni: **{len(df_b):,} baris**, {len(df_b.columns)} kolom")
+if catalog is not None:
+    meta = catalog.meta
+    portal_msg = f"{len(df_a.columns)} kolom (mode streaming)" if stream_mode else f"**{len(df_a):,} baris**, {len(df_a.columns)} kolom"
+    st.success(f"✅ Portal: {portal_msg}  |  Omni: katalog **{catalog.name}**, {meta['keys']:,} SKU, "
+               f"{len(meta['price_cols'])} kolom harga (dari {meta['source']}, {meta['built_at']})")
+elif stream_mode:
+    st.success(f"✅ Portal: {len(df_a.columns)} kolom  |  Omni: {len(df_b.columns)} kolom  (mode streaming, baris dibaca saat analisis)")
+else:
+    extra_msg = f"  |  + {len(extra_b)} file lain" if extra_b else ""
+    st.success(f"✅ Portal: **{len(df_a):,} baris**, {len(df_a.columns)} kolom  |  Omni: **{len(df_b):,} baris**, {len(df_b.columns)} kolom{extra_msg}")
 st.markdown("---")
 
 # ─── Konfigurasi Kolom ─────────────────────────────────────────────────────────
@@ -224,12 +199,15 @@ with ci1:
     id_col_a  = st.selectbox("Kolom ID/SKU — Portal", all_cols_a,
                               index=all_cols_a.index(id_hint_a[0]) if id_hint_a else 0)
 with ci2:
-    id_hint_b = auto_detect(df_b, "id")
-    id_col_b  = st.selectbox("Kolom ID/SKU — Omni", all_cols_b,
-                              index=all_cols_b.index(id_hint_b[0]) if id_hint_b else 0)
+    if catalog is not None:
+        id_col_b = st.selectbox("Kolom ID/SKU — Omni", [catalog.id_col], disabled=True, key="cat_id")
+    else:
+        id_hint_b = auto_detect(df_b, "id")
+        id_col_b  = st.selectbox("Kolom ID/SKU — Omni", all_cols_b,
+                                  index=all_cols_b.index(id_hint_b[0]) if id_hint_b else 0)
 
 hint_a = auto_detect(df_a, "price")
-hint_b = auto_detect(df_b, "price")
+hint_b = meta["price_cols"] if catalog is not None else auto_detect(df_b, "price")
 st.markdown(f'<div class="info-box">💡 <b>Saran kolom harga Portal:</b> {", ".join(hint_a)}</div>', unsafe_allow_html=True)
 st.markdown(f'<div class="info-box">💡 <b>Saran kolom harga Omni:</b> {", ".join(hint_b)}</div>', unsafe_allow_html=True)
 
@@ -261,180 +239,316 @@ for i in range(int(num_pairs)):
         label = st.text_input("Label", value=f"Pair {i+1}", key=f"lbl_{i}")
     pairs.append((col_a, col_b, label))
 
+# ─── File tambahan ─────────────────────────────────────────────────────────────
+extra_targets = []
+if extra_b:
+    st.markdown("##### 📄 File Tambahan")
+    st.markdown('<div class="info-box">💡 Kolom Portal & label sama dengan pasangan di atas; pilih kolom harga '
+                'di tiap file (atau lewati).</div>', unsafe_allow_html=True)
+    names_b = [f.name for f in files_b]
+    for t, (f, df_t) in enumerate(zip(extra_b, dfs_extra), start=1):
+        name   = f.name if names_b.count(f.name) == 1 else f"{f.name} ({t + 1})"
+        cols_t = df_t.columns.tolist()
+        with st.expander(f"📄 {name} — {len(df_t):,} baris", expanded=True):
+            id_hint_t = auto_detect(df_t, "id")
+            id_col_t  = st.selectbox("Kolom ID/SKU", cols_t, index=cols_t.index(id_hint_t[0]) if id_hint_t else 0,
+                                     key=f"tid_{t}")
+            price_hint_t = auto_detect(df_t, "price")
+            pairs_t = []
+            for i, (col_a, col_b, label) in enumerate(pairs):
+                opts    = ["(lewati)"] + cols_t
+                default = col_b if col_b in cols_t else (price_hint_t[0] if price_hint_t else "(lewati)")
+                col_t   = st.selectbox(f"{label}: {col_a} ↔", opts, index=opts.index(default), key=f"tp_{t}_{i}")
+                if col_t != "(lewati)":
+                    pairs_t.append((col_a, col_t, label))
+        extra_targets.append({"name": name, "df": df_t, "id_col": id_col_t, "pairs": pairs_t})
+
+with st.expander("🧩 Opsi Pencocokan ID"):
+    ko1, ko2, ko3, ko4 = st.columns(4)
+    with ko1:
+        ko_case  = st.checkbox("Abaikan huruf besar/kecil", value=DEFAULT_KEY_OPTS["ignore_case"], key="ko_case")
+    with ko2:
+        ko_float = st.checkbox("Buang akhiran .0 (123.0 → 123)", value=DEFAULT_KEY_OPTS["strip_float"], key="ko_float")
+    with ko3:
+        ko_zeros = st.checkbox("Abaikan nol di depan (00123 → 123)", value=DEFAULT_KEY_OPTS["strip_zeros"], key="ko_zeros")
+    with ko4:
+        dup_policy = st.selectbox("SKU duplikat di Omni", DUP_POLICIES, format_func=DUP_POLICY_LABELS.get, key="dup_policy")
+key_opts = {"ignore_case": ko_case, "strip_float": ko_float, "strip_zeros": ko_zeros}
+if catalog is not None:
+    # Key Omni di katalog sudah dinormalisasi saat dibangun → opsinya yang berlaku
+    key_opts, dup_policy = meta["key_opts"], meta["dup_policy"]
+    st.caption(f"📚 Opsi pencocokan ID & kebijakan duplikat mengikuti katalog '{catalog.name}' "
+               f"({DUP_POLICY_LABELS[dup_policy].lower()}).")
+
+with st.expander("📦 Bandingkan dengan Run Sebelumnya"):
+    sn1, sn2 = st.columns([1, 2])
+    with sn1:
+        use_store = st.checkbox("Simpan & bandingkan snapshot", value=False, key="use_store")
+    with sn2:
+        store_ns = st.text_input("Nama snapshot (mis. kode toko)", value="default", key="store_ns").strip() or "default"
+    if use_store:
+        last_runs = ResultStore(store_ns).runs()
+        if last_runs:
+            st.caption("Run terakhir: " + ", ".join(f"{k} ({v['saved_at']})" for k, v in last_runs.items()))
+        else:
+            st.caption("Belum ada snapshot — run ini akan jadi acuan berikutnya.")
+
 st.markdown("---")
 run = st.button("🚀 Jalankan Analisis", type="primary", use_container_width=True)
 
 # ─── Proses ────────────────────────────────────────────────────────────────────
+# Analisis jalan sebagai job di worker pool: script tidak menunggu, rerun tidak membatalkannya
 if run:
-    with st.spinner("Memproses data..."):
-        try:
-            used_a   = list(dict.fromkeys([p[0] for p in pairs]))
-            used_b   = list(dict.fromkeys([p[1] for p in pairs]))
-
-            # Auto-detect kolom info produk dari Portal SEBELUM merge
-            info_cols_raw = detect_info_cols(df_a)
-            info_col_vals = [v for v in info_cols_raw.values() if v and v in df_a.columns]
-            # Deduplikasi
-            seen_ic = set()
-            info_col_vals = [c for c in info_col_vals if not (c in seen_ic or seen_ic.add(c))]
-
-            # Sertakan kolom info produk di df_a_sel
-            cols_a_all = list(dict.fromkeys([id_col_a] + info_col_vals + used_a))
-            df_a_sel = df_a[cols_a_all].copy()
-            df_b_sel = df_b[list(dict.fromkeys([id_col_b] + used_b))].copy()
-            df_a_sel[id_col_a] = df_a_sel[id_col_a].astype(str).str.strip()
-            df_b_sel[id_col_b] = df_b_sel[id_col_b].astype(str).str.strip()
-
-            merged = pd.merge(df_a_sel, df_b_sel, left_on=id_col_a, right_on=id_col_b,
-                              how="left", suffixes=("_Portal", "_Omni"))
-        except Exception as e:
-            st.error(f"Error saat merge: {e}")
-            st.stop()
-
-        results    = {}
-        pairs_info = []  # simpan info kolom per pair untuk tabel
-
-        for col_a, col_b, label in pairs:
-            col_a_m = col_a + "_Portal" if (col_a in df_b_sel.columns and col_a != id_col_b) else col_a
-            col_b_m = col_b + "_Omni"   if (col_b in df_a_sel.columns and col_b != id_col_a) else col_b
-            if col_a_m not in merged.columns: col_a_m = col_a
-            if col_b_m not in merged.columns: col_b_m = col_b
-            if col_a_m not in merged.columns or col_b_m not in merged.columns:
-                st.warning(f"⚠️ Kolom '{label}' tidak ditemukan, dilewati.")
-                continue
-
-            b_exists = merged[id_col_b].notna() if id_col_b in merged.columns else pd.Series(True, index=merged.index)
-
-            portal_s = merged[col_a_m]
-            omni_s   = merged[col_b_m]
-            status_s = compute_status(portal_s, omni_s, b_exists)
-
-            harga_portal_col = f"[{label}] Harga Portal"
-            harga_omni_col   = f"[{label}] Harga Omni"
-            status_col       = f"[{label}] Status"
-
-            merged[harga_portal_col] = portal_s.apply(to_num)
-            merged[harga_omni_col]   = omni_s.apply(to_num)
-            merged[status_col]       = status_s
-
-            # Statistik
-            sama_n       = int((status_s == "Sama").sum())
-            tidak_sama_n = int(status_s.str.startswith("Tidak Sama").sum())
-            portal_mahal = int(status_s.str.contains("Portal Lebih Mahal").sum())
-            omni_mahal   = int(status_s.str.contains("Omni Lebih Mahal").sum())
-            kosong_n     = int(status_s.str.startswith("Data Kosong").sum())
-            kosong_p     = int((status_s == "Data Kosong (Portal kosong)").sum())
-            kosong_o     = int((status_s == "Data Kosong (Omni kosong)").sum())
-            kosong_both  = int((status_s == "Data Kosong (Portal & Omni)").sum())
-            tidak_ada_n  = int((status_s == "Tidak Ada di Omni").sum())
-            valid_n      = sama_n + tidak_sama_n
-            pct_sama     = (sama_n / valid_n * 100) if valid_n > 0 else 0.0
-            pct_beda     = (tidak_sama_n / valid_n * 100) if valid_n > 0 else 0.0
-
-            results[label] = {
-                "total": len(status_s), "valid": valid_n,
-                "sama": sama_n, "pct_sama": pct_sama,
-                "tidak_sama": tidak_sama_n, "pct_beda": pct_beda,
-                "portal_mahal": portal_mahal, "omni_mahal": omni_mahal,
-                "kosong": kosong_n, "kosong_p": kosong_p,
-                "kosong_o": kosong_o, "kosong_both": kosong_both,
-                "tidak_ada": tidak_ada_n,
-            }
-
-            pairs_info.append({
-                "label":       label,
-                "id_col":      id_col_a,
-                "portal_col":  harga_portal_col,
-                "omni_col":    harga_omni_col,
-                "status_col":  status_col,
-            })
-
-        # Pastikan kolom info yang terdeteksi ada di merged
-        info_cols_valid = {k: v for k, v in info_cols_raw.items() if v and v in merged.columns}
-
-        st.session_state.merged     = merged
-        st.session_state.results    = results
-        st.session_state.pairs_info = pairs_info
-        st.session_state.id_col_a   = id_col_a
-        st.session_state.info_cols  = info_cols_valid
+    # Auto-detect kolom info produk dari Portal SEBELUM merge
+    info_cols_raw, info_col_vals = info_columns(df_a)
+    cols_a_all, cols_b_all = required_columns(id_col_a, id_col_b, pairs, info_col_vals)
+
+    def analyze():
+        # Sertakan kolom info produk di df_a_sel
+        df_a_sel = select_cols(file_a, df_a, cols_a_all, stream_mode)
+        df_b_sel = select_cols(file_b, df_b, cols_b_all, stream_mode) if catalog is None else None
+        res = compare_frames(df_a_sel, df_b_sel, id_col_a, id_col_b, pairs, info_cols_raw,
+                             key_opts=key_opts, dup_policy=dup_policy,
+                             store=ResultStore(store_ns) if use_store else None, catalog=catalog)
+        return compact_result(res)
+
+    def analyze_many():
+        # Satu Portal vs banyak file: key Portal dinormalisasi sekali, tiap file dibandingkan paralel
+        targets = [{"name": file_b.name, "df": df_b[cols_b_all], "id_col": id_col_b, "pairs": pairs}]
+        targets += [{**t, "df": t["df"][required_columns(id_col_a, t["id_col"], t["pairs"])[1]]}
+                    for t in extra_targets if t["pairs"]]
+        for t in targets:
+            # Namespace dari nama target yang unik (bukan stem): "a.csv" dan "a.csv (2)" punya snapshot sendiri
+            t["store"] = ResultStore(f"{store_ns}-{t['name']}") if use_store else None
+        res = compare_many(df_a[cols_a_all], targets, id_col_a, info_cols_raw,
+                           key_opts=key_opts, dup_policy=dup_policy)
+        for r in res.targets.values():
+            compact_result(r)
+        return res
+
+    def work():
+        # Jalan di thread worker: tanpa pemanggilan st.*, peringatan dikembalikan sebagai teks
+        notes = [f"{t['name']}: tidak ada kolom harga yang dipilih, dilewati." for t in extra_targets if not t["pairs"]]
+        # Hasil dibagi antar session lewat cache proses (kecuali mode snapshot: hasilnya bergantung run sebelumnya)
+        with stage("analisis", pairs=len(pairs), files=1 + len(extra_targets)) as rec:
+            if extra_targets:
+                result, cache_hit = analyze_many(), False
+            elif use_store:
+                result, cache_hit = analyze(), False
+            else:
+                hash_b = f"catalog:{catalog.name}:{catalog.version}" if catalog is not None else content_hash(file_b.getvalue())
+                key = result_key(content_hash(file_a.getvalue()), hash_b,
+                                 id_col_a, id_col_b, pairs, info_cols_raw, key_opts, dup_policy)
+                result, cache_hit = shared_cache().get_or_compute(key, analyze)
+            rec.update(rows=len(result.merged) if not extra_targets else len(df_a), cache_hit=cache_hit)
+        if isinstance(result, MultiComparison):
+            notes += [f"{name}: {err}" for name, err in result.failed.items()]
+            notes += [f"{name}: kolom '{label}' tidak ditemukan, dilewati."
+                      for name, r in result.targets.items() for label in r.skipped]
+        else:
+            notes += [f"Kolom '{label}' tidak ditemukan, dilewati." for label in result.skipped]
+        return result, cache_hit, notes
+
+    # Perkiraan jumlah tahap untuk progress: normalize, merge, status, compact + status/stats per pasangan
+    target_pairs = [pairs] + [t["pairs"] for t in extra_targets if t["pairs"]]
+    steps = 1 + sum(4 + 2 * len(p) for p in target_pairs) + (2 if stream_mode else 0) + bool(extra_targets)
+
+    prev = st.session_state.job
+    if prev is not None and prev.active:
+        prev.cancel()  # run baru menggantikan analisis yang belum selesai
+    st.session_state.job = shared_jobs().submit(work, label=f"{file_a.name} vs {', '.join(f.name for f in files_b) or catalog.name}",
+                                                steps=steps, parent=st.session_state.diag)
+
+
+@st.fragment(run_every=1.0)
+def job_status():
+    """Progress job; di-poll tiap detik tanpa menjalankan ulang seluruh halaman."""
+    job = st.session_state.job
+    if job is None or st.session_state.get("job_finished") == job.id:
+        return  # hasil sudah (atau sedang) dipasang oleh rerun penuh
+    if not job.active:
+        st.session_state.job_finished = job.id
+        st.rerun()  # transisi aktif → selesai: rerun penuh sekali untuk memasang hasilnya
+    st.progress(job.progress, text=f"⏳ {job.message} ({job.elapsed:.0f} detik)")
+    if st.button("✖️ Batalkan Analisis", key="job_cancel"):
+        job.cancel()
+        st.rerun()
+
+
+job = st.session_state.job
+if job is not None:
+    if job.active:
+        job_status()
+    else:
+        st.session_state.job = None
+        if job.state == DONE:
+            result, cache_hit, notes = job.result
+            st.session_state.result = result
+            st.session_state.fuzzy  = {}
+            if cache_hit:
+                st.caption("♻️ Hasil yang sama sudah pernah dihitung di server ini — memakai hasil bersama.")
+            for note in notes:
+                st.warning(f"⚠️ {note}")
+        elif job.state == FAILED:
+            st.error(f"Error saat analisis: {job.error}")
+        else:
+            st.markdown('<div class="warn-box">✖️ Analisis dibatalkan.</div>', unsafe_allow_html=True)
 
 # ─── Tampilkan Hasil ───────────────────────────────────────────────────────────
-if st.session_state.merged is None:
+if st.session_state.result is None:
     st.stop()
 
-merged     = st.session_state.merged
-results    = st.session_state.results
-pairs_info = st.session_state.pairs_info
-id_col_a   = st.session_state.id_col_a
-info_cols  = st.session_state.info_cols or {}
+result = st.session_state.result
+multi  = isinstance(result, MultiComparison)
+
+
+def show_result(result, key=""):
+    """Statistik + tabel detail per pasangan untuk satu ComparisonResult."""
+    merged     = result.merged
+    results    = result.results
+    pairs_info = result.pairs_info
+    id_col_a   = result.id_col_a
+
+    st.markdown(f"""
+    <div class="stat-card" style="margin-bottom:1.5rem;background:linear-gradient(135deg,#a8ff7808,#78ffd608);border-color:#a8ff7830">
+      <div class="val blue">{len(merged):,}</div>
+      <div class="lbl">Total Produk Portal</div>
+    </div>""", unsafe_allow_html=True)
+
+    # ── Ringkasan pencocokan ID ──
+    jr = result.join_report
+    if jr:
+        st.markdown(f'<div class="info-box">🧩 <b>ID cocok:</b> {jr["matched"]:,} dari {jr["portal_rows"]:,} baris Portal '
+                    f'(Omni: {jr["omni_rows"]:,} baris)</div>', unsafe_allow_html=True)
+        for side, name in [("omni", "Omni"), ("portal", "Portal")]:
+            d = jr[side]
+            if d["dup_keys"]:
+                extra = f' — dipakai: <b>{DUP_POLICY_LABELS[jr["dup_policy"]]}</b>' if side == "omni" else ""
+                st.markdown(f'<div class="warn-box">⚠️ <b>{d["dup_keys"]:,} SKU duplikat di {name}</b> '
+                            f'({d["dup_rows"]:,} baris), contoh: {", ".join(map(str, d["examples"]))}{extra}</div>',
+                            unsafe_allow_html=True)
+            if d["blank"]:
+                st.markdown(f'<div class="warn-box">⚠️ {d["blank"]:,} baris {name} tanpa ID</div>', unsafe_allow_html=True)
+
+    # ── Statistik + Tabel per pasangan ────────────────────────────────────────────
+    for info in pairs_info:
+        label      = info["label"]
+        status_col = info["status_col"]
+        r          = results[label]
+
+        # ── Statistik ──
+        st.markdown(f"#### 🔍 {label}")
+
+        s1, s2 = st.columns(2, gap="large")
+        with s1:
+            st.markdown(f'<div class="stat-card"><div class="val green">{r["pct_sama"]:.2f}%</div><div class="lbl">% Sama (dari data valid)</div></div>', unsafe_allow_html=True)
+        with s2:
+            st.markdown(f'<div class="stat-card"><div class="val red">{r["pct_beda"]:.2f}%</div><div class="lbl">% Tidak Sama (dari data valid)</div></div>', unsafe_allow_html=True)
+
+        st.markdown("<div style='margin-top:0.75rem'></div>", unsafe_allow_html=True)
+
+        s3, s4, s5, s6 = st.columns(4, gap="large")
+        with s3:
+            st.markdown(f'<div class="stat-card"><div class="val green">{r["sama"]:,}</div><div class="lbl">Baris Sama</div></div>', unsafe_allow_html=True)
+        with s4:
+            st.markdown(f'<div class="stat-card"><div class="val red">{r["tidak_sama"]:,}</div><div class="lbl">Baris Tidak Sama</div></div>', unsafe_allow_html=True)
+        with s5:
+            st.markdown(f'<div class="stat-card"><div class="val gold">{r["kosong"]:,}</div><div class="lbl">Data Kosong</div></div>', unsafe_allow_html=True)
+        with s6:
+            st.markdown(f'<div class="stat-card"><div class="val purple">{r["tidak_ada"]:,}</div><div class="lbl">Tidak Ada di Omni</div></div>', unsafe_allow_html=True)
+
+        if r["tidak_sama"] > 0:
+            st.markdown(f"""
+            <div class="info-box" style="margin-top:0.75rem">
+              📊 <b>Detail Tidak Sama ({r["tidak_sama"]:,} baris):</b><br>
+              &nbsp;&nbsp;• Portal lebih mahal → <b>{r["portal_mahal"]:,} baris</b><br>
+              &nbsp;&nbsp;• Omni lebih mahal &nbsp;→ <b>{r["omni_mahal"]:,} baris</b>
+            </div>""", unsafe_allow_html=True)
+
+        if r.get("delta"):
+            d = r["delta"]
+            st.markdown(f"""
+            <div class="info-box" style="margin-top:0.75rem">
+              🕑 <b>Berubah sejak run terakhir</b> ({d["dihitung"]:,} status baris dihitung ulang):<br>
+              &nbsp;&nbsp;• Baru tidak sama → <b>{d["baru_beda"]:,} baris</b><br>
+              &nbsp;&nbsp;• Diperbaiki (baru sama) → <b>{d["diperbaiki"]:,} baris</b><br>
+              &nbsp;&nbsp;• Baru tidak ada di Omni → <b>{d["baru_hilang"]:,} baris</b><br>
+              &nbsp;&nbsp;• SKU baru → <b>{d["sku_baru"]:,} baris</b>
+            </div>""", unsafe_allow_html=True)
+
+        if r["kosong"] > 0:
+            st.markdown(f"""
+            <div class="kosong-box">
+              📭 <b>Detail Data Kosong ({r["kosong"]:,} baris):</b><br>
+              &nbsp;&nbsp;• Portal kosong, Omni ada &nbsp;→ <b>{r["kosong_p"]:,} baris</b><br>
+              &nbsp;&nbsp;• Omni kosong, Portal ada &nbsp;→ <b>{r["kosong_o"]:,} baris</b><br>
+              &nbsp;&nbsp;• Keduanya kosong &nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;→ <b>{r["kosong_both"]:,} baris</b>
+            </div>""", unsafe_allow_html=True)
+
+        # ── Tabel Detail langsung di bawah statistik pair ini ──
+        st.markdown(f'<div class="tabel-title">📋 Tabel Detail — {label}</div>', unsafe_allow_html=True)
+
+        tabel_cols = [id_col_a, info["portal_col"], info["omni_col"], status_col, info["selisih_col"], info.get("delta_col")]
+        tabel_cols = [c for c in tabel_cols if c in merged.columns]
+        render_table(result, info, tabel_cols, key=key)
+
+        st.markdown("---")
+
+    if result.cubes is not None:
+        with st.expander("📈 Analitik Brand & Kategori"):
+            render_analytics(result, key=key)
+
 
 st.markdown('<p class="section-title">📊 Hasil Analisis</p>', unsafe_allow_html=True)
 
-st.markdown(f"""
-<div class="stat-card" style="margin-bottom:1.5rem;background:linear-gradient(135deg,#a8ff7808,#78ffd608);border-color:#a8ff7830">
-  <div class="val blue">{len(merged):,}</div>
-  <div class="lbl">Total Produk Portal</div>
-</div>""", unsafe_allow_html=True)
-
-# ── Statistik + Tabel per pasangan ────────────────────────────────────────────
-for info in pairs_info:
-    label      = info["label"]
-    status_col = info["status_col"]
-    r          = results[label]
-
-    # ── Statistik ──
-    st.markdown(f"#### 🔍 {label}")
-
-    s1, s2 = st.columns(2, gap="large")
-    with s1:
-        st.markdown(f'<div class="stat-card"><div class="val green">{r["pct_sama"]:.2f}%</div><div class="lbl">% Sama (dari data valid)</div></div>', unsafe_allow_html=True)
-    with s2:
-        st.markdown(f'<div class="stat-card"><div class="val red">{r["pct_beda"]:.2f}%</div><div class="lbl">% Tidak Sama (dari data valid)</div></div>', unsafe_allow_html=True)
-
-    st.markdown("<div style='margin-top:0.75rem'></div>", unsafe_allow_html=True)
-
-    s3, s4, s5, s6 = st.columns(4, gap="large")
-    with s3:
-        st.markdown(f'<div class="stat-card"><div class="val green">{r["sama"]:,}</div><div class="lbl">Baris Sama</div></div>', unsafe_allow_html=True)
-    with s4:
-        st.markdown(f'<div class="stat-card"><div class="val red">{r["tidak_sama"]:,}</div><div class="lbl">Baris Tidak Sama</div></div>', unsafe_allow_html=True)
-    with s5:
-        st.markdown(f'<div class="stat-card"><div class="val gold">{r["kosong"]:,}</div><div class="lbl">Data Kosong</div></div>', unsafe_allow_html=True)
-    with s6:
-        st.markdown(f'<div class="stat-card"><div class="val purple">{r["tidak_ada"]:,}</div><div class="lbl">Tidak Ada di Omni</div></div>', unsafe_allow_html=True)
-
-    if r["tidak_sama"] > 0:
-        st.markdown(f"""
-        <div class="info-box" style="margin-top:0.75rem">
-          📊 <b>Detail Tidak Sama ({r["tidak_sama"]:,} baris):</b><br>
-          &nbsp;&nbsp;• Portal lebih mahal → <b>{r["portal_mahal"]:,} baris</b><br>
-          &nbsp;&nbsp;• Omni lebih mahal &nbsp;→ <b>{r["omni_mahal"]:,} baris</b>
-        </div>""", unsafe_allow_html=True)
-
-    if r["kosong"] > 0:
-        st.markdown(f"""
-        <div class="kosong-box">
-          📭 <b>Detail Data Kosong ({r["kosong"]:,} baris):</b><br>
-          &nbsp;&nbsp;• Portal kosong, Omni ada &nbsp;→ <b>{r["kosong_p"]:,} baris</b><br>
-          &nbsp;&nbsp;• Omni kosong, Portal ada &nbsp;→ <b>{r["kosong_o"]:,} baris</b><br>
-          &nbsp;&nbsp;• Keduanya kosong &nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;→ <b>{r["kosong_both"]:,} baris</b>
-        </div>""", unsafe_allow_html=True)
-
-    # ── Tabel Detail langsung di bawah statistik pair ini ──
-    st.markdown(f'<div class="tabel-title">📋 Tabel Detail — {label}</div>', unsafe_allow_html=True)
-
-    tabel_cols = [id_col_a, info["portal_col"], info["omni_col"], status_col]
-    tabel_cols = [c for c in tabel_cols if c in merged.columns]
-    base_df    = merged[tabel_cols].copy().reset_index(drop=True)
-
-    filter_key = f"filter_{label}"
-    filter_sel = st.selectbox(f"Filter — {label}:", FILTER_OPTS, key=filter_key)
-    show_df    = filter_df(base_df, status_col, filter_sel)
-
-    st.caption(f"Menampilkan {len(show_df):,} dari {len(base_df):,} baris")
-    st.dataframe(show_df.reset_index(drop=True), use_container_width=True, height=380)
-
-    st.markdown("---")
+if multi:
+    for name, err in result.failed.items():
+        st.markdown(f'<div class="warn-box">⚠️ {name}: {err}</div>', unsafe_allow_html=True)
+    tabs = st.tabs([f"📄 {name}" for name in result.targets])
+    for t, (tab, r) in enumerate(zip(tabs, result.targets.values())):
+        with tab:
+            show_result(r, key=f"t{t}_")
+    first = next(iter(result.targets.values()), None)
+    if first is None:
+        st.stop()
+    info_cols = first.info_cols or {}
+else:
+    show_result(result)
+    info_cols = result.info_cols or {}
+
+# ─── Saran pencocokan nama ─────────────────────────────────────────────────────
+# (hanya untuk satu file Omni; baris "Tidak Ada di Omni" dicocokkan dengan nama produk di Omni)
+dl_result = result  # hasil untuk download: + sheet saran jika sudah dicari di session ini
+n_tidak_ada = result.results[result.pairs_info[0]["label"]]["tidak_ada"] if not multi and result.pairs_info else 0
+if n_tidak_ada:
+    with st.expander(f"🔎 Saran Pencocokan Nama — {n_tidak_ada:,} baris Tidak Ada di Omni"):
+        st.markdown('<div class="info-box">💡 SKU yang tidak ketemu dicocokkan lewat kemiripan <b>Nama Produk</b> '
+                    '(dibatasi per <b>Brand</b>). Ini hanya saran — hasil cocok ID di atas tidak berubah.</div>',
+                    unsafe_allow_html=True)
+        fz1, fz2 = st.columns([3, 1])
+        with fz1:
+            min_score = st.slider("Skor minimum", 0.5, 1.0, MIN_SCORE, 0.05, key="fuzzy_min")
+        with fz2:
+            fuzzy_run = st.button("🔎 Cari Saran", use_container_width=True)
+        if fuzzy_run:
+            with st.spinner("Mencocokkan nama produk..."):
+                try:
+                    df_cat    = catalog.frame() if catalog is not None else None
+                    omni_info = detect_info_cols(df_cat if df_cat is not None else df_b)
+                    fz_cols   = [c for c in dict.fromkeys([id_col_b, omni_info.get("Nama Produk"), omni_info.get("Brand")]) if c]
+                    if df_cat is not None:
+                        df_omni = df_cat
+                    else:
+                        df_omni = read_columns(file_b.name, file_b.getvalue(), fz_cols) if stream_mode else df_b
+                    sugg = suggest_matches(result, df_omni, id_col_b, omni_info, min_score=min_score)
+                    st.session_state.fuzzy[(id(result), min_score)] = with_suggestions(result, sugg)
+                except ValueError as e:
+                    st.warning(f"⚠️ {e}")
+        dl_result = st.session_state.fuzzy.get((id(result), min_score), result)
+        sugg = dl_result.suggestions
+        if sugg is not None:
+            st.caption(f"{len(sugg):,} saran (skor 1.0 = nama identik). Ikut disertakan di file download sebagai sheet 'Saran Nama'.")
+            st.dataframe(sugg, use_container_width=True, height=320, hide_index=True)
 
 # ─── Download ──────────────────────────────────────────────────────────────────
 st.markdown('<p class="section-title">⬇️ Download Hasil</p>', unsafe_allow_html=True)
@@ -446,45 +560,28 @@ if info_cols:
 else:
     st.markdown('<div class="warn-box">⚠️ Tidak ada kolom SKU/Brand/Kategori/Nama yang terdeteksi otomatis dari file Portal.</div>', unsafe_allow_html=True)
 
-buf = io.BytesIO()
-with pd.ExcelWriter(buf, engine="openpyxl") as writer:
-    # Sheet detail per pair
-    # Kolom info produk yang akan disertakan di setiap sheet
-    info_col_list = [v for v in info_cols.values() if v and v in merged.columns]
-    # Hapus duplikat tapi jaga urutan
-    seen = set()
-    info_col_list = [c for c in info_col_list if not (c in seen or seen.add(c))]
-
-    for info in pairs_info:
-        label      = info["label"]
-        base_cols  = [id_col_a] + info_col_list + [info["portal_col"], info["omni_col"], info["status_col"]]
-        tbl_cols   = [c for c in dict.fromkeys(base_cols) if c in merged.columns]
-        sheet_name = label[:31]
-        df_sheet   = merged[tbl_cols].copy()
-        # Rename kolom info supaya lebih rapi di Excel
-        rename_map = {v: k for k, v in info_cols.items() if v in df_sheet.columns}
-        df_sheet.rename(columns=rename_map, inplace=True)
-        df_sheet.to_excel(writer, sheet_name=sheet_name, index=False)
-
-    # Sheet ringkasan
-    pd.DataFrame([{
-        "Marketplace":         lbl,
-        "Total Produk Portal": r["total"],
-        "Data Valid":          r["valid"],
-        "Sama":                r["sama"],
-        "% Sama":              f"{r['pct_sama']:.2f}%",
-        "Tidak Sama":          r["tidak_sama"],
-        "% Tidak Sama":        f"{r['pct_beda']:.2f}%",
-        "Portal Lebih Mahal":  r["portal_mahal"],
-        "Omni Lebih Mahal":    r["omni_mahal"],
-        "Data Kosong":         r["kosong"],
-        "Kosong (Portal)":     r["kosong_p"],
-        "Kosong (Omni)":       r["kosong_o"],
-        "Kosong (Keduanya)":   r["kosong_both"],
-        "Tidak Ada di Omni":   r["tidak_ada"],
-    } for lbl, r in results.items()]).to_excel(writer, sheet_name="Ringkasan", index=False)
-
-st.download_button("📥 Download Hasil (.xlsx)", data=buf.getvalue(),
-                   file_name="hasil_perbandingan_harga.xlsx",
-                   mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                   use_container_width=True)
\ No newline at end of file
+# File dibuat hanya saat diminta, lalu di-cache di hasil analisis ini
+fmt_labels = {"xlsx": "Excel (.xlsx)", "csv.zip": "CSV (.zip)", "parquet.zip": "Parquet (.zip)"}
+dl1, dl2 = st.columns([3, 1], gap="large")
+with dl1:
+    export_fmt = st.radio("Format download", list(EXPORT_FORMATS), format_func=fmt_labels.get,
+                          horizontal=True, key="export_fmt")
+with dl2:
+    if export_fmt not in dl_result.exports and st.button("⚙️ Siapkan File", use_container_width=True):
+        with st.spinner("Menyiapkan file download..."):
+            export_bytes(dl_result, export_fmt)
+
+if export_fmt in dl_result.exports:
+    file_name, mime = EXPORT_FORMATS[export_fmt]
+    st.download_button(f"📥 Download Hasil ({fmt_labels[export_fmt]})", data=dl_result.exports[export_fmt],
+                       file_name=file_name, mime=mime, use_container_width=True)
+
+# ─── Diagnostik ────────────────────────────────────────────────────────────────
+with st.expander("🩺 Diagnostik Performa"):
+    diag = st.session_state.diag.rows()
+    if diag:
+        st.caption("Tahap terakhir yang dijalankan di session ini (waktu, baris, memori proses). "
+                   "Tahap yang diambil dari cache tidak muncul ulang.")
+        st.dataframe(pd.DataFrame(diag), use_container_width=True, hide_index=True)
+    else:
+        st.caption("Belum ada tahap yang tercatat.")
@@ -0,0 +1,420 @@
+"""
+Katalog referensi Omni di disk: sekali di-load, dipakai berulang oleh banyak perbandingan.
+
+Export Omni (master referensi) jauh lebih jarang berubah dibanding file Portal
+yang dicek terhadapnya, tapi selama ini di-parse, dinormalisasi dan di-merge
+ulang setiap analisis. Katalog menyimpan hasil kerja sisi Omni itu:
+- key SKU ter-normalisasi, unik (duplikat sudah diselesaikan dengan dup_policy)
+- kolom harga sudah di-parse ke float64 (NaN = kosong), kolom info sebagai teks
+dalam satu file Arrow IPC tanpa kompresi → dibuka dengan memory-map (zero-copy).
+Tiap build menulis file data baru (data-<versi>.arrow) lalu memindahkan meta.json
+ke versi itu; file yang mungkin masih ter-mmap tidak pernah ditimpa (Windows).
+Index hash key dibangun sekali per proses per versi katalog, jadi satu
+perbandingan hanya membayar sisi Portal: normalisasi key Portal, probe batch,
+lalu ambil baris katalog yang cocok saja.
+
+    python reference_catalog.py build omni.xlsx --name master --id "Kode Barang"
+    python reference_catalog.py list
+    python reference_catalog.py serve --port 8765       # endpoint HTTP lokal
+
+Endpoint HTTP (JSON, batch maks. MAX_BATCH ID per request):
+    GET  /catalogs                      → daftar katalog (meta)
+    GET  /catalogs/<nama>               → meta satu katalog
+    POST /catalogs/<nama>/lookup        {"ids": [...], "columns": [...]}
+    POST /catalogs/<nama>/compare       {"ids": [...], "prices": {"<kolom harga katalog>": [harga Portal, ...]}}
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from engine import parse_price, compute_status, status_stats, auto_detect, detect_info_cols, unique, STATUS_LABELS
+from instrument import stage
+from join import normalize_keys, build_lookup, join_frames, dup_summary, DEFAULT_KEY_OPTS
+from result_store import slug
+
+CATALOG_DIR = os.environ.get("CEKHARGA_CATALOG_DIR", os.path.join(os.path.expanduser("~"), ".cekharga", "catalogs"))
+SERVE_HOST  = os.environ.get("CEKHARGA_CATALOG_HOST", "127.0.0.1")
+SERVE_PORT  = int(os.environ.get("CEKHARGA_CATALOG_PORT", "8765"))
+MAX_BATCH   = 200_000   # ID per request HTTP
+KEY_COL     = "__key__"
+
+_lock = threading.Lock()
+_OPEN = {}  # folder katalog → (versi, tabel Arrow ter-mmap, index key); dibagi semua session/thread
+
+
+def _col_numpy(col):
+    """Kolom Arrow float64 → numpy tanpa copy (file ditulis satu chunk, kosong = NaN)."""
+    if col.num_chunks == 1:
+        return col.chunk(0).to_numpy(zero_copy_only=False)
+    return col.to_numpy()
+
+
+# ─── Build ─────────────────────────────────────────────────────────────────────
+def build_catalog(df, name, id_col, price_cols, info_cols=(), key_opts=None, dup_policy="first",
+                  source=None, root=CATALOG_DIR):
+    """
+    Bangun (atau ganti) katalog `name` dari frame Omni. Return ReferenceCatalog.
+    price_cols di-parse ke float64; dup_policy first/last memilih baris, min/max/mean
+    mengagregasi harga per key (seperti join.join_frames). Key kosong dibuang.
+    """
+    key_opts   = {**DEFAULT_KEY_OPTS, **(key_opts or {})}
+    price_cols = unique(c for c in price_cols if c != id_col)
+    info_cols  = unique(c for c in info_cols if c != id_col and c not in price_cols)
+    df = df.reset_index(drop=True)
+
+    with stage("catalog_build", rows=len(df), cols=1 + len(price_cols) + len(info_cols)) as rec:
+        codes, keys = pd.factorize(normalize_keys(df[id_col], **key_opts), use_na_sentinel=True)
+        rows = build_lookup(codes, len(keys), "last" if dup_policy == "last" else "first")
+        valid = codes >= 0
+
+        cols = {KEY_COL: pa.array(np.asarray(keys, dtype=object), type=pa.string()),
+                id_col: pa.array(df[id_col].astype(str).str.strip().to_numpy(dtype=object)[rows], type=pa.string())}
+        for c in price_cols:
+            vals = parse_price(df[c])
+            if dup_policy in ("min", "max", "mean"):
+                vals = pd.Series(vals[valid]).groupby(codes[valid]).agg(dup_policy).reindex(range(len(keys))).to_numpy()
+            else:
+                vals = vals[rows]
+            cols[c] = pa.array(vals, type=pa.float64())
+        for c in info_cols:
+            cols[c] = pa.array(df[c].astype("string").to_numpy(dtype=object, na_value=None)[rows], type=pa.string())
+        table = pa.table(cols)
+        rec["keys"] = len(keys)
+
+        version = hashlib.blake2b(f"{name}{time.time_ns()}".encode(), digest_size=8).hexdigest()
+        cat = ReferenceCatalog(name, root)
+        os.makedirs(cat.dir, exist_ok=True)
+        data_file = f"data-{version}.arrow"
+        tmp = os.path.join(cat.dir, f"{data_file}.{os.getpid()}.tmp")
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=max(1, len(table)))
+        os.replace(tmp, os.path.join(cat.dir, data_file))  # nama baru: belum pernah di-mmap
+        meta = {
+            "name":        name,
+            "source":      source,
+            "id_col":      id_col,
+            "price_cols":  price_cols,
+            "info_cols":   info_cols,
+            "key_opts":    key_opts,
+            "dup_policy":  dup_policy,
+            "rows":        int(len(df)),
+            "keys":        int(len(keys)),
+            "omni":        dup_summary(codes, df[id_col], len(keys)),
+            "built_at":    time.strftime("%Y-%m-%d %H:%M:%S"),
+            "version":     version,
+            "data_file":   data_file,
+        }
+        with _lock:
+            prev = cat.meta.get("data_file", "data.arrow") if os.path.exists(cat.meta_path) else None
+            tmp_meta = cat.meta_path + f".{os.getpid()}.tmp"
+            with open(tmp_meta, "w", encoding="utf-8") as fh:
+                json.dump(meta, fh, ensure_ascii=False, indent=1, default=str)
+            os.replace(tmp_meta, cat.meta_path)
+        _prune_data(cat.dir, keep={data_file, prev})
+    cat = ReferenceCatalog(name, root)
+    cat._meta = meta  # objek yang dikembalikan = versi yang baru dibangun
+    return cat
+
+
+def _prune_data(folder, keep):
+    """Hapus file data versi lama (versi ini & sebelumnya disimpan); yang masih ter-mmap di Windows dilewati."""
+    for f in os.listdir(folder):
+        if f.startswith("data") and f.endswith(".arrow") and f not in keep:
+            try:
+                os.remove(os.path.join(folder, f))
+            except OSError:
+                pass
+
+
+def build_from_file(file_name, data, name, id_col=None, price_cols=None, **opts):
+    """Bangun katalog dari bytes file Omni; ID/harga/info dideteksi otomatis jika tidak diberikan."""
+    from ingest import read_upload
+    df = read_upload(file_name, data)
+    id_col     = id_col or (auto_detect(df, "id") or [df.columns[0]])[0]
+    price_cols = price_cols or [c for c in auto_detect(df, "price") if c != id_col]
+    info_cols  = opts.pop("info_cols", None)
+    if info_cols is None:
+        info_cols = [v for v in detect_info_cols(df).values() if v]
+    return build_catalog(df, name, id_col, price_cols, info_cols, source=file_name, **opts)
+
+
+# ─── Baca & probe ──────────────────────────────────────────────────────────────
+class ReferenceCatalog:
+    """
+    Katalog referensi Omni di folder lokal (meta.json + data-<versi>.arrow).
+    meta.json dibaca sekali per objek: satu objek = satu versi katalog, jadi satu
+    analisis tidak berganti versi di tengah jalan. Build baru → buat objek baru.
+    """
+
+    def __init__(self, name, root=CATALOG_DIR):
+        self.name      = name
+        self.dir       = os.path.join(root, slug(name))
+        self.meta_path = os.path.join(self.dir, "meta.json")
+        self._meta     = None
+
+    def exists(self):
+        return os.path.exists(self.meta_path) and os.path.exists(self.path)
+
+    @property
+    def meta(self):
+        if self._meta is None:
+            with open(self.meta_path, encoding="utf-8") as fh:
+                self._meta = json.load(fh)
+        return self._meta
+
+    @property
+    def path(self):
+        """File data versi ini (katalog lama tanpa "data_file": data.arrow)."""
+        return os.path.join(self.dir, self.meta.get("data_file", "data.arrow"))
+
+    @property
+    def id_col(self):
+        return self.meta["id_col"]
+
+    @property
+    def key_opts(self):
+        return self.meta["key_opts"]
+
+    @property
+    def columns(self):
+        m = self.meta
+        return [m["id_col"]] + m["price_cols"] + m["info_cols"]
+
+    @property
+    def version(self):
+        return self.meta["version"]
+
+    def header(self):
+        """Frame kosong berisi nama kolom katalog (untuk pilihan kolom di UI)."""
+        return pd.DataFrame(columns=self.columns)
+
+    def _open(self):
+        """(tabel ter-mmap, index key) versi terbaru; dibuka sekali per proses per versi."""
+        version = self.version
+        with _lock:
+            hit = _OPEN.get(self.dir)
+            if hit is not None and hit[0] == version:
+                return hit[1], hit[2]
+        with stage(f"catalog_open[{self.name}]") as rec:
+            table = pa.ipc.open_file(pa.memory_map(self.path, "r")).read_all()
+            index = pd.Index(table.column(KEY_COL).to_numpy(zero_copy_only=False), dtype=object)
+            index.get_indexer(index[:1])  # bangun hash table sekarang, bukan saat probe pertama
+            rec["rows"] = len(table)
+        with _lock:
+            _OPEN[self.dir] = (version, table, index)
+        return table, index
+
+    def probe(self, keys):
+        """Posisi baris katalog untuk key ter-normalisasi (-1 = tidak ada / key kosong)."""
+        _, index = self._open()
+        keys = np.asarray(keys, dtype=object)
+        pos  = index.get_indexer(keys)
+        pos[pd.isna(keys)] = -1
+        return pos
+
+    def take(self, pos, columns):
+        """Kolom katalog pada posisi `pos` (-1 → kosong) sebagai DataFrame."""
+        table, _ = self._open()
+        pos   = np.asarray(pos, dtype=np.int64)
+        found = pos >= 0
+        out   = {}
+        for c in unique(columns):
+            col = table.column(c)
+            if pa.types.is_floating(col.type):
+                vals = np.full(len(pos), np.nan)
+                vals[found] = _col_numpy(col)[pos[found]]
+                out[c] = vals
+            else:
+                idx = pa.array(np.where(found, pos, 0), mask=~found)
+                out[c] = pc.take(col, idx).to_pandas(types_mapper=pd.ArrowDtype).astype("string")
+        return pd.DataFrame(out)
+
+    def frame(self, columns=None):
+        """Isi katalog utuh (kolom terpilih) — untuk proses yang memang butuh semua baris Omni."""
+        table, _ = self._open()
+        return self.take(np.arange(len(table)), columns or self.columns)
+
+    def lookup(self, ids, columns=None):
+        """ID mentah → (found bool array, DataFrame kolom katalog)."""
+        keys = normalize_keys(pd.Series(ids, dtype=object), **self.key_opts)
+        pos  = self.probe(keys)
+        return pos >= 0, self.take(pos, columns or self.columns)
+
+    def join(self, df_a, id_col_a, columns, keys_a=None):
+        """
+        Pengganti join.join_frames dengan katalog sebagai sisi Omni (kontrak return sama).
+        Hanya baris katalog yang cocok dengan Portal yang diambil dari file.
+        """
+        meta = self.meta
+        if keys_a is None:
+            keys_a = normalize_keys(df_a[id_col_a], **meta["key_opts"])
+        with stage(f"probe[{self.name}]", rows=len(df_a)) as rec:
+            pos = self.probe(keys_a)
+            hit = np.unique(pos[pos >= 0])
+            sub = self.take(hit, [meta["id_col"]] + [c for c in columns if c != meta["id_col"]])
+            table, _ = self._open()
+            sub_keys = np.asarray(table.column(KEY_COL).take(pa.array(hit)).to_pylist(), dtype=object)
+            rec["matched"] = len(hit)
+        merged, exists, report, keys_a = join_frames(df_a, sub, id_col_a, meta["id_col"], key_opts=meta["key_opts"],
+                                                     keys_a=keys_a, keys_b=sub_keys)
+        report.update(omni_rows=meta["rows"], dup_policy=meta["dup_policy"], omni=meta["omni"], catalog=self.name)
+        return merged, exists, report, keys_a
+
+
+def list_catalogs(root=CATALOG_DIR):
+    """Meta semua katalog yang ada di root (urut nama)."""
+    out = []
+    if os.path.isdir(root):
+        for d in sorted(os.listdir(root)):
+            try:
+                with open(os.path.join(root, d, "meta.json"), encoding="utf-8") as fh:
+                    out.append(json.load(fh))
+            except (OSError, ValueError):
+                continue
+    return sorted(out, key=lambda m: m["name"])
+
+
+# ─── HTTP lokal ────────────────────────────────────────────────────────────────
+def _json_values(values):
+    """Nilai numpy/pandas → list JSON (NaN/NA → null)."""
+    s = pd.Series(values, dtype=object)
+    return s.where(s.notna(), None).tolist()
+
+
+def compare_prices(catalog, ids, prices):
+    """
+    Bandingkan satu batch harga Portal dengan katalog. prices = {kolom harga katalog: [harga Portal]}.
+    Return dict siap-JSON: matched + per kolom status, selisih, statistik.
+    """
+    found, rows = catalog.lookup(ids, list(prices))
+    out = {"rows": len(ids), "matched": int(found.sum()), "pairs": {}}
+    for col, portal in prices.items():
+        if len(portal) != len(ids):
+            raise ValueError(f"Panjang harga '{col}' ({len(portal)}) tidak sama dengan ids ({len(ids)}).")
+        codes, selisih = compute_status(parse_price(pd.Series(portal, dtype=object)), rows[col].to_numpy(), found)
+        out["pairs"][col] = {"status": STATUS_LABELS[codes].tolist(), "selisih": _json_values(selisih),
+                             "omni": _json_values(rows[col].to_numpy()), "stats": status_stats(codes)}
+    return out
+
+
+class CatalogHandler(BaseHTTPRequestHandler):
+    """Endpoint JSON katalog (lihat docstring modul). Hanya untuk jaringan lokal, tanpa autentikasi."""
+
+    root = CATALOG_DIR
+
+    def _send(self, code, payload):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _catalog(self, name):
+        cat = ReferenceCatalog(unquote(name), self.root)
+        if not cat.exists():
+            self._send(404, {"error": f"Katalog '{unquote(name)}' tidak ditemukan."})
+            return None
+        return cat
+
+    def do_GET(self):
+        parts = [p for p in self.path.split("?")[0].split("/") if p]
+        if parts == ["catalogs"]:
+            return self._send(200, list_catalogs(self.root))
+        if len(parts) == 2 and parts[0] == "catalogs":
+            cat = self._catalog(parts[1])
+            return cat and self._send(200, cat.meta)
+        self._send(404, {"error": "Path tidak dikenal."})
+
+    def do_POST(self):
+        parts = [p for p in self.path.split("?")[0].split("/") if p]
+        if len(parts) != 3 or parts[0] != "catalogs" or parts[2] not in ("lookup", "compare"):
+            return self._send(404, {"error": "Path tidak dikenal."})
+        cat = self._catalog(parts[1])
+        if cat is None:
+            return
+        try:
+            req = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            if not isinstance(req, dict):
+                raise ValueError("Body harus objek JSON.")
+            ids = req.get("ids") or []
+            if not isinstance(ids, list):
+                raise ValueError("'ids' harus list.")
+            if len(ids) > MAX_BATCH:
+                return self._send(413, {"error": f"Maksimal {MAX_BATCH:,} ID per request."})
+            with stage(f"http[{parts[2]}]", rows=len(ids)):
+                if parts[2] == "lookup":
+                    cols = req.get("columns") or cat.columns
+                    if not isinstance(cols, list):
+                        raise ValueError("'columns' harus list.")
+                    missing = [c for c in cols if c not in cat.columns]
+                    if missing:
+                        raise ValueError(f"Kolom tidak ada di katalog: {', '.join(missing)}")
+                    found, rows = cat.lookup(ids, cols)
+                    payload = {"found": found.tolist(), "columns": {c: _json_values(rows[c]) for c in cols}}
+                else:
+                    prices  = req.get("prices") or {}
+                    if not isinstance(prices, dict) or not all(isinstance(v, list) for v in prices.values()):
+                        raise ValueError("'prices' harus objek {kolom harga: list harga}.")
+                    missing = [c for c in prices if c not in cat.meta["price_cols"]]
+                    if missing:
+                        raise ValueError(f"Kolom harga tidak ada di katalog: {', '.join(missing)}")
+                    payload = compare_prices(cat, ids, prices)
+        except (ValueError, TypeError, KeyError) as e:
+            return self._send(400, {"error": str(e)})
+        self._send(200, payload)
+
+    def log_message(self, fmt, *args):  # log per tahap sudah lewat instrument
+        pass
+
+
+def serve(host=SERVE_HOST, port=SERVE_PORT, root=CATALOG_DIR):
+    """Jalankan endpoint HTTP katalog (blocking)."""
+    handler = type("Handler", (CatalogHandler,), {"root": root})
+    server  = ThreadingHTTPServer((host, port), handler)
+    print(f"Katalog referensi di http://{host}:{server.server_address[1]}/catalogs", file=sys.stderr, flush=True)
+    server.serve_forever()
+
+
+def main(argv=None):
+    ap  = argparse.ArgumentParser(description="Katalog referensi Omni (build / list / serve).")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="Bangun/ganti katalog dari file Omni")
+    b.add_argument("file")
+    b.add_argument("--name", required=True)
+    b.add_argument("--id", help="Kolom ID/SKU (default: deteksi otomatis)")
+    b.add_argument("--price-cols", nargs="+", help="Kolom harga (default: deteksi otomatis)")
+    b.add_argument("--dup-policy", choices=["first", "last", "min", "max", "mean"], default="first")
+    sub.add_parser("list", help="Daftar katalog")
+    s = sub.add_parser("serve", help="Endpoint HTTP lokal")
+    s.add_argument("--host", default=SERVE_HOST)
+    s.add_argument("--port", type=int, default=SERVE_PORT)
+    ap.add_argument("--root", default=CATALOG_DIR, help="Folder katalog")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "build":
+        with open(args.file, "rb") as fh:
+            cat = build_from_file(os.path.basename(args.file), fh.read(), args.name, args.id, args.price_cols,
+                                  dup_policy=args.dup_policy, root=args.root)
+        print(json.dumps(cat.meta, ensure_ascii=False, indent=1, default=str))
+    elif args.cmd == "list":
+        for m in list_catalogs(args.root):
+            print(f"{m['name']:<24} {m['keys']:>10,} key  {len(m['price_cols'])} harga  {m['built_at']}  ({m['source']})")
+    else:
+        serve(args.host, args.port, args.root)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+Cache hasil analisis bersama untuk satu proses server (semua session Streamlit).
+
+Key = hash isi file Portal & Omni + konfigurasi analisis (kolom ID, pasangan,
+kolom info, opsi pencocokan). Beberapa pengguna yang menganalisis export yang
+sama memakai SATU ComparisonResult (versi ringkas, lihat engine.compact_result)
+alih-alih masing-masing menyimpan salinan penuh di session_state.
+Eviction LRU berdasarkan ukuran memori, bukan jumlah entry.
+
+Hasil bersama tidak diubah setelah masuk cache, kecuali cache turunannya
+(result.views dari table_view.py, result.exports dari export.py): dict itu
+diubah dari banyak session sekaligus, jadi semua baca/tulisnya memakai
+shared_cache().derived (hanya operasi dict; perhitungannya di luar lock).
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+RESULT_CACHE_MB = int(os.environ.get("CEKHARGA_RESULT_CACHE_MB", "1024"))
+
+
+def result_key(hash_a, hash_b, id_col_a, id_col_b, pairs, info_cols_raw=None, key_opts=None, dup_policy="first"):
+    """Key cache dari hash isi file + semua parameter yang mempengaruhi hasil."""
+    cfg = {
+        "files":      [hash_a, hash_b],
+        "ids":        [id_col_a, id_col_b],
+        "pairs":      [list(p) for p in pairs],
+        "info":       info_cols_raw or {},
+        "key_opts":   key_opts or {},
+        "dup_policy": dup_policy,
+    }
+    raw = json.dumps(cfg, sort_keys=True, ensure_ascii=False, default=str).encode()
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+def result_nbytes(result):
+    """Perkiraan memori satu hasil: frame + index status + file export yang sudah dibuat + cube."""
+    with _CACHE.derived:
+        exports, views = list(result.exports.values()), list(result.views.values())
+    n = int(result.merged.memory_usage(index=True, deep=True).sum())
+    n += sum(arr.nbytes for info in result.pairs_info for arr in info["status_idx"].values())
+    n += sum(len(b) for b in exports)
+    n += sum(getattr(pos, "nbytes", 0) for pos in views)
+    if result.cubes is not None:
+        n += int(result.cubes.memory_usage(index=True, deep=True).sum())
+    return n
+
+
+class ResultCache:
+    """LRU ComparisonResult dengan batas total ukuran (byte)."""
+
+    def __init__(self, max_bytes=RESULT_CACHE_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._items    = OrderedDict()
+        self._lock     = threading.Lock()
+        self._inflight = {}  # key → Lock, supaya analisis yang sama tidak dihitung bersamaan
+        self.derived   = threading.RLock()  # result.views / result.exports (dipakai bersama antar session)
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key, result):
+        """Simpan hasil; yang paling lama tidak dipakai dibuang sampai total ≤ max_bytes."""
+        if result_nbytes(result) > self.max_bytes:
+            return result
+        with self._lock:
+            self._items[key] = result
+            self._items.move_to_end(key)
+            self._evict()
+        return result
+
+    def _evict(self):
+        # Ukuran diukur ulang: export & view yang dibuat belakangan ikut menambah memori
+        sizes = {k: result_nbytes(r) for k, r in self._items.items()}
+        total = sum(sizes.values())
+        while total > self.max_bytes and len(self._items) > 1:
+            k, _ = self._items.popitem(last=False)
+            total -= sizes[k]
+
+    def get_or_compute(self, key, compute):
+        """
+        Hasil dari cache, atau compute() lalu simpan. Return (result, hit).
+        Session lain yang meminta key yang sama menunggu perhitungan pertama selesai.
+        """
+        hit = self.get(key)
+        if hit is not None:
+            return hit, True
+        with self._lock:
+            key_lock = self._inflight.setdefault(key, threading.Lock())
+        with key_lock:
+            hit = self.get(key)
+            if hit is not None:
+                return hit, True
+            try:
+                return self.put(key, compute()), False
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+
+    def stats(self):
+        """Jumlah entry & total ukuran (byte) saat ini."""
+        with self._lock:
+            return {"entries": len(self._items), "bytes": sum(result_nbytes(r) for r in self._items.values()),
+                    "max_bytes": self.max_bytes}
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+# Satu cache per proses, dipakai bersama oleh semua session Streamlit
+_CACHE = ResultCache()
+
+
+def shared_cache():
+    return _CACHE
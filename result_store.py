@@ -0,0 +1,123 @@
+"""
+Penyimpanan hasil run sebelumnya (snapshot Parquet per pasangan).
+
+Satu snapshot = key SKU ter-normalisasi + nomor kemunculan key (0, 1, ... untuk
+SKU duplikat di Portal) + harga Portal/Omni ter-normalisasi + kode status,
+disimpan per namespace (mis. per toko) dan label pasangan.
+Run berikutnya memakai snapshot ini untuk delta "berubah sejak run terakhir"
+(dan memakai ulang kode status baris yang harganya tidak berubah).
+
+Snapshot hanya diganti jika data run berbeda; snapshot yang diganti disimpan
+sebagai *.prev.parquet, jadi Run ulang dengan data yang sama tetap punya acuan
+run sebelumnya (bukan dibandingkan dengan dirinya sendiri).
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+STORE_DIR = os.environ.get("CEKHARGA_STORE_DIR", os.path.join(os.path.expanduser("~"), ".cekharga", "snapshots"))
+
+_lock = threading.Lock()
+
+
+def slug(text):
+    """Nama file aman + hash pendek supaya label berbeda tidak bertabrakan."""
+    base = re.sub(r"[^0-9A-Za-z_-]+", "_", str(text)).strip("_")[:40] or "x"
+    return f"{base}-{hashlib.blake2b(str(text).encode(), digest_size=4).hexdigest()}"
+
+
+def occurrence(keys):
+    """Nomor kemunculan tiap key (0 untuk kemunculan pertama): baris ke-n SKU duplikat dicocokkan dengan baris ke-n."""
+    keys = pd.array(keys, dtype="string")
+    return pd.Series(keys).groupby(keys, sort=False, dropna=False).cumcount().to_numpy(dtype=np.int32)
+
+
+def _same_snapshot(a, b):
+    """Dua snapshot berisi baris yang sama (urutan sama, NaN == NaN)."""
+    if len(a) != len(b):
+        return False
+    same_num = lambda c: np.array_equal(a[c].to_numpy(dtype="float64"), b[c].to_numpy(dtype="float64"), equal_nan=True)
+    return (np.array_equal(a["key"].to_numpy(dtype=object), b["key"].to_numpy(dtype=object))
+            and same_num("portal") and same_num("omni") and same_num("status"))
+
+
+class ResultStore:
+    """Snapshot hasil per (namespace, label pasangan) di folder lokal."""
+
+    def __init__(self, namespace="default", root=STORE_DIR):
+        self.namespace = namespace
+        self.dir       = os.path.join(root, slug(namespace))
+
+    def _path(self, label, previous=False):
+        return os.path.join(self.dir, f"{slug(label)}{'.prev' if previous else ''}.parquet")
+
+    def _meta_path(self):
+        return os.path.join(self.dir, "meta.json")
+
+    def load(self, label, previous=False):
+        """Snapshot terakhir (previous=True: yang sebelumnya) untuk label → DataFrame (key, occ, portal, omni, status) atau None."""
+        path = self._path(label, previous)
+        if not os.path.exists(path):
+            return None
+        try:
+            snap = pd.read_parquet(path)
+        except Exception:
+            return None
+        if "occ" not in snap.columns:  # snapshot lama: key sudah unik
+            snap.insert(1, "occ", occurrence(snap["key"]))
+        return snap
+
+    def save(self, label, keys, portal_vals, omni_vals, codes):
+        """
+        Simpan snapshot baru (key duplikat: semua baris, dibedakan kolom occ; key kosong dibuang).
+        Return False (tidak ada yang ditulis) jika isinya sama dengan snapshot terakhir.
+        """
+        snap = pd.DataFrame({
+            "key":    pd.array(keys, dtype="string"),
+            "occ":    occurrence(keys),
+            "portal": np.asarray(portal_vals, dtype="float64"),
+            "omni":   np.asarray(omni_vals, dtype="float64"),
+            "status": np.asarray(codes, dtype=np.int8),
+        })
+        snap = snap[snap["key"].notna()].reset_index(drop=True)
+        if self._unchanged(label, snap):
+            return False
+        os.makedirs(self.dir, exist_ok=True)
+        # tmp unik per thread: beberapa session di satu proses bisa menyimpan namespace/label yang sama
+        tmp = self._path(label) + f".{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            snap.to_parquet(tmp, index=False)
+            # Cek ulang, rotasi ke .prev, ganti snapshot dan update meta sebagai satu langkah
+            with _lock:
+                if self._unchanged(label, snap):
+                    return False
+                if os.path.exists(self._path(label)):
+                    os.replace(self._path(label), self._path(label, previous=True))
+                os.replace(tmp, self._path(label))
+                meta = self.runs()
+                meta[str(label)] = {"saved_at": time.strftime("%Y-%m-%d %H:%M:%S"), "rows": int(len(snap))}
+                with open(self._meta_path(), "w", encoding="utf-8") as fh:
+                    json.dump(meta, fh, ensure_ascii=False, indent=1)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return True
+
+    def _unchanged(self, label, snap):
+        """Snapshot terakhir label berisi data yang sama persis dengan snap."""
+        last = self.load(label)
+        return last is not None and _same_snapshot(last, snap)
+
+    def runs(self):
+        """Info run terakhir per label: {label: {saved_at, rows}}."""
+        try:
+            with open(self._meta_path(), encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
@@ -0,0 +1,152 @@
+"""
+Generator data sintetis Portal/Omni (deterministik, seed tetap) untuk benchmark.
+
+Meniru export asli yang "kotor":
+- harga campuran angka, "Rp12,500", "12,500", "Rp 12500", blank, 0
+- SKU duplikat di Portal & Omni, SKU Portal yang tidak ada di Omni
+- SKU Omni beda format (huruf kecil, spasi, ".0" dari Excel, nol di depan)
+- SKU Omni yang di-recode (nama produk sama/mirip, kode baru) → untuk fuzzy_match
+- beberapa kolom harga per marketplace + kolom info produk (Nama/Brand/Kategori)
+
+    python synth_data.py --rows 100000 --out data/    # tulis portal_100000.xlsx & omni_100000.xlsx
+"""
+import argparse
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+MARKETPLACES = ["Web", "Shopee", "Tokopedia", "Lazada"]
+BRANDS       = ["Indomie", "Sari Roti", "Aqua", "Ultra Milk", "Bear Brand", "Lifebuoy", "Pepsodent",
+                "Rinso", "Sunlight", "Kapal Api", "Good Day", "Teh Pucuk", "Chitato", "Oreo", "Beng-Beng"]
+KATEGORI     = ["Makanan", "Minuman", "Perawatan Diri", "Kebersihan", "Snack", "Susu", "Kopi & Teh"]
+SIZES        = [10_000, 100_000, 1_000_000]
+
+# Peluang kotoran data (per sel / per baris)
+P_BLANK       = 0.04   # harga kosong
+P_ZERO        = 0.02   # harga 0 (dianggap kosong)
+P_RP_TEXT     = 0.25   # harga sebagai teks "Rp12,500" dkk.
+P_DIFF        = 0.15   # harga Omni beda dari Portal
+P_MISSING     = 0.08   # SKU Portal yang tidak ada di Omni
+P_DUP_PORTAL  = 0.01
+P_DUP_OMNI    = 0.02
+P_MESSY_KEY   = 0.05   # SKU Omni beda format tapi sama setelah normalisasi
+P_RECODE      = 0.02   # SKU Omni diganti kode baru (hanya bisa dicocokkan lewat nama)
+
+
+def _price_text(rng, vals):
+    """Sebagian harga dijadikan teks berformat Rupiah; sisanya tetap angka."""
+    out  = vals.astype(object)
+    pick = rng.random(len(vals)) < P_RP_TEXT
+    fmt  = rng.integers(0, 3, len(vals))
+    for i in np.flatnonzero(pick):
+        v = int(vals[i])
+        out[i] = (f"Rp{v:,}", f"{v:,}", f"Rp {v}")[fmt[i]]
+    return out
+
+
+def _messy_prices(rng, vals):
+    """Harga + kotoran: blank, 0, teks Rupiah."""
+    out = _price_text(rng, vals)
+    r   = rng.random(len(vals))
+    out[r < P_BLANK] = None
+    out[(r >= P_BLANK) & (r < P_BLANK + P_ZERO)] = 0
+    return out
+
+
+def _messy_keys(rng, skus):
+    """Variasi format SKU yang harus tetap cocok setelah normalisasi key."""
+    out  = skus.astype(object)
+    pick = np.flatnonzero(rng.random(len(skus)) < P_MESSY_KEY)
+    kind = rng.integers(0, 3, len(pick))
+    for i, k in zip(pick, kind):
+        s = out[i]
+        out[i] = (s.lower(), f"  {s} ", "00" + s if s[0].isdigit() else s.lower())[k]
+    return out
+
+
+def generate(rows, seed=42):
+    """Return (portal_df, omni_df) dengan `rows` baris Portal. Hasil sama untuk seed yang sama."""
+    rng = np.random.default_rng(seed)
+
+    # SKU: campuran alfanumerik dan numerik murni (yang sering terbaca float oleh Excel)
+    ids     = np.arange(1, rows + 1)
+    numeric = rng.random(rows) < 0.3
+    skus    = np.where(numeric, (ids + 100000).astype(str), np.char.add("SKU", np.char.zfill(ids.astype(str), 7)))
+    dup     = rng.random(rows) < P_DUP_PORTAL
+    skus[dup] = skus[rng.integers(0, rows, int(dup.sum()))]
+
+    brand = rng.integers(0, len(BRANDS), rows)
+    kat   = rng.integers(0, len(KATEGORI), rows)
+    base  = (rng.integers(20, 5000, rows) * 100).astype(np.int64)  # Rp2.000 – Rp500.000, kelipatan 100
+
+    portal = {"No": ids, "SKU": skus,
+              "Nama Produk": [f"{BRANDS[b]} Varian {i % 97} {KATEGORI[k]}" for i, b, k in zip(ids, brand, kat)],
+              "Brand": np.array(BRANDS, dtype=object)[brand],
+              "Kategori": np.array(KATEGORI, dtype=object)[kat]}
+    omni_prices = {}
+    for j, mk in enumerate(MARKETPLACES):
+        price = base + (j * 500 if mk != "Web" else 0)
+        diff  = rng.random(rows) < P_DIFF
+        other = price + rng.choice([-1, 1], rows) * rng.integers(1, 50, rows) * 100
+        portal[f"Harga {mk}"] = _messy_prices(rng, price)
+        omni_prices[mk]       = np.where(diff, np.maximum(other, 100), price)
+
+    # Omni: tanpa SKU yang "hilang", urutan diacak, sebagian baris diduplikasi
+    keep  = np.flatnonzero(rng.random(rows) >= P_MISSING)
+    extra = keep[rng.random(len(keep)) < P_DUP_OMNI]
+    rows_b = rng.permutation(np.concatenate([keep, extra]))
+    keys_b  = _messy_keys(rng, skus[rows_b])
+    recode  = rng.random(len(rows_b)) < P_RECODE
+    keys_b[recode] = [f"NEW{n:07d}" for n in range(int(recode.sum()))]
+    names_b = np.array(portal["Nama Produk"], dtype=object)[rows_b]
+    names_b = np.where(rng.random(len(rows_b)) < 0.3, np.char.replace(names_b.astype(str), "Varian", "Var."), names_b)
+    omni = {"Kode Barang": keys_b, "Nama Barang": names_b,
+            "Merk": np.char.upper(np.array(BRANDS)[brand[rows_b]])}
+    for mk in MARKETPLACES:
+        omni[mk] = _messy_prices(rng, omni_prices[mk][rows_b])
+
+    return pd.DataFrame(portal), pd.DataFrame(omni)
+
+
+def to_bytes(df, fmt="xlsx"):
+    """Serialisasi frame ke bytes file upload (.xlsx via XlsxWriter constant_memory, atau .csv)."""
+    if fmt == "csv":
+        return df.to_csv(index=False).encode("utf-8")
+    buf = io.BytesIO()
+    try:
+        import xlsxwriter
+    except ImportError:
+        df.to_excel(buf, index=False)
+        return buf.getvalue()
+    wb = xlsxwriter.Workbook(buf, {"constant_memory": True})
+    ws = wb.add_worksheet("Sheet1")
+    ws.write_row(0, 0, list(df.columns))
+    obj = df.astype(object).where(df.notna(), None)
+    for r, row in enumerate(obj.itertuples(index=False), start=1):
+        ws.write_row(r, 0, row)
+    wb.close()
+    return buf.getvalue()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Buat file Portal/Omni sintetis untuk benchmark.")
+    ap.add_argument("--rows", type=int, nargs="+", default=SIZES, help="Jumlah baris Portal (default: %(default)s)")
+    ap.add_argument("--format", choices=["xlsx", "csv"], default="xlsx")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", default=".", help="Folder output")
+    args = ap.parse_args(argv)
+
+    os.makedirs(args.out, exist_ok=True)
+    for rows in args.rows:
+        portal, omni = generate(rows, args.seed)
+        for name, df in (("portal", portal), ("omni", omni)):
+            path = os.path.join(args.out, f"{name}_{rows}.{args.format}")
+            with open(path, "wb") as fh:
+                fh.write(to_bytes(df, args.format))
+            print(path, flush=True)
+
+
+if __name__ == "__main__":
+    main()
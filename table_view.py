@@ -0,0 +1,102 @@
+"""
+Tabel detail ber-halaman (server-side) untuk hasil analisis.
+
+Data tetap di server: filter memakai index status per pasangan, search & sort
+hanya menghasilkan array posisi baris (di-cache di ComparisonResult.views,
+dibagi antar session dan dijaga shared_cache().derived),
+dan hanya baris di halaman yang terlihat yang dimaterialisasi ke browser.
+"""
+import math
+
+import streamlit as st
+
+from engine import filter_positions, FILTER_OPTS
+from instrument import stage
+from result_cache import shared_cache
+
+PAGE_SIZES     = [25, 50, 100, 250, 500]
+VIEW_CACHE_MAX = 32  # jumlah kombinasi filter/search/sort yang disimpan per hasil
+
+
+def view_positions(result, info, sel, search="", sort_col=None, ascending=True):
+    """
+    Posisi baris (urut tampil) untuk kombinasi filter + search SKU + sort.
+    Hasil di-cache di result.views supaya ganti halaman tidak menghitung ulang.
+    """
+    key  = (info["label"], sel, search, sort_col, ascending)
+    lock = shared_cache().derived
+    with lock:
+        cached = result.views.get(key)
+    if cached is not None:
+        return cached
+
+    merged = result.merged
+    pos    = filter_positions(len(merged), info["status_idx"], sel)
+
+    if search:
+        ids = merged[result.id_col_a].iloc[pos].astype("string")
+        pos = pos[ids.str.contains(search, case=False, regex=False, na=False).to_numpy()]
+
+    if sort_col and sort_col in merged.columns and len(pos):
+        vals  = merged[sort_col].iloc[pos].reset_index(drop=True)
+        order = vals.sort_values(ascending=ascending, na_position="last", kind="stable").index.to_numpy()
+        pos   = pos[order]
+
+    with lock:
+        if key not in result.views and len(result.views) >= VIEW_CACHE_MAX:
+            result.views.pop(next(iter(result.views)))
+        result.views[key] = pos
+    return pos
+
+
+def page_frame(merged, cols, pos, page, page_size):
+    """Materialisasi satu halaman saja: merged[cols] pada posisi halaman ini."""
+    start = (page - 1) * page_size
+    return merged.iloc[pos[start:start + page_size], merged.columns.get_indexer(cols)]
+
+
+def render_table(result, info, cols, height=380, key=""):
+    """
+    Widget tabel ber-halaman untuk satu pasangan: filter, search SKU, sort, navigasi halaman.
+    key: prefix key widget (beberapa hasil di satu halaman, mis. per file target).
+    """
+    label  = info["label"]
+    wkey   = f"{key}{label}"
+    merged = result.merged
+
+    f1, f2, f3, f4 = st.columns([2, 2, 2, 1])
+    with f1:
+        sel = st.selectbox(f"Filter — {label}:", FILTER_OPTS, key=f"filter_{wkey}")
+    with f2:
+        search = st.text_input("Cari SKU/ID", key=f"search_{wkey}", placeholder="mis. SKU00123").strip()
+    with f3:
+        sort_col = st.selectbox("Urutkan", ["(urutan asli)"] + cols, key=f"sort_{wkey}")
+        sort_col = None if sort_col == "(urutan asli)" else sort_col
+    with f4:
+        ascending = st.toggle("Naik", value=True, key=f"asc_{wkey}")
+
+    with stage(f"table[{label}]", rows=len(merged)) as rec:
+        pos   = view_positions(result, info, sel, search, sort_col, ascending)
+        total = len(pos)
+        rec["view_rows"] = total
+
+        p1, p2, _ = st.columns([1, 1, 3])
+        with p1:
+            page_size = st.selectbox("Baris / halaman", PAGE_SIZES, index=2, key=f"psize_{wkey}")
+        n_pages = max(1, math.ceil(total / page_size))
+
+        # Satu key halaman per (pasangan, filter); kembali ke halaman 1 jika search/sort/ukuran halaman berubah
+        page_key, sig_key = f"page_{wkey}_{sel}", f"pagesig_{wkey}_{sel}"
+        sig = (search, sort_col, ascending, page_size)
+        if st.session_state.get(sig_key) != sig or st.session_state.get(page_key, 1) > n_pages:
+            st.session_state[sig_key]  = sig
+            st.session_state[page_key] = 1
+        with p2:
+            page = st.number_input(f"Halaman (1–{n_pages:,})", min_value=1, max_value=n_pages,
+                                   step=1, key=page_key)
+
+        first = (page - 1) * page_size
+        st.caption(f"Menampilkan baris {min(first + 1, total):,}–{min(first + page_size, total):,} "
+                   f"dari {total:,} hasil filter ({len(merged):,} total)")
+        st.dataframe(page_frame(merged, cols, pos, int(page), page_size),
+                     use_container_width=True, height=height, hide_index=True)
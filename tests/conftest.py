@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Modul aplikasi ada di root repo (bukan package); log JSON per tahap tidak perlu di output test
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("CEKHARGA_PERF_LOG", "0")
@@ -0,0 +1,157 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from engine import (parse_price, compute_status, status_stats, run_comparison, compact_result, build_cube,
+                    cube_rollup, CUBE_BLANK, ST_SAMA, ST_PORTAL_MAHAL, ST_OMNI_MAHAL, ST_KOSONG_P, ST_KOSONG_O, ST_KOSONG_BOTH, ST_TIDAK_ADA,
+                    DELTA_LABELS, DELTA_TETAP, DELTA_DIPERBAIKI)
+from result_store import ResultStore
+
+
+# ─── parse_price ───────────────────────────────────────────────────────────────
+def test_parse_price_text_formats():
+    s = pd.Series(["Rp12,500", " 12500 ", "Rp 1,000,000", "12500.5", "abc", "", None, "0"])
+    out = parse_price(s)
+    np.testing.assert_array_equal(out[:4], [12500, 12500, 1_000_000, 12500.5])
+    assert np.isnan(out[4:]).all()
+
+
+def test_parse_price_numeric_zero_is_empty():
+    out = parse_price(pd.Series([0, 15000, np.nan, 2.5]))
+    assert np.isnan(out[0]) and np.isnan(out[2])
+    np.testing.assert_array_equal(out[[1, 3]], [15000, 2.5])
+
+
+def test_parse_price_does_not_modify_input():
+    s = pd.Series([0.0, 100.0])
+    parse_price(s)
+    assert s.tolist() == [0.0, 100.0]
+
+
+# ─── compute_status ────────────────────────────────────────────────────────────
+def test_compute_status_all_codes():
+    portal = [100, 200, 100, np.nan, 100, np.nan, 100]
+    omni   = [100, 100, 200, 100, np.nan, np.nan, 100]
+    exists = [True, True, True, True, True, True, False]
+    codes, selisih = compute_status(portal, omni, exists)
+    assert codes.tolist() == [ST_SAMA, ST_PORTAL_MAHAL, ST_OMNI_MAHAL, ST_KOSONG_P, ST_KOSONG_O,
+                              ST_KOSONG_BOTH, ST_TIDAK_ADA]
+    np.testing.assert_array_equal(selisih[:3], [0, 100, 100])
+    assert np.isnan(selisih[3:]).all()
+
+
+def test_compute_status_matrix_matches_single_pairs():
+    rng    = np.random.default_rng(0)
+    portal = rng.choice([np.nan, 100, 200, 300], size=(50, 3))
+    omni   = rng.choice([np.nan, 100, 200, 300], size=(50, 3))
+    exists = rng.random(50) > 0.2
+    codes_m, selisih_m = compute_status(portal, omni, exists)
+    for k in range(3):
+        codes, selisih = compute_status(portal[:, k], omni[:, k], exists)
+        np.testing.assert_array_equal(codes_m[:, k], codes)
+        np.testing.assert_array_equal(selisih_m[:, k], selisih)
+
+
+def test_status_stats_counts():
+    codes = np.array([ST_SAMA, ST_SAMA, ST_PORTAL_MAHAL, ST_OMNI_MAHAL, ST_KOSONG_P, ST_TIDAK_ADA], dtype=np.int8)
+    st = status_stats(codes)
+    assert (st["sama"], st["portal_mahal"], st["omni_mahal"], st["tidak_ada"]) == (2, 1, 1, 1)
+
+
+# ─── run_comparison ────────────────────────────────────────────────────────────
+def test_run_comparison_end_to_end():
+    df_a = pd.DataFrame({"SKU": ["A1", "a2", "A3", "A4"], "Harga Web": ["Rp10,000", "20000", "", "5000"]})
+    df_b = pd.DataFrame({"Kode": ["A1", "A2", "A3"], "Web": [10000, 25000, 7000]})
+    res  = run_comparison(df_a, df_b, "SKU", "Kode", [("Harga Web", "Web", "Web")])
+    assert res.merged["[Web] Status"].tolist() == [
+        "Sama", "Tidak Sama - Omni Lebih Mahal", "Data Kosong (Portal kosong)", "Tidak Ada di Omni"]
+    assert res.results["Web"]["tidak_ada"] == 1
+    assert res.skipped == []
+
+
+# ─── Snapshot / delta (store) ──────────────────────────────────────────────────
+def _dup_frames(portal_web=(10000, 12000, 5000, 7000)):
+    # A1 duplikat di Portal dengan harga berbeda: tiap baris harus dibandingkan dengan dirinya sendiri
+    df_a = pd.DataFrame({"SKU": ["A1", "A2", "A1", "A3"], "Harga Web": list(portal_web)})
+    df_b = pd.DataFrame({"Kode": ["A1", "A2", "A3"], "Web": [10000, 15000, 7000]})
+    return df_a, df_b
+
+
+def test_store_rerun_identical_data_with_duplicate_keys_is_unchanged(tmp_path):
+    store = ResultStore("t", str(tmp_path))
+    for _ in range(3):
+        res = run_comparison(*_dup_frames(), "SKU", "Kode", [("Harga Web", "Web", "Web")], store=store)
+    delta = res.results["Web"]["delta"]
+    assert {k: v for k, v in delta.items() if k != "dihitung"} == dict.fromkeys(
+        ["baru_beda", "diperbaiki", "baru_hilang", "sku_baru", "lain"], 0)
+    assert delta["dihitung"] == 0
+    assert res.merged["[Web] Perubahan"].astype(str).unique().tolist() == [str(DELTA_LABELS[DELTA_TETAP])]
+
+
+def test_store_delta_per_duplicate_row(tmp_path):
+    store = ResultStore("t", str(tmp_path))
+    run_comparison(*_dup_frames(), "SKU", "Kode", [("Harga Web", "Web", "Web")], store=store)
+    # Baris A1 kedua (Portal 5000 ≠ Omni 10000) diperbaiki; baris A1 pertama tetap
+    res = run_comparison(*_dup_frames((10000, 12000, 10000, 7000)), "SKU", "Kode", [("Harga Web", "Web", "Web")],
+                         store=store)
+    codes = res.merged["[Web] Perubahan"].astype(str).tolist()
+    assert codes == [str(DELTA_LABELS[c]) for c in (DELTA_TETAP, DELTA_TETAP, DELTA_DIPERBAIKI, DELTA_TETAP)]
+    assert res.results["Web"]["delta"]["diperbaiki"] == 1 and res.results["Web"]["delta"]["dihitung"] == 1
+
+
+def test_store_concurrent_saves_same_label(tmp_path):
+    store = ResultStore("t", str(tmp_path))
+    keys  = ["A1", "A2", "A1"]
+
+    def save(i):
+        return store.save("Pair 1", keys, [i, i + 1, i + 2], [1.0, 2.0, 3.0], [0, 1, 2])
+
+    with ThreadPoolExecutor(8) as pool:
+        assert all(pool.map(save, range(32)))
+    assert sorted(os.listdir(store.dir)) == sorted(["meta.json", os.path.basename(store._path("Pair 1")),
+                                                    os.path.basename(store._path("Pair 1", previous=True))])
+    assert store.load("Pair 1")["occ"].tolist() == [0, 0, 1]
+    assert store.runs()["Pair 1"]["rows"] == 3
+
+
+# ─── Cube Brand / Kategori ─────────────────────────────────────────────────────
+def _cube_inputs():
+    dims = {"Brand": pd.Series(["X", "X", "Y", None, "Y", "X"]),
+            "Kategori": pd.Series(["k", "l", "k", "k", "k", "k"])}
+    codes = np.array([ST_SAMA, ST_PORTAL_MAHAL, ST_OMNI_MAHAL, ST_TIDAK_ADA, ST_PORTAL_MAHAL, ST_OMNI_MAHAL], dtype=np.int8)
+    selisih = np.array([0, 10.4, 10.4, np.nan, 10.4, 5.6])
+    return dims, codes, selisih
+
+
+def test_build_cube_groups_and_counts():
+    dims, codes, selisih = _cube_inputs()
+    cube = build_cube(dims, [("P", codes, selisih)])
+    assert len(cube) == 4  # (X,k) (X,l) (Y,k) (kosong,k)
+    xk = cube[(cube["Brand"] == "X") & (cube["Kategori"] == "k")].iloc[0]
+    assert (xk["Total"], xk["Sama"], xk["Omni Lebih Mahal"], xk["Selisih (Rp)"]) == (2, 1, 1, 6)
+    blank = cube[cube["Brand"] == CUBE_BLANK].iloc[0]
+    assert blank["Tidak Ada di Omni"] == 1
+    assert cube["Total"].sum() == len(codes)
+
+
+def test_build_cube_rounds_per_row():
+    dims, codes, selisih = _cube_inputs()
+    cube = build_cube(dims, [("P", codes, selisih)])
+    # 10.4 + 10.4 dibulatkan per baris = 20 (bukan round(20.8) = 21); sama dengan kolom selisih Rupiah
+    y = cube_rollup(cube, ["Brand"]).set_index("Brand")
+    assert y.loc["Y", "Selisih (Rp)"] == 20
+    assert cube["Selisih (Rp)"].sum() == np.round(np.nan_to_num(selisih)).sum()
+
+
+def test_cube_rollup_matches_pair_stats():
+    df_a = pd.DataFrame({"SKU": [f"S{i}" for i in range(8)], "Brand": list("XXYYZZ") + [None, "X"],
+                         "Kategori": list("kkllkkll"), "Harga Web": [100, 200, 300, 0, 500, 600, 700, 800]})
+    df_b = pd.DataFrame({"Kode": [f"S{i}" for i in range(7)], "Web": [100, 150, 350, 400, 500, 650, 700]})
+    res  = compact_result(run_comparison(df_a, df_b, "SKU", "Kode", [("Harga Web", "Web", "Web")]))
+    tot  = cube_rollup(res.cubes, ["Pasangan"]).iloc[0]
+    st   = res.results["Web"]
+    assert (tot["Total"], tot["Sama"], tot["Tidak Sama"], tot["Tidak Ada di Omni"]) == (
+        st["total"], st["sama"], st["tidak_sama"], st["tidak_ada"])
+    assert tot["Selisih (Rp)"] == res.merged["[Web] Selisih (Rp)"].sum()
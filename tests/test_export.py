@@ -0,0 +1,110 @@
+import io
+import zipfile
+
+import pandas as pd
+import pytest
+
+from engine import run_comparison, compact_result, MultiComparison
+from export import (export_bytes, iter_chunks, write_excel, write_csv_zip, _write_excel_openpyxl, _sheet_name,
+                    _BAD_SHEET_CHARS, SUMMARY_SHEET, CUBE_SHEET, SUGGEST_SHEET)
+from fuzzy_match import with_suggestions
+
+
+@pytest.fixture
+def result():
+    df_a = pd.DataFrame({"SKU": ["A1", "A2", "A3", "A4", "A5"], "Brand": ["X", "X", "Y", None, "Y"],
+                         "Kategori": ["k", "k", "k", "l", "l"],
+                         "Harga Web": [1000, 2000, None, 4000, 5000], "Harga Shopee": [10, 20, 30, 40, 50]})
+    df_b = pd.DataFrame({"Kode": ["A1", "A2", "A3", "A4"], "Web": [1000, 2500, 3000, 3500],
+                         "Shopee": [10, 20, 30, 45]})
+    pairs = [("Harga Web", "Web", "Web"), ("Harga Shopee", "Shopee", "Shopee/TikTok")]
+    return compact_result(run_comparison(df_a, df_b, "SKU", "Kode", pairs))
+
+
+def _detail(result, label):
+    info = next(i for i in result.pairs_info if i["label"] == label)
+    return result.merged[[result.id_col_a, info["portal_col"], info["omni_col"], info["status_col"]]]
+
+
+def test_xlsx_sheets_and_values(result):
+    data   = export_bytes(result, "xlsx")
+    sheets = pd.read_excel(io.BytesIO(data), sheet_name=None)
+    assert list(sheets) == ["Web", "Shopee_TikTok", CUBE_SHEET, SUMMARY_SHEET]
+    web = sheets["Web"]
+    exp = _detail(result, "Web")
+    assert web["SKU/ID"].tolist() == exp["SKU"].tolist()  # kolom info diberi nama rapi
+    assert web["[Web] Status"].tolist() == exp["[Web] Status"].astype(str).tolist()
+    assert web["[Web] Harga Omni"].isna().tolist() == exp["[Web] Harga Omni"].isna().tolist()
+    assert sheets[SUMMARY_SHEET]["Total Produk Portal"].tolist() == [5, 5]
+
+
+def test_openpyxl_fallback_same_content(result):
+    a, b = io.BytesIO(), io.BytesIO()
+    write_excel(result, a)
+    _write_excel_openpyxl(result, b)
+    sa = pd.read_excel(io.BytesIO(a.getvalue()), sheet_name=None)
+    sb = pd.read_excel(io.BytesIO(b.getvalue()), sheet_name=None)
+    assert list(sa) == list(sb)
+    for name in sa:
+        pd.testing.assert_frame_equal(sa[name], sb[name])
+
+
+def test_csv_zip_matches_frame(result):
+    buf = io.BytesIO()
+    write_csv_zip(result, buf)
+    with zipfile.ZipFile(buf) as zf:
+        assert set(zf.namelist()) == {"Web.csv", "Shopee_TikTok.csv", f"{CUBE_SHEET}.csv", "ringkasan.csv"}
+        web = pd.read_csv(zf.open("Web.csv"))
+    assert web["[Web] Status"].tolist() == _detail(result, "Web")["[Web] Status"].astype(str).tolist()
+
+
+def test_parquet_zip_roundtrip(result):
+    with zipfile.ZipFile(io.BytesIO(export_bytes(result, "parquet.zip"))) as zf:
+        web = pd.read_parquet(io.BytesIO(zf.read("Web.parquet")))
+    exp = _detail(result, "Web")
+    assert web["[Web] Harga Portal"].tolist() == exp["[Web] Harga Portal"].tolist()
+
+
+def test_export_bytes_cached(result):
+    assert export_bytes(result, "csv.zip") is export_bytes(result, "csv.zip")
+    assert list(result.exports) == ["csv.zip"]
+
+
+def test_suggestions_export_does_not_touch_shared_result(result):
+    export_bytes(result, "xlsx")
+    sugg = pd.DataFrame({"ID Portal": ["A5"], "ID Omni (Saran)": ["B5"], "Skor": [0.9]})
+    mine = with_suggestions(result, sugg)
+    sheets = pd.read_excel(io.BytesIO(export_bytes(mine, "xlsx")), sheet_name=None)
+    assert SUGGEST_SHEET in sheets
+    assert result.suggestions is None and list(result.exports) == ["xlsx"]
+    assert SUGGEST_SHEET not in pd.read_excel(io.BytesIO(result.exports["xlsx"]), sheet_name=None)
+
+
+def test_iter_chunks_covers_all_rows():
+    df = pd.DataFrame({"a": range(10), "b": range(10)})
+    chunks = list(iter_chunks(df, ["a"], chunk_rows=3))
+    assert [len(c) for c in chunks] == [3, 3, 3, 1]
+    assert pd.concat(chunks)["a"].tolist() == list(range(10))
+
+
+def test_sheet_name_sanitized_and_unique():
+    taken = {SUMMARY_SHEET.lower()}
+    assert _sheet_name("Ringkasan", taken) == "Ringkasan (2)"
+    assert _sheet_name("a/b:c", taken) == "a_b_c"
+    long = _sheet_name("x" * 40, taken)
+    assert long == "x" * 31 and _sheet_name("x" * 40, taken) == "x" * 27 + " (2)"
+
+
+def test_multi_target_sheet_names_unique(result):
+    sugg  = pd.DataFrame({"ID Portal": ["A5"], "ID Omni (Saran)": ["B5"], "Skor": [0.9]})
+    mine  = with_suggestions(result, sugg)
+    names = ["data/omni_3000.xlsx", "d2/omni_3000.xlsx", "omni[jkt].xlsx", "omni.xlsx", "omni.xlsx (2)",
+             "tokopedia_export_jakarta_2024.xlsx", "tokopedia_export_jakarta_2025.xlsx"]
+    multi = MultiComparison({n: mine for n in names})
+    sheets = pd.read_excel(io.BytesIO(export_bytes(multi, "xlsx")), sheet_name=None)
+    # per target: 2 pasangan + Analitik + Saran Nama, lalu satu Ringkasan
+    assert len(sheets) == len(names) * 4 + 1
+    assert len({s.lower() for s in sheets}) == len(sheets)
+    assert all(len(s) <= 31 and not _BAD_SHEET_CHARS.search(s) for s in sheets)
+    with zipfile.ZipFile(io.BytesIO(export_bytes(multi, "csv.zip"))) as zf:
+        assert len(set(zf.namelist())) == len(zf.namelist()) == len(sheets)
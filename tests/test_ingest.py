@@ -0,0 +1,90 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from ingest import FrameCache, load_columns, read_columns, read_upload, parse_bytes, parse_header
+
+
+def _xlsx(rows):
+    wb = Workbook()
+    ws = wb.active
+    for r in rows:
+        ws.append(list(r))
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+ROWS = [
+    ["SKU", "Harga", None, "Harga", "Nama"],
+    ["A1", 1000, "x", 5, "satu"],
+    [None, None, None, None, None],        # baris kosong di tengah: tetap ada
+    ["A3", "Rp2,000", None, 6, None],
+    ["A4", 3000.5],                        # baris pendek
+    [None, None, None, None, None],        # baris kosong di akhir: dibuang
+]
+
+
+@pytest.fixture
+def xlsx_bytes():
+    return _xlsx(ROWS)
+
+
+def _assert_same_values(stream, full):
+    assert list(stream.columns) == list(full.columns)
+    assert len(stream) == len(full)
+    for c in full.columns:
+        a = stream[c].astype(object).where(stream[c].notna(), None).tolist()
+        b = full[c].astype(object).where(full[c].notna(), None).tolist()
+        assert [str(v) if v is not None else None for v in a] == [str(v) if v is not None else None for v in b], c
+
+
+@pytest.mark.parametrize("chunksize", [1, 2, 50])
+def test_stream_xlsx_matches_read_excel(xlsx_bytes, chunksize):
+    cols = ["SKU", "Harga", "Harga.1", "Nama"]
+    full = pd.read_excel(io.BytesIO(xlsx_bytes))[cols]
+    _assert_same_values(load_columns("omni.xlsx", xlsx_bytes, cols, chunksize=chunksize), full)
+
+
+def test_stream_xlsx_header_names_match_read_excel(xlsx_bytes):
+    assert parse_header("omni.xlsx", xlsx_bytes).columns.tolist() == pd.read_excel(io.BytesIO(xlsx_bytes)).columns.tolist()
+
+
+def test_stream_csv_matches_read_csv():
+    data = b"SKU,Harga,Nama\nA1,1000,satu\nA2,,dua\nA3,3000,\n"
+    full = pd.read_csv(io.BytesIO(data))[["SKU", "Harga"]]
+    _assert_same_values(load_columns("omni.csv", data, ["SKU", "Harga"], chunksize=1), full)
+
+
+def test_stream_missing_column(xlsx_bytes):
+    with pytest.raises(KeyError):
+        load_columns("omni.xlsx", xlsx_bytes, ["SKU", "Tidak Ada"])
+
+
+def test_stream_numeric_column_stays_float64():
+    data = _xlsx([["SKU", "Harga"]] + [[f"S{i}", 1234567.25 + i] for i in range(5)])
+    df = load_columns("omni.xlsx", data, ["SKU", "Harga"], chunksize=2)
+    assert df["Harga"].dtype == np.float64
+    assert df["Harga"].iloc[0] == 1234567.25
+
+
+def test_read_upload_cache_hit_and_disk(tmp_path):
+    data  = b"SKU,Harga\nA1,1000\nA2,2000\n"
+    cache = FrameCache(cache_dir=str(tmp_path))
+    first = read_upload("p.csv", data, cache=cache)
+    assert read_upload("p.csv", data, cache=cache) is first
+    # Proses baru (cache memori kosong) membaca hasil yang sudah di-spill ke Parquet
+    again = read_upload("p.csv", data, cache=FrameCache(cache_dir=str(tmp_path)))
+    pd.testing.assert_frame_equal(again, parse_bytes("p.csv", data), check_dtype=False)
+
+
+def test_read_columns_cached_per_column_set(tmp_path):
+    data  = b"SKU,Harga,Nama\nA1,1000,x\n"
+    cache = FrameCache(cache_dir=str(tmp_path))
+    a = read_columns("p.csv", data, ["SKU", "Harga"], cache=cache)
+    b = read_columns("p.csv", data, ["SKU", "Nama"], cache=cache)
+    assert a.columns.tolist() == ["SKU", "Harga"] and b.columns.tolist() == ["SKU", "Nama"]
+    assert read_columns("p.csv", data, ["SKU", "Harga"], cache=cache) is a
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine import parse_price
+from join import normalize_keys, join_frames, dup_summary, encode_keys
+
+
+def _join(df_b, dup_policy="first", **kw):
+    df_a = pd.DataFrame({"SKU": ["A", "B", "C"]})
+    return join_frames(df_a, df_b, "SKU", "Kode", dup_policy=dup_policy, agg_cols=["Harga"], parse=parse_price, **kw)
+
+
+DUPS = pd.DataFrame({"Kode": ["A", "a ", "B", "A"], "Harga": [100, 300, 50, 200], "Nama": ["x", "y", "z", "w"]})
+
+
+# ─── Normalisasi key ───────────────────────────────────────────────────────────
+def test_normalize_keys_defaults():
+    s = pd.Series([" sku-01 ", "SKU-01", "00123", 123.0, "123.00", None, "", "NONE", "nan"], dtype=object)
+    out = normalize_keys(s)
+    assert out.tolist() == ["SKU-01", "SKU-01", "123", "123", "123", None, None, "NONE", "NAN"]
+
+
+def test_normalize_keys_options_off():
+    s = pd.Series(["sku", "007", "5.0"])
+    out = normalize_keys(s, ignore_case=False, strip_zeros=False, strip_float=False)
+    assert out.tolist() == ["sku", "007", "5.0"]
+
+
+def test_literal_none_sku_still_matches():
+    df_a = pd.DataFrame({"SKU": ["NONE", "NaN", None]})
+    df_b = pd.DataFrame({"Kode": ["none", "NAN", None], "Harga": [1, 2, 3]})
+    _, exists, report, _ = join_frames(df_a, df_b, "SKU", "Kode")
+    assert exists.tolist() == [True, True, False]
+    assert report["matched"] == 2
+
+
+# ─── Kebijakan duplikat ────────────────────────────────────────────────────────
+@pytest.mark.parametrize("policy, expected", [
+    ("first", [100, 50, np.nan]),
+    ("last",  [200, 50, np.nan]),
+    ("min",   [100, 50, np.nan]),
+    ("max",   [300, 50, np.nan]),
+    ("mean",  [200, 50, np.nan]),
+])
+def test_dup_policies(policy, expected):
+    merged, exists, report, _ = _join(DUPS, policy)
+    assert len(merged) == 3
+    assert exists.tolist() == [True, True, False]
+    np.testing.assert_array_equal(merged["Harga"].to_numpy(dtype="float64"), expected)
+    assert report["dup_policy"] == policy
+
+
+def test_dup_policy_first_last_pick_whole_row():
+    first, *_ = _join(DUPS, "first")
+    last, *_  = _join(DUPS, "last")
+    assert first["Nama"].iloc[0] == "x"
+    assert last["Nama"].iloc[0] == "w"
+
+
+def test_dup_report():
+    _, _, report, _ = _join(DUPS)
+    assert report["omni"]["dup_keys"] == 1
+    assert report["omni"]["dup_rows"] == 3
+    assert report["portal"]["dup_keys"] == 0
+    assert report["matched"] == 2
+
+
+def test_dup_summary_examples_limited():
+    keys = normalize_keys(pd.Series([f"K{i // 2}" for i in range(40)]))
+    codes, _, n = encode_keys(keys, keys[:0])
+    d = dup_summary(codes, pd.Series(keys), n, examples=3)
+    assert (d["dup_keys"], d["dup_rows"], len(d["examples"])) == (20, 40, 3)
+
+
+# ─── Bentuk hasil ──────────────────────────────────────────────────────────────
+def test_join_keeps_portal_rows_and_suffixes_overlap():
+    df_a = pd.DataFrame({"SKU": ["A", "A", "X"], "Nama": ["p1", "p2", "p3"]})
+    df_b = pd.DataFrame({"Kode": ["A"], "Nama": ["omni"]})
+    merged, exists, _, _ = join_frames(df_a, df_b, "SKU", "Kode")
+    assert merged["SKU"].tolist() == ["A", "A", "X"]
+    assert merged["Nama_Portal"].tolist() == ["p1", "p2", "p3"]
+    assert merged["Nama_Omni"].tolist()[:2] == ["omni", "omni"]
+    assert pd.isna(merged["Nama_Omni"].iloc[2])
+    assert exists.tolist() == [True, True, False]
@@ -0,0 +1,131 @@
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import reference_catalog
+from engine import compare_frames, compact_result
+from reference_catalog import build_catalog, compare_prices, list_catalogs, ReferenceCatalog
+
+PAIRS = [("Harga Web", "Web", "Web"), ("Harga Shopee", "Shopee", "Shopee")]
+
+
+@pytest.fixture
+def frames():
+    df_a = pd.DataFrame({"SKU": ["a1", "A2", "003", "A4", None, "NONE", "A1"],
+                         "Brand": ["X", "X", "Y", "Y", "Z", "Z", "X"],
+                         "Harga Web": [100, 200, 300, 400, 500, 600, 100],
+                         "Harga Shopee": ["Rp1,000", "2000", "", "4000", "5000", "6000", "1000"]})
+    df_b = pd.DataFrame({"Kode": ["A1", "A2", "3", "A2", "NONE", " a6 "],
+                         "Web": [100, 250, 300, 150, 600, 700],
+                         "Shopee": ["1000", "2000", "3500", None, "6000", "7000"],
+                         "Nama": ["n1", "n2", "n3", "n2b", "n5", "n6"]})
+    return df_a, df_b
+
+
+@pytest.mark.parametrize("dup_policy", ["first", "last", "min", "max", "mean"])
+def test_catalog_compare_equals_file_compare(tmp_path, frames, dup_policy):
+    df_a, df_b = frames
+    cat = build_catalog(df_b, "master", "Kode", ["Web", "Shopee"], ["Nama"], dup_policy=dup_policy, root=str(tmp_path))
+    direct  = compact_result(compare_frames(df_a, df_b[["Kode", "Web", "Shopee"]], "SKU", "Kode", PAIRS,
+                                            dup_policy=dup_policy))
+    via_cat = compact_result(compare_frames(df_a, None, "SKU", "Kode", PAIRS, catalog=cat))
+    assert via_cat.results == direct.results
+    for info in direct.pairs_info:
+        for c in (info["portal_col"], info["omni_col"], info["status_col"], info["selisih_col"]):
+            pd.testing.assert_series_equal(via_cat.merged[c], direct.merged[c], check_dtype=False)
+    assert via_cat.join_report["matched"] == direct.join_report["matched"]
+    assert via_cat.join_report["omni"] == direct.join_report["omni"]
+
+
+def test_lookup_and_compare_prices(tmp_path, frames):
+    _, df_b = frames
+    cat = build_catalog(df_b, "master", "Kode", ["Web"], ["Nama"], root=str(tmp_path))
+    found, rows = cat.lookup(["a1", "x", "003", None])
+    assert found.tolist() == [True, False, True, False]
+    assert rows["Web"].tolist()[0] == 100 and np.isnan(rows["Web"].iloc[1])
+    assert rows["Nama"].iloc[2] == "n3" and pd.isna(rows["Nama"].iloc[1])
+    out = compare_prices(cat, ["A1", "A2", "ZZ"], {"Web": [100, 200, 5]})
+    assert out["matched"] == 2
+    assert out["pairs"]["Web"]["status"] == ["Sama", "Tidak Sama - Omni Lebih Mahal", "Tidak Ada di Omni"]
+
+
+def test_rebuild_writes_new_version_file(tmp_path, frames):
+    _, df_b = frames
+    root = str(tmp_path)
+    c1 = build_catalog(df_b, "master", "Kode", ["Web"], root=root)
+    c1.probe(np.array(["A1"], dtype=object))  # versi 1 terbuka (mmap)
+    c2 = build_catalog(df_b.assign(Web=df_b["Web"] * 2), "master", "Kode", ["Web"], root=root)
+    c3 = build_catalog(df_b, "master", "Kode", ["Web"], root=root)
+    assert len({c1.version, c2.version, c3.version}) == 3
+    files = sorted(f for f in os.listdir(c3.dir) if f.endswith(".arrow"))
+    assert files == sorted([c2.meta["data_file"], c3.meta["data_file"]])  # versi ini + sebelumnya
+    # Objek lama tetap di versinya sendiri; objek baru membaca versi terbaru
+    assert ReferenceCatalog("master", root).lookup(["A1"])[1]["Web"].iloc[0] == 100
+    assert c2.lookup(["A1"])[1]["Web"].iloc[0] == 200
+
+
+def test_meta_read_once_per_object(tmp_path, frames, monkeypatch):
+    _, df_b = frames
+    build_catalog(df_b, "master", "Kode", ["Web"], root=str(tmp_path))
+    cat = ReferenceCatalog("master", str(tmp_path))
+    reads, real_load = [], reference_catalog.json.load
+    monkeypatch.setattr(reference_catalog.json, "load", lambda fh: reads.append(fh.name) or real_load(fh))
+    cat.lookup(["A1"])
+    cat.lookup(["A2"])
+    cat.frame()
+    assert reads == [cat.meta_path]
+
+
+def test_list_catalogs(tmp_path, frames):
+    _, df_b = frames
+    for name in ("b", "a"):
+        build_catalog(df_b, name, "Kode", ["Web"], root=str(tmp_path))
+    assert [m["name"] for m in list_catalogs(str(tmp_path))] == ["a", "b"]
+    assert not ReferenceCatalog("c", str(tmp_path)).exists()
+
+
+@pytest.fixture
+def server(tmp_path, frames):
+    _, df_b = frames
+    build_catalog(df_b, "master", "Kode", ["Web"], ["Nama"], root=str(tmp_path))
+    handler = type("Handler", (reference_catalog.CatalogHandler,), {"root": str(tmp_path)})
+    srv = reference_catalog.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=srv.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}/catalogs/master"
+    srv.shutdown()
+    srv.server_close()
+
+
+def _post(url, body):
+    req = urllib.request.Request(url, data=json.dumps(body).encode(), method="POST")
+    try:
+        with urllib.request.urlopen(req) as resp:
+            return resp.status, json.load(resp)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+@pytest.mark.parametrize("path, body", [
+    ("compare", {"ids": "abc", "prices": {"Web": [1, 2, 3]}}),
+    ("compare", {"ids": ["A1"], "prices": {"Web": 100}}),
+    ("compare", {"ids": ["A1"], "prices": [100]}),
+    ("lookup",  {"ids": {"A1": 1}}),
+    ("lookup",  {"ids": ["A1"], "columns": "Web"}),
+    ("lookup",  ["A1"]),
+])
+def test_http_rejects_malformed_request(server, path, body):
+    code, payload = _post(f"{server}/{path}", body)
+    assert code == 400 and "error" in payload
+
+
+def test_http_compare(server):
+    code, payload = _post(f"{server}/compare", {"ids": ["A1", "ZZ"], "prices": {"Web": [100, 5]}})
+    assert code == 200
+    assert payload["pairs"]["Web"]["status"] == ["Sama", "Tidak Ada di Omni"]
+    assert len(payload["pairs"]["Web"]["omni"]) == 2
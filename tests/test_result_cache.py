@@ -0,0 +1,99 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from engine import ComparisonResult
+from result_cache import ResultCache, result_key, result_nbytes, shared_cache
+from table_view import view_positions, VIEW_CACHE_MAX
+
+
+def _result(n=1000):
+    merged = pd.DataFrame({"SKU": [f"S{i}" for i in range(n)], "v": np.arange(n, dtype="float64")})
+    idx    = {"Semua": np.arange(n)}
+    info   = {"label": "P", "status_idx": idx}
+    return ComparisonResult(merged, {}, [info], "SKU", {})
+
+
+def test_result_key_depends_on_every_input():
+    base = dict(hash_a="a", hash_b="b", id_col_a="SKU", id_col_b="Kode", pairs=[("x", "y", "P")])
+    k = result_key(**base)
+    assert k == result_key(**base)
+    assert k != result_key(**{**base, "hash_b": "c"})
+    assert k != result_key(**{**base, "pairs": [("x", "y", "Q")]})
+    assert k != result_key(**base, key_opts={"ignore_case": False})
+    assert k != result_key(**base, dup_policy="last")
+
+
+def test_get_or_compute_hit():
+    cache = ResultCache()
+    calls = []
+    r1, hit1 = cache.get_or_compute("k", lambda: calls.append(1) or _result())
+    r2, hit2 = cache.get_or_compute("k", lambda: calls.append(1) or _result())
+    assert (hit1, hit2) == (False, True) and r1 is r2 and len(calls) == 1
+
+
+def test_concurrent_requests_compute_once():
+    cache, calls = ResultCache(), []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return _result()
+
+    out = []
+    threads = [threading.Thread(target=lambda: out.append(cache.get_or_compute("k", compute)[0])) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1 and all(r is out[0] for r in out)
+
+
+def test_lru_eviction_by_bytes():
+    one   = result_nbytes(_result())
+    cache = ResultCache(max_bytes=int(one * 2.5))
+    for k in "abc":
+        cache.put(k, _result())
+    assert cache.get("a") is None and cache.get("b") is not None and cache.get("c") is not None
+    cache.get("b")               # b paling baru dipakai → c yang dibuang berikutnya
+    cache.put("d", _result())
+    assert cache.get("c") is None and cache.get("b") is not None
+    assert cache.stats()["bytes"] <= cache.max_bytes
+
+
+def test_oversized_result_not_cached():
+    cache = ResultCache(max_bytes=10)
+    r = _result()
+    assert cache.put("k", r) is r and cache.get("k") is None
+
+
+def test_nbytes_counts_exports_and_views():
+    r = _result()
+    base = result_nbytes(r)
+    r.exports["xlsx"] = b"x" * 1000
+    assert result_nbytes(r) == base + 1000
+    pos = view_positions(r, r.pairs_info[0], "Semua", "S1")
+    assert result_nbytes(r) == base + 1000 + pos.nbytes
+
+
+def test_shared_views_concurrent():
+    r, errors = _result(5000), []
+
+    def work(i):
+        try:
+            for k in range(100):
+                view_positions(r, r.pairs_info[0], "Semua", str((i + k) % 40), "v", k % 2 == 0)
+                result_nbytes(r)
+        except Exception as e:  # pragma: no cover - hanya saat race
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    with shared_cache().derived:
+        assert len(r.views) <= VIEW_CACHE_MAX